@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Columnar analytics snapshot job for FoodBridge
+
+Copies items, events and organizations into memory-mappable per-column
+.npy files (see app/services/columnar.py). Cohorts, locations and
+predictions, and notebooks/eda.ipynb, then read full history from the
+snapshot instead of the database. Run it from cron, e.g. nightly:
+
+    python analytics_snapshot.py                 # write, publish as CURRENT, prune
+    python analytics_snapshot.py --list
+
+It reads from the first read replica when DATABASE_REPLICA_URLS is set,
+so the primary never serves the full-table scans.
+"""
+
+import argparse
+import sys
+import time
+
+from app.services import columnar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Snapshot directory (default: ANALYTICS_SNAPSHOT_DIR)")
+    parser.add_argument("--keep", type=int, help="Snapshots to keep (default: ANALYTICS_SNAPSHOT_KEEP)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows fetched per round trip")
+    parser.add_argument("--list", action="store_true", help="List snapshots and exit")
+    args = parser.parse_args()
+
+    root = columnar.snapshot_root(args.output)
+    if args.list:
+        current = columnar.load_snapshot(root)
+        for path in sorted(root.glob("*/manifest.json")) if root.exists() else []:
+            snapshot = columnar.load_snapshot(root, path.parent.name)
+            rows = ", ".join(f"{name} {len(table):,}" for name, table in snapshot.tables.items())
+            marker = "⭐" if current and current.name == snapshot.name else "📦"
+            print(f"{marker} {snapshot.name}  finished {snapshot.manifest['finished_at']}  {rows}")
+        return
+
+    from app.db.session import engine, replica_engines
+
+    source = replica_engines[0] if replica_engines else engine
+    started = time.perf_counter()
+    try:
+        manifest = columnar.write_snapshot(source, root, args.keep, args.batch_size)
+    except Exception as e:
+        print(f"❌ Snapshot failed: {e}")
+        sys.exit(1)
+    print(f"✅ Analytics snapshot {manifest['name']} written to {root} in {time.perf_counter() - started:.1f}s")
+    for name, table in manifest["tables"].items():
+        print(f"   {name}: {table['rows']:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,31 @@
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, Request, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.models import Event, Item, User, Organization
 from app.schemas.schemas import EventCreate, EventOut, AnalyticsSummary
 from app.auth.auth import get_current_user_optional
-from app.services.ai import ai_service
+from app.services.ai import get_ai_service
+from app.services.funnel import funnel, parse_steps, parse_window
+from app.services.archive import ItemHistory
+from app.core.metrics import openai_latency
+from app.core.tracing import span
 
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
+def _columnar_snapshot():
+    """Fresh columnar snapshot to serve full-history analytics from, or None to query the database"""
+    # numpy is only imported once a snapshot-backed endpoint is used
+    from app.services.columnar import current_snapshot
+    return current_snapshot()
+
+
 @router.post("/events", response_model=EventOut)
 def log_event(
     payload: EventCreate,
@@ -36,9 +49,9 @@ def log_event(
 
 
 @router.get("/summary", response_model=AnalyticsSummary)
-def analytics_summary(db: Session = Depends(get_db)):
-    total_items = db.query(func.count(Item.id)).scalar() or 0
-    total_claimed = db.query(func.count(Item.id)).filter(Item.status == "claimed").scalar() or 0
+def analytics_summary(db: Session = Depends(get_read_db)):
+    total_items = db.query(func.count(ItemHistory.id)).scalar() or 0
+    total_claimed = db.query(func.count(ItemHistory.id)).filter(ItemHistory.status == "claimed").scalar() or 0
     total_unclaimed = total_items - total_claimed
     claim_rate = (total_claimed / total_items) if total_items else 0.0
 
@@ -68,7 +81,7 @@ def analytics_summary(db: Session = Depends(get_db)):
 @router.get("/series")
 def analytics_series(
     days: int = Query(14, ge=1, le=90),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Return daily time-series for items created and claimed over the past N days."""
     end = datetime.utcnow().date()
@@ -83,18 +96,18 @@ def analytics_series(
         next_day = day + timedelta(days=1)
         labels.append(day.isoformat())
         created = (
-            db.query(func.count(Item.id))
-            .filter(Item.ready_at.isnot(None))
-            .filter(Item.ready_at >= day)
-            .filter(Item.ready_at < next_day)
+            db.query(func.count(ItemHistory.id))
+            .filter(ItemHistory.ready_at.isnot(None))
+            .filter(ItemHistory.ready_at >= day)
+            .filter(ItemHistory.ready_at < next_day)
             .scalar()
             or 0
         )
         claimed = (
-            db.query(func.count(Item.id))
-            .filter(Item.claimed_at.isnot(None))
-            .filter(Item.claimed_at >= day)
-            .filter(Item.claimed_at < next_day)
+            db.query(func.count(ItemHistory.id))
+            .filter(ItemHistory.claimed_at.isnot(None))
+            .filter(ItemHistory.claimed_at >= day)
+            .filter(ItemHistory.claimed_at < next_day)
             .scalar()
             or 0
         )
@@ -111,25 +124,25 @@ def analytics_series(
 @router.get("/categories")
 def analytics_categories(
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Return counts by category for items created and claimed in the last N days."""
     end = datetime.utcnow()
     start = end - timedelta(days=days)
 
     created_rows = (
-        db.query(Item.category, func.count(Item.id))
-        .filter(Item.ready_at.isnot(None))
-        .filter(Item.ready_at >= start)
-        .group_by(Item.category)
+        db.query(ItemHistory.category, func.count(ItemHistory.id))
+        .filter(ItemHistory.ready_at.isnot(None))
+        .filter(ItemHistory.ready_at >= start)
+        .group_by(ItemHistory.category)
         .all()
     )
 
     claimed_rows = (
-        db.query(Item.category, func.count(Item.id))
-        .filter(Item.claimed_at.isnot(None))
-        .filter(Item.claimed_at >= start)
-        .group_by(Item.category)
+        db.query(ItemHistory.category, func.count(ItemHistory.id))
+        .filter(ItemHistory.claimed_at.isnot(None))
+        .filter(ItemHistory.claimed_at >= start)
+        .group_by(ItemHistory.category)
         .all()
     )
 
@@ -150,7 +163,7 @@ def analytics_categories(
 def analytics_forecast(
     days: int = Query(14, ge=7, le=90),
     horizon: int = Query(7, ge=1, le=30),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Forecast created and claimed using simple linear regression on the past N days."""
     series = analytics_series(days=days, db=db)  # reuse computation
@@ -181,45 +194,47 @@ def analytics_forecast(
 
 
 @router.get("/risk")
-def analytics_risk(db: Session = Depends(get_db), limit: int = Query(10, ge=1, le=50)):
-    """Return items most at risk of expiring unclaimed with a simple risk score."""
+def analytics_risk(db: Session = Depends(get_read_db), limit: int = Query(10, ge=1, le=50)):
+    """Return listed items most at risk of expiring unclaimed.
+
+    The whole live inventory is scored in one batch by the trained claim
+    model (risk = 1 - claim probability), or by the time-pressure heuristic
+    until a model has been trained.
+    """
+    from app.services.claim_model import score_inventory, top_indices
+
     now = datetime.utcnow()
-    items = (
+    query = (
         db.query(Item)
         .filter(Item.status == "listed")
         .filter((Item.expires_at.is_(None)) | (Item.expires_at >= now))
-        .all()
     )
+    rows, risk, probability = score_inventory(db, query, now)
 
     risky = []
-    for it in items:
-        if it.expires_at is None:
-            hours_left = 9999.0
-        else:
-            delta = it.expires_at - now
-            hours_left = max(0.0, delta.total_seconds() / 3600.0)
-        quantity = float(it.quantity or 1.0)
-        # Simple risk formula: time pressure + quantity factor
-        risk = (1.0 / (1.0 + hours_left)) + 0.05 * quantity
-        risky.append({
+    for i in top_indices(risk, limit):
+        it = rows[i]
+        hours_left = max(0.0, (it.expires_at - now).total_seconds() / 3600.0) if it.expires_at else None
+        entry = {
             "id": it.id,
             "title": it.title,
             "category": it.category or "Unknown",
             "org_id": it.org_id,
             "expires_at": it.expires_at.isoformat() if it.expires_at else None,
-            "hours_left": round(hours_left, 2) if it.expires_at else None,
+            "hours_left": round(hours_left, 2) if hours_left is not None else None,
             "quantity": it.quantity,
-            "risk_score": round(risk, 4),
-        })
-
-    risky.sort(key=lambda r: r["risk_score"], reverse=True)
-    return {"items": risky[:limit]}
+            "risk_score": round(float(risk[i]), 4),
+        }
+        if probability is not None:
+            entry["claim_probability"] = round(float(probability[i]), 4)
+        risky.append(entry)
+    return {"items": risky, "model": "claim_model" if probability is not None else "heuristic"}
 
 
 @router.get("/cohorts")
 def analytics_cohorts(
     weeks: int = Query(12, ge=4, le=52),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Weekly donor retention cohorts based on first donation week (ready_at).
 
@@ -227,17 +242,23 @@ def analytics_cohorts(
     rates (0..1) where value[i][j] = share of cohort i donors who donated in
     week j relative to their first donation week.
     """
-    end = datetime.utcnow().date()
+    snapshot = _columnar_snapshot()
+    if snapshot is not None:
+        from app.services.snapshot_analytics import cohorts
+        return cohorts(snapshot, weeks)
+
+    as_of = datetime.utcnow()
+    end = as_of.date()
     start = end - timedelta(weeks=weeks)
 
     # Fetch donations in the range
     rows = (
-        db.query(User.id.label("user_id"), Item.ready_at)
-        .join(User, User.id == Item.donated_by_user_id)
-        .filter(Item.donated_by_user_id.isnot(None))
-        .filter(Item.ready_at.isnot(None))
-        .filter(Item.ready_at >= start)
-        .filter(Item.ready_at < end + timedelta(days=1))
+        db.query(User.id.label("user_id"), ItemHistory.ready_at)
+        .join(User, User.id == ItemHistory.donated_by_user_id)
+        .filter(ItemHistory.donated_by_user_id.isnot(None))
+        .filter(ItemHistory.ready_at.isnot(None))
+        .filter(ItemHistory.ready_at >= start)
+        .filter(ItemHistory.ready_at < end + timedelta(days=1))
         .all()
     )
 
@@ -277,12 +298,29 @@ def analytics_cohorts(
             row.append(round(len(active) / size, 4))
         matrix.append(row)
 
-    return {"labels": labels, "offsets": offsets, "matrix": matrix}
+    return {"as_of": as_of.isoformat(), "labels": labels, "offsets": offsets, "matrix": matrix}
+
+
+@router.get("/funnel")
+def analytics_funnel(
+    steps: str = Query("item_viewed,claim_started,item_claimed", description="Comma-separated event types, in order"),
+    window: str = Query("24h", description="Time allowed from the first step to the last, e.g. 30m, 24h, 7d"),
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Only events from the last N days"),
+    db: Session = Depends(get_read_db),
+):
+    """Step conversion and time-to-convert for an ordered funnel of event types.
+
+    Computed in one streaming pass over the events, so memory stays flat
+    however many events there are.
+    """
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    return funnel(db, parse_steps(steps), parse_window(window), since)
 
 
 @router.get("/explain")
-def analytics_explain(db: Session = Depends(get_db)):
+def analytics_explain(db: Session = Depends(get_read_db)):
     """Generate AI-powered insights from analytics data."""
+    ai_service = get_ai_service()
     
     # Gather all analytics data
     summary_data = analytics_summary(db=db)
@@ -317,8 +355,9 @@ def analytics_explain(db: Session = Depends(get_db)):
 
 
 @router.get("/explain/detailed")
-def analytics_explain_detailed(db: Session = Depends(get_db)):
+def analytics_explain_detailed(db: Session = Depends(get_read_db)):
     """Generate detailed AI-powered insights using OpenAI (when quota available)."""
+    ai_service = get_ai_service()
     
     if not ai_service.is_available():
         return {
@@ -349,21 +388,28 @@ def analytics_explain_detailed(db: Session = Depends(get_db)):
         context = ai_service._prepare_context(summary_dict, time_series_data, categories_data, risk_data)
         prompt = ai_service._create_analytics_prompt(context)
         
-        response = ai_service.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are an expert food waste reduction analyst providing detailed, actionable insights for FoodBridge. Provide strategic recommendations for platform optimization, community growth, and waste reduction impact."
-                },
-                {
-                    "role": "user", 
-                    "content": prompt + "\n\nProvide 6-8 detailed insights with specific recommendations and metrics."
-                }
-            ],
-            max_tokens=800,
-            temperature=0.7
-        )
+        started = time.perf_counter()
+        try:
+            with span("openai.chat", model="gpt-4o-mini"):
+                response = ai_service.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": "You are an expert food waste reduction analyst providing detailed, actionable insights for FoodBridge. Provide strategic recommendations for platform optimization, community growth, and waste reduction impact."
+                        },
+                        {
+                            "role": "user", 
+                            "content": prompt + "\n\nProvide 6-8 detailed insights with specific recommendations and metrics."
+                        }
+                    ],
+                    max_tokens=800,
+                    temperature=0.7
+                )
+        except Exception:
+            openai_latency.observe("error", value=time.perf_counter() - started)
+            raise
+        openai_latency.observe("ok", value=time.perf_counter() - started)
         
         content = response.choices[0].message.content
         insights = ai_service._parse_ai_response(content)
@@ -384,8 +430,12 @@ def analytics_explain_detailed(db: Session = Depends(get_db)):
 
 
 @router.get("/locations")
-def analytics_locations(db: Session = Depends(get_db), limit: int = Query(10, ge=1, le=50)):
+def analytics_locations(db: Session = Depends(get_read_db), limit: int = Query(10, ge=1, le=50)):
     """Get top locations by donation and claim activity."""
+    snapshot = _columnar_snapshot()
+    if snapshot is not None:
+        from app.services.snapshot_analytics import locations
+        return locations(snapshot, limit)
     
     # Top donation locations (by organization address)
     donation_locations = (
@@ -393,13 +443,13 @@ def analytics_locations(db: Session = Depends(get_db), limit: int = Query(10, ge
             Organization.address,
             Organization.lat,
             Organization.lng,
-            func.count(Item.id).label('donation_count')
+            func.count(ItemHistory.id).label('donation_count')
         )
-        .join(Item, Item.org_id == Organization.id)
+        .join(ItemHistory, ItemHistory.org_id == Organization.id)
         .filter(Organization.address.isnot(None))
-        .filter(Item.ready_at.isnot(None))
+        .filter(ItemHistory.ready_at.isnot(None))
         .group_by(Organization.address, Organization.lat, Organization.lng)
-        .order_by(func.count(Item.id).desc())
+        .order_by(func.count(ItemHistory.id).desc())
         .limit(limit)
         .all()
     )
@@ -410,18 +460,19 @@ def analytics_locations(db: Session = Depends(get_db), limit: int = Query(10, ge
             Organization.address,
             Organization.lat, 
             Organization.lng,
-            func.count(Item.id).label('claim_count')
+            func.count(ItemHistory.id).label('claim_count')
         )
-        .join(Item, Item.org_id == Organization.id)
+        .join(ItemHistory, ItemHistory.org_id == Organization.id)
         .filter(Organization.address.isnot(None))
-        .filter(Item.claimed_at.isnot(None))
+        .filter(ItemHistory.claimed_at.isnot(None))
         .group_by(Organization.address, Organization.lat, Organization.lng)
-        .order_by(func.count(Item.id).desc())
+        .order_by(func.count(ItemHistory.id).desc())
         .limit(limit)
         .all()
     )
     
     return {
+        "as_of": datetime.utcnow().isoformat(),
         "top_donation_locations": [
             {
                 "address": loc.address,
@@ -444,7 +495,7 @@ def analytics_locations(db: Session = Depends(get_db), limit: int = Query(10, ge
 
 
 @router.get("/contributors")
-def analytics_contributors(db: Session = Depends(get_db), limit: int = Query(10, ge=1, le=50)):
+def analytics_contributors(db: Session = Depends(get_read_db), limit: int = Query(10, ge=1, le=50)):
     """Get top donors and recipients by activity."""
     
     # Top donors (by items donated)
@@ -452,11 +503,11 @@ def analytics_contributors(db: Session = Depends(get_db), limit: int = Query(10,
         db.query(
             User.name,
             User.email,
-            func.count(Item.id).label('donations_count')
+            func.count(ItemHistory.id).label('donations_count')
         )
-        .join(Item, Item.donated_by_user_id == User.id)
+        .join(ItemHistory, ItemHistory.donated_by_user_id == User.id)
         .group_by(User.id, User.name, User.email)
-        .order_by(func.count(Item.id).desc())
+        .order_by(func.count(ItemHistory.id).desc())
         .limit(limit)
         .all()
     )
@@ -466,11 +517,11 @@ def analytics_contributors(db: Session = Depends(get_db), limit: int = Query(10,
         db.query(
             User.name,
             User.email,
-            func.count(Item.id).label('claims_count')
+            func.count(ItemHistory.id).label('claims_count')
         )
-        .join(Item, Item.claimed_by_user_id == User.id)
+        .join(ItemHistory, ItemHistory.claimed_by_user_id == User.id)
         .group_by(User.id, User.name, User.email)
-        .order_by(func.count(Item.id).desc())
+        .order_by(func.count(ItemHistory.id).desc())
         .limit(limit)
         .all()
     )
@@ -496,8 +547,12 @@ def analytics_contributors(db: Session = Depends(get_db), limit: int = Query(10,
 
 
 @router.get("/predictions")
-def analytics_predictions(db: Session = Depends(get_db)):
+def analytics_predictions(db: Session = Depends(get_read_db)):
     """Generate ML-style predictions for location and timing patterns."""
+    snapshot = _columnar_snapshot()
+    if snapshot is not None:
+        from app.services.snapshot_analytics import predictions
+        return predictions(snapshot)
     
     # Get location patterns for the last 30 days
     end_date = datetime.utcnow()
@@ -506,22 +561,22 @@ def analytics_predictions(db: Session = Depends(get_db)):
     # Hourly donation patterns
     hourly_donations = (
         db.query(
-            func.extract('hour', Item.ready_at).label('hour'),
-            func.count(Item.id).label('count')
+            func.extract('hour', ItemHistory.ready_at).label('hour'),
+            func.count(ItemHistory.id).label('count')
         )
-        .filter(Item.ready_at >= start_date)
-        .group_by(func.extract('hour', Item.ready_at))
+        .filter(ItemHistory.ready_at >= start_date)
+        .group_by(func.extract('hour', ItemHistory.ready_at))
         .all()
     )
     
     # Daily patterns
     daily_donations = (
         db.query(
-            func.extract('dow', Item.ready_at).label('day_of_week'),  # 0=Sunday, 6=Saturday
-            func.count(Item.id).label('count')
+            func.extract('dow', ItemHistory.ready_at).label('day_of_week'),  # 0=Sunday, 6=Saturday
+            func.count(ItemHistory.id).label('count')
         )
-        .filter(Item.ready_at >= start_date)
-        .group_by(func.extract('dow', Item.ready_at))
+        .filter(ItemHistory.ready_at >= start_date)
+        .group_by(func.extract('dow', ItemHistory.ready_at))
         .all()
     )
     
@@ -536,6 +591,7 @@ def analytics_predictions(db: Session = Depends(get_db)):
     day_names = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
     
     return {
+        "as_of": end_date.isoformat(),
         "hourly_patterns": [{"hour": h, "count": hour_data.get(h, 0)} for h in range(24)],
         "daily_patterns": [{"day": day_names[d], "day_number": d, "count": day_data.get(d, 0)} for d in range(7)],
         "predictions": {
@@ -2,34 +2,73 @@
 Authentication routes for user registration, login, and profile management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.db.session import get_db
-from app.models.models import User, Item
+from app.models.models import User
 from app.schemas.schemas import (
-    UserCreate, UserLogin, UserOut, TokenOut, UserProfile, UserDashboard, UserUpdate
+    UserCreate, UserLogin, UserOut, TokenOut, UserProfile, UserDashboard, UserUpdate, ActivityPage
 )
 from app.auth.auth import (
     hash_password, authenticate_user, create_access_token, get_current_user
 )
+from app.auth.passwords import password_pool
+from app.auth.user_cache import user_cache
+from app.auth.rate_limit import auth_rate_limiter
+from app.services.activity import activity_page, recent_items, activity_entry
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
+def _profile(user: User) -> UserProfile:
+    """Build the profile response from the user row's stored counters"""
+    return UserProfile(
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        phone=user.phone,
+        role=user.role,
+        verified=user.verified,
+        created_at=user.created_at,
+        total_claims=user.claim_count or 0,
+        total_donations=user.donation_count or 0,
+        quantity_rescued=user.quantity_rescued or 0.0,
+        last_activity_at=user.last_activity_at,
+    )
+
+
+def _email_taken(db: Session, email: str) -> bool:
+    taken = db.query(User.id).filter(User.email == email).first() is not None
+    db.rollback()  # release the connection while bcrypt runs
+    return taken
+
+
+def _save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+# Register and login are async so bcrypt is awaited on the password pool
+# without holding a request thread or a DB connection; their DB work goes
+# to the threadpool.
 @router.post("/register", response_model=UserOut)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, request: Request, db: Session = Depends(get_db)):
     """Register a new user"""
+    await run_in_threadpool(auth_rate_limiter.check, request, user_data.email)
+
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
+    if await run_in_threadpool(_email_taken, db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await password_pool.hash_async(user_data.password)
     user = User(
         name=user_data.name,
         email=user_data.email,
@@ -37,19 +76,16 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         role=user_data.role,
         password_hash=hashed_password
     )
-    
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    
-    return user
+    return await run_in_threadpool(_save_user, db, user)
 
 
 @router.post("/login", response_model=TokenOut)
-def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     """Login user and return access token"""
-    user = authenticate_user(user_data.email, user_data.password, db)
+    await run_in_threadpool(auth_rate_limiter.check, request, user_data.email)
+    user = await authenticate_user(user_data.email, user_data.password, db)
     if not user:
+        await run_in_threadpool(auth_rate_limiter.failed, user_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -72,81 +108,44 @@ def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
 @router.get("/me", response_model=UserProfile)
 def get_current_user_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current user's profile with statistics"""
-    # Count claims and donations
-    total_claims = db.query(func.count(Item.id)).filter(Item.claimed_by_user_id == current_user.id).scalar() or 0
-    total_donations = db.query(func.count(Item.id)).filter(Item.donated_by_user_id == current_user.id).scalar() or 0
-    
-    return UserProfile(
-        id=current_user.id,
-        name=current_user.name,
-        email=current_user.email,
-        phone=current_user.phone,
-        role=current_user.role,
-        verified=current_user.verified,
-        created_at=current_user.created_at,
-        total_claims=total_claims,
-        total_donations=total_donations
-    )
+    return _profile(current_user)
 
 
 @router.get("/dashboard", response_model=UserDashboard)
 def get_user_dashboard(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get user's dashboard with claimed and donated items"""
-    # Get claimed items
-    claimed_items = db.query(Item).filter(Item.claimed_by_user_id == current_user.id).order_by(Item.claimed_at.desc()).limit(10).all()
-    
-    # Get donated items
-    donated_items = db.query(Item).filter(Item.donated_by_user_id == current_user.id).order_by(Item.id.desc()).limit(10).all()
-    
-    # Generate recent activity
-    recent_activity = []
-    
-    # Add recent claims
-    for item in claimed_items[:5]:
-        recent_activity.append({
-            "type": "claim",
-            "message": f"You claimed '{item.title}'",
-            "timestamp": item.claimed_at,
-            "item_id": item.id
-        })
-    
-    # Add recent donations
-    for item in donated_items[:5]:
-        recent_activity.append({
-            "type": "donation",
-            "message": f"You donated '{item.title}'",
-            "timestamp": item.ready_at or item.id,  # Fallback to ID for sorting
-            "item_id": item.id
-        })
-    
-    # Sort by timestamp
-    recent_activity.sort(key=lambda x: x["timestamp"] if x["timestamp"] else 0, reverse=True)
-    recent_activity = recent_activity[:10]  # Keep only 10 most recent
-    
-    # Count totals
-    total_claims = len(claimed_items)
-    total_donations = len(donated_items)
-    
-    user_profile = UserProfile(
-        id=current_user.id,
-        name=current_user.name,
-        email=current_user.email,
-        phone=current_user.phone,
-        role=current_user.role,
-        verified=current_user.verified,
-        created_at=current_user.created_at,
-        total_claims=total_claims,
-        total_donations=total_donations
-    )
+    # Latest 10 claims and 10 donations come back together from one UNION ALL query
+    recent = recent_items(db, current_user.id, per_kind=10)
+    claimed_items = [item for item, _ in recent["claim"]]
+    donated_items = [item for item, _ in recent["donation"]]
+
+    # Generate recent activity from the same rows, newest first
+    recent_activity = [
+        activity_entry(kind, ts, item.id, item.title)
+        for kind in ("claim", "donation")
+        for item, ts in recent[kind][:5]
+    ]
+    recent_activity.sort(key=lambda x: (x["timestamp"], x["item_id"]), reverse=True)
     
     return UserDashboard(
-        user=user_profile,
+        user=_profile(current_user),
         claimed_items=claimed_items,
         donated_items=donated_items,
         recent_activity=recent_activity
     )
 
 
+@router.get("/activity", response_model=ActivityPage)
+def get_user_activity(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Page through the user's claims and donations, newest first"""
+    return activity_page(db, current_user.id, limit=limit, cursor=cursor)
+
+
 @router.put("/me", response_model=UserProfile)
 def update_current_user_profile(
     updates: UserUpdate,
@@ -164,19 +163,14 @@ def update_current_user_profile(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    user_cache.invalidate_user(current_user.id)
 
-    # Recompute quick stats
-    total_claims = db.query(func.count(Item.id)).filter(Item.claimed_by_user_id == current_user.id).scalar() or 0
-    total_donations = db.query(func.count(Item.id)).filter(Item.donated_by_user_id == current_user.id).scalar() or 0
+    return _profile(current_user)
 
-    return UserProfile(
-        id=current_user.id,
-        name=current_user.name,
-        email=current_user.email,
-        phone=current_user.phone,
-        role=current_user.role,
-        verified=current_user.verified,
-        created_at=current_user.created_at,
-        total_claims=total_claims,
-        total_donations=total_donations,
-    )
\ No newline at end of file
+
+@router.get("/cache/stats")
+def user_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit-rate statistics for the authenticated-user cache (admins only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user_cache.stats()
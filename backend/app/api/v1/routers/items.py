@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, Query, UploadFile, File, HTTPException
-from typing import Union, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, UploadFile, File, HTTPException
+from typing import List, Union, Optional
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.models import Item, Organization, User
-from app.schemas.schemas import ItemCreate, ItemOut, ItemClaim
+from app.db.session import get_db, get_read_db
+from app.models.models import ArchivedItem, Item, Organization, User
+from app.schemas.schemas import ItemCreate, ItemOut, ItemClaim, ItemsWithFacets
 from app.models.models import Event
 from app.auth.auth import get_current_user, get_current_user_optional
 from app.services.email import send_claim_notification_to_claimer, send_claim_notification_to_donor
+from app.services.counters import record_donation, record_claim
+from app.auth.user_cache import user_cache
+from app.services.attributes import ALLERGENS, STORAGE_TYPES, apply_attribute_filters, split_csv
+from app.services.facets import facet_cache, facets_for, parse_facets
+from app.services.pickup_windows import apply_available_between, parse_available_between
+from app.services.clusters import cluster_cache, clusters, parse_bbox
+from app.services.saved_searches import notify_new_items
+from app.services.suggest import suggest_index, suggestions
 import os
 import shutil
 from pathlib import Path
@@ -16,12 +24,12 @@ from datetime import datetime
 router = APIRouter(prefix="/items", tags=["items"])
 
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
 
 @router.post("/", response_model=ItemOut)
 def create_item(
     payload: ItemCreate, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
@@ -39,27 +47,94 @@ def create_item(
         status=payload.status,
         photo_url=payload.photo_url,
         donated_by_user_id=current_user.id if current_user else None,
+        created_at=datetime.utcnow(),
     )
     db.add(item)
+    record_donation(db, item.org_id, item.donated_by_user_id, item.created_at)
     db.commit()
     db.refresh(item)
+    if item.donated_by_user_id is not None:
+        user_cache.invalidate_user(item.donated_by_user_id)
+    if item.status == "listed":
+        suggest_index.item_listed(item.id, item.title, item.category, item.org_id, item.expires_at)
+    facet_cache.clear()
+    cluster_cache.invalidate()
+    # Saved-search alerts are matched and emailed after the response is sent
+    background_tasks.add_task(notify_new_items, [item.id])
     return item
 
 
-@router.get("/", response_model=list[ItemOut])
+@router.get("/", response_model=Union[list[ItemOut], ItemsWithFacets])
 def list_items(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     status: Union[str, None] = Query(None),
     q: Union[str, None] = Query(None, description="Search in title/description"),
     limit: int = Query(50, ge=1, le=200),
+    exclude_allergens: Optional[List[str]] = Query(None, description="Hide items containing any of these allergens"),
+    storage_type: Optional[List[str]] = Query(None, description="Only items with one of these storage types"),
+    sort: str = Query("expiry", pattern="^(expiry|risk)$", description="risk: listed, unexpired items most likely to go unclaimed first"),
+    facets: Optional[List[str]] = Query(None, description="Also return counts under these filters: category, storage_type, allergens, organization"),
+    available_between: Optional[str] = Query(None, description="start,end (ISO datetimes or 'now'): listed items whose pickup window overlaps it"),
 ):
+    window = parse_available_between(available_between)
     query = db.query(Item)
-    if status:
+    if status and not (window and status == "listed"):  # available_between already means listed
         query = query.filter(Item.status == status)
     if q:
         like = f"%{q}%"
         query = query.filter((Item.title.ilike(like)) | (Item.description.ilike(like)))
-    return query.order_by(Item.expires_at.is_(None), Item.expires_at.asc(), Item.id.desc()).limit(limit).all()
+    query = apply_attribute_filters(query, exclude_allergens, storage_type)
+    query = apply_available_between(query, window)
+    if sort == "risk":
+        # Risk ranks live inventory only, so facets count those same rows
+        now = datetime.utcnow()
+        query = query.filter(Item.status == "listed").filter((Item.expires_at.is_(None)) | (Item.expires_at >= now))
+        items = _items_by_risk(db, query, limit, now)
+    else:
+        items = query.order_by(Item.expires_at.is_(None), Item.expires_at.asc(), Item.id.desc()).limit(limit).all()
+    if not facets:
+        return items
+    # The raw available_between text, not the parsed window: "now" would make every key new
+    signature = (status, q, tuple(sorted(split_csv(exclude_allergens))), tuple(sorted(split_csv(storage_type))),
+                 available_between, sort)
+    return {"items": items, "facets": facets_for(db, query, parse_facets(split_csv(facets)), signature)}
+
+
+def _items_by_risk(db: Session, query, limit: int, now: datetime) -> list[Item]:
+    """Rank every item of ``query`` (live items) in one batched model call, then load only the top ``limit``"""
+    from app.services.claim_model import score_inventory, top_indices
+
+    rows, risk, _ = score_inventory(db, query, now)
+    ids = [rows[i].id for i in top_indices(risk, limit)]
+    by_id = {item.id: item for item in db.query(Item).filter(Item.id.in_(ids)).all()} if ids else {}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+@router.get("/suggest")
+def suggest_items(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+):
+    """Title, category and organization completions for the search box, most live items first"""
+    return {"prefix": prefix, "suggestions": suggestions(db, prefix, limit)}
+
+
+@router.get("/clusters")
+def item_clusters(
+    bbox: str = Query(..., description="min_lng,min_lat,max_lng,max_lat"),
+    zoom: int = Query(..., ge=0, le=22),
+    max_clusters: int = Query(300, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """Listed items aggregated into map clusters (count, centroid, category mix) for the viewport"""
+    return clusters(db, parse_bbox(bbox), zoom, max_clusters)
+
+
+@router.get("/attributes")
+def item_attributes():
+    """Allergen and storage vocabularies accepted by the list filters"""
+    return {"allergens": ALLERGENS, "storage_types": STORAGE_TYPES}
 
 
 @router.post("/upload-image/")
@@ -70,6 +145,7 @@ async def upload_image(file: UploadFile = File(...)):
     
     file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
     filename = f"{os.urandom(8).hex()}.{file_extension}"
+    UPLOAD_DIR.mkdir(exist_ok=True)
     file_path = UPLOAD_DIR / filename
     
     with open(file_path, "wb") as buffer:
@@ -106,9 +182,15 @@ def claim_item(
     item.claimed_by_email = claim_data.claimer_email
     item.claimed_at = datetime.utcnow()
     item.claimed_by_user_id = current_user.id if current_user else None
+    record_claim(db, item.org_id, item.claimed_by_user_id, item.quantity, item.claimed_at)
     
     db.commit()
     db.refresh(item)
+    if item.claimed_by_user_id is not None:
+        user_cache.invalidate_user(item.claimed_by_user_id)
+    suggest_index.item_unlisted(item.id)
+    facet_cache.clear()
+    cluster_cache.invalidate()
     
     # Send email notifications
     try:
@@ -159,9 +241,12 @@ def claim_item(
 
 
 @router.get("/{item_id}", response_model=ItemOut)
-def get_item_details(item_id: int, db: Session = Depends(get_db)):
+def get_item_details(item_id: int, db: Session = Depends(get_read_db)):
     """Get detailed information about a specific item including pickup details"""
     item = db.query(Item).filter(Item.id == item_id).first()
+    if not item:
+        # Old claimed/expired items live in items_archive (app.services.archive)
+        item = db.query(ArchivedItem).filter(ArchivedItem.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
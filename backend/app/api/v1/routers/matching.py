@@ -0,0 +1,28 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.auth.auth import get_current_user
+from app.db.session import get_read_db
+from app.models.models import User
+from app.schemas.schemas import MatchingResult
+
+
+router = APIRouter(prefix="/matching", tags=["matching"])
+
+
+# A GET: it writes nothing, so running it doesn't pin the admin's reads to the primary
+@router.get("/run", response_model=MatchingResult)
+def run_matching(
+    org_ids: Optional[List[int]] = Query(None, description="recipient orgs to match against (default: recipient types)"),
+    max_distance_km: Optional[float] = Query(None, gt=0),
+    speed_kmh: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Propose item -> recipient org assignments for the whole live inventory (admins only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    # numpy is only imported once matching is actually used
+    from app.services.matching import run_matching as match
+
+    return match(db, org_ids, max_distance_km, speed_kmh)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.models.models import Organization
 from app.schemas.schemas import OrganizationCreate, OrganizationOut
+from app.services.suggest import suggest_index
 
 
 router = APIRouter(prefix="/orgs", tags=["organizations"])
@@ -19,15 +20,24 @@ def create_org(payload: OrganizationCreate, db: Session = Depends(get_db)):
         phone=payload.phone,
         email=payload.email,
         capacity_json=payload.capacity_json,
+        timezone=payload.timezone,
     )
     db.add(org)
     db.commit()
     db.refresh(org)
+    suggest_index.org_added(org.id, org.name)
     return org
 
 
 @router.get("/", response_model=list[OrganizationOut])
-def list_orgs(db: Session = Depends(get_db)):
+def list_orgs(db: Session = Depends(get_read_db)):
     return db.query(Organization).order_by(Organization.id.desc()).limit(100).all()
 
 
+@router.get("/{org_id}", response_model=OrganizationOut)
+def get_org(org_id: int, db: Session = Depends(get_read_db)):
+    """Organization details, including its stored donation/claim counters"""
+    org = db.query(Organization).filter(Organization.id == org_id).first()
+    if not org:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return org
@@ -3,6 +3,9 @@ from .auth import router as auth_router
 from .orgs import router as orgs_router
 from .items import router as items_router
 from .analytics import router as analytics_router
+from .matching import router as matching_router
+from .searches import router as searches_router
+from .volunteer import router as volunteer_router
 
 api_router = APIRouter()
 
@@ -10,5 +13,6 @@ api_router.include_router(auth_router)
 api_router.include_router(orgs_router)
 api_router.include_router(items_router)
 api_router.include_router(analytics_router)
-
-
+api_router.include_router(matching_router)
+api_router.include_router(searches_router)
+api_router.include_router(volunteer_router)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.auth.auth import get_current_user
+from app.core.config import get_settings
+from app.db.session import get_db
+from app.models.models import SavedSearch, User
+from app.schemas.schemas import SavedSearchCreate, SavedSearchOut
+from app.services.attributes import normalize_allergen
+from app.services.saved_searches import Subscription, saved_search_out, subscription_index
+
+
+router = APIRouter(prefix="/searches", tags=["searches"])
+
+
+@router.post("/", response_model=SavedSearchOut)
+def create_saved_search(
+    payload: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Save a search; new items that match it are emailed to the user"""
+    geo = (payload.lat, payload.lng, payload.radius_km)
+    if any(v is not None for v in geo) and not all(v is not None for v in geo):
+        raise HTTPException(status_code=400, detail="lat, lng and radius_km must be given together")
+
+    active = db.query(SavedSearch).filter(
+        SavedSearch.user_id == current_user.id, SavedSearch.active.is_(True)
+    ).count()
+    if active >= get_settings().saved_search_max_per_user:
+        raise HTTPException(status_code=400, detail="Saved search limit reached")
+
+    now = datetime.utcnow()
+    search = SavedSearch(
+        user_id=current_user.id,
+        name=payload.name,
+        category=payload.category or None,
+        keywords_json=[k.strip() for k in payload.keywords if k.strip()],
+        lat=payload.lat,
+        lng=payload.lng,
+        radius_km=payload.radius_km,
+        exclude_allergens_json=sorted({normalize_allergen(a) for a in payload.exclude_allergens if a.strip()}),
+        active=True,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(search)
+    db.commit()
+    db.refresh(search)
+    subscription_index.add(Subscription.from_row(search))
+    return saved_search_out(search)
+
+
+@router.get("/", response_model=list[SavedSearchOut])
+def list_saved_searches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    searches = db.query(SavedSearch).filter(
+        SavedSearch.user_id == current_user.id, SavedSearch.active.is_(True)
+    ).order_by(SavedSearch.created_at.desc()).all()
+    return [saved_search_out(s) for s in searches]
+
+
+@router.delete("/{search_id}")
+def delete_saved_search(
+    search_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    search = db.query(SavedSearch).filter(
+        SavedSearch.id == search_id, SavedSearch.user_id == current_user.id, SavedSearch.active.is_(True)
+    ).first()
+    if not search:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Saved search not found")
+    # Deactivate rather than delete so other workers' index syncs see the change
+    search.active = False
+    search.updated_at = datetime.utcnow()
+    db.commit()
+    subscription_index.remove(search_id)
+    return {"deleted": search_id}
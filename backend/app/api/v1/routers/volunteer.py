@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.auth.auth import get_current_user
+from app.core.config import get_settings
+from app.db.session import get_read_db
+from app.models.models import User
+from app.schemas.schemas import RouteRequest, RouteResult
+
+
+router = APIRouter(prefix="/volunteer", tags=["volunteer"])
+
+
+@router.post("/route", response_model=RouteResult)
+def plan_route(
+    payload: RouteRequest,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Order a volunteer's pickups into a short route that reaches each one inside its time window"""
+    max_stops = get_settings().route_max_stops
+    if len(set(payload.item_ids)) > max_stops:
+        raise HTTPException(status_code=400, detail=f"At most {max_stops} pickups per route")
+    # numpy is only imported once routing is actually used
+    from app.services.routing import plan_route as plan
+
+    return plan(
+        db,
+        payload.start_lat,
+        payload.start_lng,
+        payload.item_ids,
+        start_time=payload.start_time,
+        speed_kmh=payload.speed_kmh,
+        service_minutes=payload.service_minutes,
+        return_to_start=payload.return_to_start,
+    )
@@ -2,15 +2,17 @@
 Authentication utilities for JWT tokens and password hashing
 """
 
-import bcrypt
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.models import User
+from app.auth.user_cache import user_cache
+from app.auth.passwords import password_pool
 
 # JWT settings
 SECRET_KEY = "your-super-secret-key-change-in-production"  # In production, use environment variable
@@ -21,15 +23,13 @@ security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    """Hash a password using bcrypt on the password pool"""
+    return password_pool.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    """Verify a password against its hash on the password pool"""
+    return password_pool.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -64,23 +64,33 @@ def verify_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user"""
-    token = credentials.credentials
+def _load_user(token: str, db: Session) -> Optional[User]:
+    """Resolve a bearer token to a user, serving repeat tokens from the user cache"""
+    user = user_cache.get(token, db)
+    if user is not None:
+        return user
+
     payload = verify_token(token)
     user_id = payload.get("sub")
-    
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     user = db.query(User).filter(User.id == int(user_id)).first()
+    if user is not None:
+        user_cache.put(token, user, token_exp=payload.get("exp"))
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current authenticated user"""
+    user = _load_user(credentials.credentials, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -100,22 +110,38 @@ def get_current_user_optional(
         return None
     
     try:
-        token = credentials.credentials
-        payload = verify_token(token)
-        user_id = payload.get("sub")
-        
-        if user_id is None:
-            return None
-        
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        return user
+        return _load_user(credentials.credentials, db)
     except:
         return None
 
 
-def authenticate_user(email: str, password: str, db: Session) -> Optional[User]:
-    """Authenticate a user by email and password"""
+def _find_user(db: Session, email: str) -> Optional[User]:
+    """Load the user detached, and end the transaction so no connection is held during bcrypt"""
     user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
+    if user is not None:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+
+def _store_hash(db: Session, user_id: int, password_hash: str) -> None:
+    db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+    db.commit()
+
+
+async def authenticate_user(email: str, password: str, db: Session) -> Optional[User]:
+    """Authenticate a user by email and password
+
+    Called from async routes: DB work runs on the threadpool, bcrypt is
+    awaited on the password pool, so neither a thread nor a pooled
+    connection waits on the hash.
+    """
+    user = await run_in_threadpool(_find_user, db, email)
+    if not user or not await password_pool.verify_async(password, user.password_hash):
         return None
+
+    # Transparently upgrade hashes made with an old cost factor
+    if password_pool.needs_rehash(user.password_hash):
+        user.password_hash = await password_pool.hash_async(password)
+        await run_in_threadpool(_store_hash, db, user.id, user.password_hash)
     return user
@@ -0,0 +1,88 @@
+"""
+Password hashing on a dedicated, bounded worker pool
+
+bcrypt burns 100-300 ms of CPU per call. Running it inline in sync route
+handlers let a login storm tie up every threadpool worker the rest of the API
+shares. Hashing now runs on its own small pool with a hard queue limit: once
+the limit is reached new password operations fail fast with a 503 instead of
+piling up behind each other.
+
+Login and registration are async and await the pool (``verify_async``,
+``hash_async``), so they hold no request thread while bcrypt runs. The sync
+``hash``/``verify`` remain for the rare password change and for scripts;
+they block their calling thread, bounded by the same queue limit.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from app.core.config import get_settings
+from app.core.tracing import span
+
+settings = get_settings()
+
+
+class PasswordPool:
+    """Runs bcrypt calls on a fixed number of threads with a bounded backlog"""
+
+    def __init__(self, workers: int, queue_limit: int, rounds: int):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        # Running + queued operations; bcrypt releases the GIL so threads are enough
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until bcrypt finishes, even if the awaiting request is cancelled
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        with span("bcrypt", op=fn.__name__):
+            return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        with span("bcrypt", op=fn.__name__):
+            return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    async def hash_async(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return (await self._run_async(bcrypt.hashpw, password.encode('utf-8'), salt)).decode('utf-8')
+
+    async def verify_async(self, password: str, hashed: str) -> bool:
+        return await self._run_async(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when ``hashed`` was produced with a different cost factor"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_pool = PasswordPool(
+    workers=settings.password_pool_workers,
+    queue_limit=settings.password_pool_queue_limit,
+    rounds=settings.password_hash_rounds,
+)
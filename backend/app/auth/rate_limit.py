@@ -0,0 +1,219 @@
+"""
+Token-bucket rate limiting for the login and registration endpoints
+
+Every failed login costs a full bcrypt verification, so credential-stuffing
+traffic has to be turned away before any hashing happens. Every attempt
+takes a token from a per-client-IP bucket; a per-normalized-email bucket is
+only charged when the password check fails, so an owner's own logins (and an
+attacker's guesses from elsewhere, short of emptying it) don't lock the owner
+out. An empty bucket answers 429 with a Retry-After header.
+
+Behind a proxy every connection comes from the proxy's address, so the
+per-IP key is taken from X-Forwarded-For when the peer is a trusted proxy
+(``trusted_proxy_cidrs``); see ``client_ip``.
+
+Buckets live in process memory by default (LRU-bounded). Set
+AUTH_RATE_LIMIT_BACKEND=database to share them across workers through the
+``rate_limit_buckets`` table.
+"""
+
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.models import RateLimitBucket
+
+settings = get_settings()
+
+
+class MemoryBucketBackend:
+    """Token buckets in a bounded LRU; the least recently used buckets are evicted first"""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, refill_per_second: float, now: float, cost: float = 1) -> float:
+        """Take ``cost`` tokens from ``key``; return 0 if allowed, else seconds until one is available.
+
+        ``cost=0`` only checks the bucket.
+        """
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= cost
+            else:
+                wait = (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBucketBackend:
+    """Token buckets stored in the database so every worker sees the same state"""
+
+    # Prune idle buckets once every this many takes
+    PRUNE_EVERY = 1000
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._takes = 0
+
+    @staticmethod
+    def _create_missing(db: Session, key: str, capacity: float, now: float) -> None:
+        """Insert a full bucket for ``key`` unless a concurrent request already did"""
+        values = {"key": key, "tokens": capacity, "updated_at": now}
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            db.execute(insert(RateLimitBucket).values(**values).on_conflict_do_nothing(index_elements=["key"]))
+            return
+        try:
+            with db.begin_nested():
+                db.add(RateLimitBucket(**values))
+        except IntegrityError:
+            pass
+
+    def take(self, key: str, capacity: float, refill_per_second: float, now: float, cost: float = 1) -> float:
+        db: Session = self.session_factory()
+        try:
+            # Insert-if-missing first, so two first requests for a new key can't
+            # both miss the locking select and then collide on the primary key
+            self._create_missing(db, key, capacity, now)
+            bucket = (
+                db.query(RateLimitBucket)
+                .filter(RateLimitBucket.key == key)
+                .with_for_update()
+                .one()
+            )
+            tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * refill_per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= cost
+            else:
+                wait = (1 - tokens) / refill_per_second
+            bucket.tokens = tokens
+            bucket.updated_at = now
+
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                # A bucket idle for a day has long since refilled, so dropping it is lossless
+                db.query(RateLimitBucket).filter(RateLimitBucket.updated_at < now - 86400).delete()
+            db.commit()
+            return wait
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def reset(self) -> None:
+        db: Session = self.session_factory()
+        try:
+            db.query(RateLimitBucket).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+class AuthRateLimiter:
+    """Per-IP and per-email token buckets in front of password checks"""
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    def check(self, request: Request, email: Optional[str] = None) -> None:
+        """Consume the caller's IP token, raising 429 when it or ``email``'s bucket is empty.
+
+        The email bucket is only looked at here; ``failed`` charges it.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        waits = [self.backend.take(
+            f"ip:{client_ip(request)}",
+            settings.auth_rate_limit_ip_capacity,
+            settings.auth_rate_limit_ip_per_minute / 60.0,
+            now,
+        )]
+        if email:
+            waits.append(self._take_email(email, now, cost=0))
+        retry_after = max(waits)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def failed(self, email: str) -> None:
+        """Charge ``email``'s bucket for a failed password check."""
+        if self.enabled:
+            self._take_email(email, time.time())
+
+    def _take_email(self, email: str, now: float, cost: float = 1) -> float:
+        return self.backend.take(
+            f"email:{normalize_email(email)}",
+            settings.auth_rate_limit_email_capacity,
+            settings.auth_rate_limit_email_per_minute / 60.0,
+            now,
+            cost,
+        )
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+_trusted_networks = [ipaddress.ip_network(cidr) for cidr in settings.trusted_proxy_cidrs]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks)
+
+
+def client_ip(request: Request) -> str:
+    """Address of the client, looking through X-Forwarded-For when the peer is a trusted proxy"""
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    # Proxies append, so the rightmost untrusted hop is the last address a proxy saw
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def _build_backend():
+    if settings.auth_rate_limit_backend == "database":
+        return DatabaseBucketBackend()
+    return MemoryBucketBackend(max_buckets=settings.auth_rate_limit_max_buckets)
+
+
+auth_rate_limiter = AuthRateLimiter(_build_backend(), enabled=settings.auth_rate_limit_enabled)
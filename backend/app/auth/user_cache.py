@@ -0,0 +1,152 @@
+"""
+In-process cache of authenticated user principals
+
+Dashboard screens fire several authenticated API calls at once, and each one
+used to decode the JWT and load the user row. This cache remembers the user
+columns per token for a short TTL so repeat requests skip both steps.
+
+The cache is per process: invalidation only reaches the current worker, so the
+TTL bounds how long other workers can serve a stale role or verification flag.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import User
+
+# Never keep credentials in the cache; they load lazily when a route needs them
+_EXCLUDED_COLUMNS = {"password_hash"}
+
+
+class UserCache:
+    """Bounded LRU + TTL cache mapping a bearer token to a user snapshot"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[int, float, dict[str, Any]]]" = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str, db: Session) -> Optional[User]:
+        """Return the cached user for ``token`` attached to ``db``, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            snapshot = entry[2]
+
+        # Rebuild a fresh instance per request so sessions never share objects
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
+    def put(self, token: str, user: User, token_exp: Optional[float] = None) -> None:
+        """Cache ``user`` for ``token`` until the TTL or the token's own expiry."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, time.monotonic() + (token_exp - time.time()))
+        snapshot = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in _EXCLUDED_COLUMNS
+        }
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (user.id, expires_at, snapshot)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token for ``user_id``."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, token: str) -> None:
+        # Caller holds the lock
+        user_id, _, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+settings = get_settings()
+user_cache = UserCache(
+    max_entries=settings.user_cache_max_entries,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+register_cache("user", user_cache.stats)
+
+
+_PENDING_KEY = "user_cache_evict"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User):
+    """Any ORM write to a user (role, verification, profile) evicts their cached principal.
+
+    The flush only notes the id: evicting before commit would let a concurrent
+    request re-cache the old row in between.
+    """
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed(session: Session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        user_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop(_PENDING_KEY, None)
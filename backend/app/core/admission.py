@@ -0,0 +1,229 @@
+"""
+Admission control: per-class and per-route concurrency limits with load shedding
+
+Sync route handlers run on one shared threadpool (40 threads by default)
+and draw on one DB pool. A burst of heavy analytics (series, cohorts,
+explain/detailed) could take every thread and connection, so claims and
+listings timed out behind them. Each request is now admitted before it
+reaches a handler:
+
+- Requests fall into priority classes: ``critical`` (writes: claims,
+  listings, sign-in), ``interactive`` (browsing reads) and ``analytics``
+  (dashboards and batch jobs; not the funnel's event writes, which are
+  ``admission_interactive_paths``). Each class has a concurrency limit, a wait
+  queue of bounded length and a maximum queue wait; busy routes can have
+  their own, tighter limit as well (``admission_route_limits``).
+- All classes share ``admission_max_in_flight``. The lower classes' limits
+  add up to less than that, so writes always have threads left.
+- A freed slot goes to the highest class with a waiter that fits. While a
+  higher class has requests waiting, analytics is shed on arrival rather
+  than queued, so overload degrades analytics first.
+- A request that finds its queue full, or waits past its deadline, gets a
+  fast 503 with ``Retry-After`` instead of holding a connection open.
+
+State is per process and only touched from the event loop, so it needs no
+locks. /health and /metrics are never limited.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+from app.core.tracing import span
+
+# Highest priority first
+CLASSES = ("critical", "interactive", "analytics")
+_READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+admission_rejected = registry.register(Counter(
+    "foodbridge_admission_rejected_total", "Requests shed with a 503, by class and reason", ("class", "reason")))
+admission_wait = registry.register(Histogram(
+    "foodbridge_admission_wait_seconds", "Time admitted requests spent queued", ("class",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+
+
+@dataclass
+class _Waiter:
+    route: str
+    future: asyncio.Future
+
+
+@dataclass
+class _Class:
+    name: str
+    limit: int
+    queue_limit: int
+    max_wait: float
+    retry_after: int
+    in_flight: int = 0
+    waiters: deque = field(default_factory=deque)
+
+
+def classify(method: str, path: str, config: Settings) -> Optional[str]:
+    """Priority class of a request, or None when it is never limited"""
+    if path in config.admission_exempt_paths:
+        return None
+    if path in config.admission_interactive_paths:
+        return "interactive"
+    if any(path.startswith(prefix) for prefix in config.admission_analytics_prefixes):
+        return "analytics"
+    return "interactive" if method in _READ_METHODS else "critical"
+
+
+class AdmissionController:
+    def __init__(self, config: Settings):
+        self.max_in_flight = config.admission_max_in_flight
+        self.route_limits = dict(config.admission_route_limits)
+        self.classes = {
+            name: _Class(
+                name,
+                limit=config.admission_limits[name],
+                queue_limit=config.admission_queue[name],
+                max_wait=config.admission_wait_ms[name] / 1000,
+                retry_after=config.admission_retry_after_seconds[name],
+            )
+            for name in CLASSES
+        }
+        self.in_flight = 0
+        self.route_in_flight: dict[str, int] = {}
+
+    def _fits(self, cls: _Class, route: str) -> bool:
+        limit = self.route_limits.get(route)
+        return (
+            self.in_flight < self.max_in_flight
+            and cls.in_flight < cls.limit
+            and (limit is None or self.route_in_flight.get(route, 0) < limit)
+        )
+
+    def _higher_waiting(self, cls: _Class) -> bool:
+        for name in CLASSES:
+            if name == cls.name:
+                return False
+            if self.classes[name].waiters:
+                return True
+        return False
+
+    def _take(self, cls: _Class, route: str) -> None:
+        self.in_flight += 1
+        cls.in_flight += 1
+        self.route_in_flight[route] = self.route_in_flight.get(route, 0) + 1
+
+    def release(self, class_name: str, route: str) -> None:
+        cls = self.classes[class_name]
+        self.in_flight -= 1
+        cls.in_flight -= 1
+        remaining = self.route_in_flight[route] - 1
+        if remaining:
+            self.route_in_flight[route] = remaining
+        else:
+            del self.route_in_flight[route]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest class first (FIFO within a class)"""
+        for name in CLASSES:
+            cls = self.classes[name]
+            for waiter in list(cls.waiters):
+                if self.in_flight >= self.max_in_flight:
+                    return
+                if waiter.future.done() or not self._fits(cls, waiter.route):
+                    continue
+                cls.waiters.remove(waiter)
+                self._take(cls, waiter.route)
+                waiter.future.set_result(None)
+
+    async def acquire(self, class_name: str, route: str) -> Optional[str]:
+        """Admit the request (possibly after queueing); returns None, or why it was shed"""
+        cls = self.classes[class_name]
+        if not cls.waiters and not self._higher_waiting(cls) and self._fits(cls, route):
+            self._take(cls, route)
+            return None
+        if class_name == "analytics" and self._higher_waiting(cls):
+            return "pressure"
+        if len(cls.waiters) >= cls.queue_limit or cls.max_wait <= 0:
+            return "queue_full"
+
+        waiter = _Waiter(route, asyncio.get_running_loop().create_future())
+        cls.waiters.append(waiter)
+        # Waiters ahead of it may only be held back by their own route's limit
+        self._dispatch()
+        started = time.perf_counter()
+        try:
+            with span("admission.wait", priority=class_name):
+                await asyncio.wait_for(asyncio.shield(waiter.future), cls.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # The client went away while queued
+            if waiter.future.done():
+                self.release(class_name, route)
+            else:
+                waiter.future.cancel()
+                cls.waiters.remove(waiter)
+            raise
+        if not waiter.future.done():
+            waiter.future.cancel()
+            cls.waiters.remove(waiter)
+            return "timeout"
+        admission_wait.observe(class_name, value=time.perf_counter() - started)
+        return None
+
+    def stats(self):
+        for name in CLASSES:
+            cls = self.classes[name]
+            yield (name, "in_flight"), float(cls.in_flight)
+            yield (name, "queued"), float(len(cls.waiters))
+
+
+async def _reject(send, retry_after: int, reason: str) -> None:
+    body = json.dumps({"detail": "Server is busy, please retry shortly", "reason": reason}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+admission = AdmissionController(get_settings())
+registry.register(Gauge(
+    "foodbridge_admission_requests", "Requests admitted (in_flight) or waiting (queued), by class",
+    ("class", "state"), callback=admission.stats))
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware in front of the routers, see the module docstring"""
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+        self.config = get_settings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.config.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+        path = scope.get("path", "")
+        class_name = classify(scope.get("method", ""), path, self.config)
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire(class_name, path)
+        if reason is not None:
+            admission_rejected.inc(class_name, reason)
+            await _reject(send, self.controller.classes[class_name].retry_after, reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(class_name, path)
@@ -12,8 +12,159 @@ class Settings(BaseSettings):
     # Database URL with Railway fallback
     database_url: str = "sqlite:///./database.db"
 
+    # Read replicas for read-only routes (analytics, list/detail GETs). Empty
+    # means every query goes to database_url. After a client writes, its reads
+    # stay on the primary for read_your_writes_seconds.
+    database_replica_urls: list[str] = []
+    read_your_writes_seconds: float = 5.0
+
+    # SQLite tuning. "default" keeps SQLite's stock settings (rollback journal,
+    # synchronous=FULL); "production" applies the pragmas below to every new
+    # connection and checkpoints the WAL in the background.
+    sqlite_profile: str = "default"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_wal_checkpoint_seconds: float = 300.0
+    # Set when `backup_database.py ship-wal` runs: app connections stop
+    # checkpointing so the shipper can copy every frame before it is folded back
+    sqlite_wal_shipping: bool = False
+
+    # Backups (backup_database.py): online-backup step size and pause, retention
+    backup_dir: str = "backups"
+    backup_step_pages: int = 256
+    backup_step_sleep_ms: float = 20.0
+    backup_keep: int = 10
+    backup_keep_days: float = 30.0
+    backup_wal_ship_seconds: float = 10.0
+    backup_wal_checkpoint_frames: int = 1000
+
+    # Columnar analytics snapshots (analytics_snapshot.py): where they're written,
+    # how many to keep, and how old the newest may get before cohorts,
+    # locations and predictions go back to querying the database
+    analytics_snapshot_dir: str = "analytics_snapshots"
+    analytics_snapshot_keep: int = 3
+    analytics_snapshot_max_age_hours: float = 26.0
+
+    # Claim-probability model written by train_claim_model.py; the risk panel
+    # falls back to the time-pressure heuristic while it doesn't exist. Each
+    # worker recomputes the per-org claim history it scores with this often.
+    claim_model_path: str = "artifacts/claim_model.npz"
+    claim_model_history_seconds: float = 300.0
+
+    # Archival (archive_items.py): items claimed, or expired unclaimed, more than
+    # archive_after_days ago move to items_archive, batch_size rows per
+    # transaction with a pause between batches for app writes
+    archive_after_days: float = 30.0
+    archive_batch_size: int = 1000
+    archive_batch_pause_ms: int = 50
+
+    # Run the schema migration from the startup hook. Off by default so new
+    # replicas don't pay for DDL on boot; run `python -m app.db.migrate` instead.
+    auto_migrate: bool = False
+
     cors_origins: list[str] = ["*"]
 
+    # Admission control (app.core.admission): per-process concurrency limit,
+    # wait-queue length, longest queue wait and the Retry-After sent with a 503,
+    # per priority class. Critical must keep headroom: the other classes' limits
+    # should add up to less than admission_max_in_flight (the threadpool size).
+    admission_enabled: bool = True
+    admission_max_in_flight: int = 40
+    admission_limits: dict[str, int] = {"critical": 40, "interactive": 24, "analytics": 4}
+    admission_queue: dict[str, int] = {"critical": 100, "interactive": 50, "analytics": 8}
+    admission_wait_ms: dict[str, int] = {"critical": 5000, "interactive": 1000, "analytics": 250}
+    admission_retry_after_seconds: dict[str, int] = {"critical": 1, "interactive": 1, "analytics": 10}
+    # Exact paths with their own, tighter limit inside their class
+    admission_route_limits: dict[str, int] = {
+        "/api/v1/analytics/series": 2,
+        "/api/v1/analytics/cohorts": 2,
+        "/api/v1/analytics/explain/detailed": 1,
+    }
+    admission_analytics_prefixes: list[str] = ["/api/v1/analytics", "/api/v1/matching"]
+    # Exact paths under those prefixes that aren't analytics work (funnel event ingestion)
+    admission_interactive_paths: list[str] = ["/api/v1/analytics/events"]
+    admission_exempt_paths: list[str] = ["/", "/health", "/metrics"]
+
+    # Request tracing (app.core.tracing): share of requests sampled on arrival
+    # (0 turns span recording off; trace ids are still issued), where the
+    # rotating traces.jsonl goes, and bounds on the export queue and trace size
+    tracing_sample_rate: float = 0.0
+    tracing_dir: str = "traces"
+    tracing_file_max_mb: float = 50.0
+    tracing_file_backups: int = 5
+    tracing_queue_size: int = 10_000
+    tracing_max_spans: int = 1000
+
+    # Password hashing: bcrypt cost factor and the dedicated pool that runs it.
+    # Changing the cost rehashes stored passwords on each user's next login.
+    password_hash_rounds: int = 12
+    password_pool_workers: int = 2
+    password_pool_queue_limit: int = 16
+
+    # Login/registration rate limiting (token buckets per client IP and per email).
+    # Backend "memory" is per process; "database" shares buckets across workers.
+    auth_rate_limit_enabled: bool = True
+    auth_rate_limit_backend: str = "memory"
+    auth_rate_limit_max_buckets: int = 100_000
+    auth_rate_limit_ip_capacity: float = 20
+    auth_rate_limit_ip_per_minute: float = 20
+    auth_rate_limit_email_capacity: float = 5
+    auth_rate_limit_email_per_minute: float = 1
+    # Peers whose X-Forwarded-For is believed (Railway/Render/compose proxies sit
+    # on private networks). The client is the rightmost forwarded address outside
+    # these ranges, so entries a client prepends itself are ignored.
+    trusted_proxy_cidrs: list[str] = [
+        "127.0.0.0/8", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "::1/128", "fc00::/7",
+    ]
+
+    # Authenticated-user cache (per process); set max entries to 0 to disable
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 10_000
+
+    # Batch matching (GET /matching/run): recipient org types matched by default,
+    # the furthest an item may travel, and the speed used to rule out pickups
+    # that would arrive after the food expires
+    matching_recipient_types: list[str] = ["Food Bank", "Charity", "Community Center", "Shelter"]
+    matching_max_distance_km: float = 50.0
+    matching_speed_kmh: float = 30.0
+
+    # Saved-search alerts: geo cell size of the subscription index, how often
+    # each worker picks up searches changed by other workers, how far each sync
+    # reaches back before the newest change it has seen (must cover the longest
+    # gap between stamping updated_at and committing, plus clock skew between
+    # hosts), per-user cap
+    saved_search_cell_degrees: float = 0.5
+    saved_search_sync_seconds: float = 30.0
+    saved_search_sync_overlap_seconds: float = 120.0
+    saved_search_max_per_user: int = 20
+
+    # Type-ahead suggestions (GET /items/suggest): how often each worker reloads
+    # its prefix index to pick up listings created or claimed by other workers
+    suggest_refresh_seconds: float = 300.0
+
+    # Browse facet counts (GET /items?facets=...), cached per filter combination
+    facet_cache_seconds: float = 30.0
+    facet_cache_max_entries: int = 1000
+
+    # Map clustering (GET /items/clusters): grid cells per 256px map tile side
+    # (4 -> ~64px cells) and how long per-zoom grids are reused across workers
+    cluster_cells_per_tile: int = 4
+    cluster_cache_seconds: float = 60.0
+
+    # Timezone donors' pickup-window clock times ("9 AM - 5 PM") are read in
+    # when their organization doesn't set one
+    pickup_timezone: str = "UTC"
+
+    # Volunteer routes (POST /volunteer/route): most pickups per request, minutes
+    # spent at each pickup, and the time allowed for 2-opt improvement
+    route_max_stops: int = 200
+    route_service_minutes: float = 5.0
+    route_time_budget_ms: int = 500
+
     # OpenAI Configuration
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"  # Cost-effective model
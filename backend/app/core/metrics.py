@@ -0,0 +1,305 @@
+"""
+Prometheus-style metrics, rendered in the text exposition format at /metrics
+
+Hot-path updates are lock-free: every thread writes to its own shard
+(a plain dict reached through ``threading.local``) and only the scrape walks
+and sums the shards. A lock is taken once per thread when its shard is
+registered, and by the scrape itself.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Sharded:
+    """Per-thread storage for one metric; the scrape merges the shards"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        # Copy each shard so concurrent writers can't change its size mid-iteration
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0.0) + amount
+
+    def samples(self):
+        totals: dict[tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        for labels, value in sorted(totals.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """A value read at scrape time from a callback, or set/added directly"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 callback: Optional[Callable[[], Iterable[tuple]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, *labelvalues, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def set(self, *labelvalues, value: float) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def samples(self):
+        if self.callback is not None:
+            # Callback yields (labelvalues tuple, value)
+            values = dict(self.callback())
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram(_Sharded):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labelvalues, value: float) -> None:
+        shard = self._shard()
+        state = shard.get(labelvalues)
+        if state is None:
+            # [count per bucket..., +Inf count, sum]
+            state = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def time(self, *labelvalues):
+        return _Timer(self, labelvalues)
+
+    def samples(self):
+        merged: dict[tuple, list] = {}
+        for shard in self._snapshot():
+            for labels, state in shard.items():
+                total = merged.setdefault(labels, [0] * len(state[:-1]) + [0.0])
+                for i, v in enumerate(state):
+                    total[i] += v
+        for labels, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, f'le="{le}"'), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), state[-1]
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labelvalues: tuple):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(*self.labelvalues, value=time.perf_counter() - self.started)
+        return False
+
+
+def _format_value(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "foodbridge_http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")))
+http_latency = registry.register(Histogram(
+    "foodbridge_http_request_duration_seconds", "HTTP request latency by route", ("route", "method")))
+http_in_flight = registry.register(Gauge(
+    "foodbridge_http_requests_in_flight", "HTTP requests currently being served"))
+sql_statements = registry.register(Counter(
+    "foodbridge_sql_statements_total", "SQL statements executed, by the route that issued them", ("route",)))
+pool_checkouts = registry.register(Counter(
+    "foodbridge_db_pool_checkouts_total", "Connections checked out of the pool", ("engine",)))
+pool_hold = registry.register(Histogram(
+    "foodbridge_db_pool_hold_seconds", "Time a pooled connection stays checked out", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+# Engines instrumented by instrument_engine and caches from register_cache, by name
+_pools: dict = {}
+_caches: dict[str, Callable[[], dict]] = {}
+pool_checked_out = registry.register(Gauge(
+    "foodbridge_db_pool_checked_out", "Connections currently checked out", ("engine",),
+    callback=lambda: [((name,), _pool_stat(pool, "checkedout")) for name, pool in list(_pools.items())]))
+pool_overflow = registry.register(Gauge(
+    "foodbridge_db_pool_overflow", "Connections opened beyond the pool size", ("engine",),
+    callback=lambda: [((name,), _pool_stat(pool, "overflow")) for name, pool in list(_pools.items())]))
+email_latency = registry.register(Histogram(
+    "foodbridge_email_send_duration_seconds", "Outbound SMTP send latency", ("outcome",)))
+openai_latency = registry.register(Histogram(
+    "foodbridge_openai_request_duration_seconds", "OpenAI API call latency", ("outcome",)))
+
+# Route of the request currently being served, for attributing SQL statements
+current_route: ContextVar[Optional[dict]] = ContextVar("current_route", default=None)
+
+
+def _request_route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route counts, latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+        request_state = {"sql": 0}
+        token = current_route.set(request_state)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        http_in_flight.add(amount=1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.add(amount=-1)
+            current_route.reset(token)
+            route = _request_route(scope)
+            method = scope.get("method", "")
+            http_requests.inc(route, method, str(status_holder["status"]))
+            http_latency.observe(route, method, value=elapsed)
+            if request_state["sql"]:
+                sql_statements.inc(route, amount=request_state["sql"])
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Count statements per route and pool checkouts/hold time for ``engine``"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        state = current_route.get()
+        if state is not None:
+            state["sql"] += 1
+        else:
+            sql_statements.inc("background")
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts.inc(name)
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    # Long holds are what starve the pool; with the checked_out/overflow
+    # gauges they show when requests queue for a connection
+    @event.listens_for(engine, "checkin")
+    def _time_hold(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            pool_hold.observe(name, value=time.perf_counter() - started)
+
+    _pools[name] = engine.pool
+
+
+def _pool_stat(pool, attr: str) -> float:
+    fn = getattr(pool, attr, None)
+    return float(fn()) if callable(fn) else 0.0
+
+
+def register_cache(name: str, stats: Callable[[], dict]) -> None:
+    """Expose a cache's hits/misses/hit_rate/size (from its ``stats()`` dict) under ``cache=name``"""
+    _caches[name] = stats
+
+
+def _cache_samples(key: str):
+    for name, stats in list(_caches.items()):
+        yield (name,), float(stats().get(key, 0))
+
+
+for _key in ("hits", "misses", "hit_rate", "size"):
+    registry.register(Gauge(
+        f"foodbridge_cache_{_key}", f"Cache {_key.replace('_', ' ')}, by cache", ("cache",),
+        callback=lambda key=_key: _cache_samples(key)))
@@ -0,0 +1,263 @@
+"""
+Request tracing: per-request trace ids, spans, and a rotating JSONL export
+
+Every request gets a trace id (the caller's ``X-Trace-Id`` if it sent a
+valid one), returned in the ``X-Trace-Id`` response header. A share of
+requests, ``tracing_sample_rate``, is sampled when it arrives (head-based),
+and only those record spans:
+
+- ``db.<verb>`` for every SQL statement, from engine events (``trace_engine``);
+- ``db.commit`` around the DBAPI commit;
+- ``smtp.send`` and ``openai.chat`` around outbound calls, ``bcrypt`` around
+  password hashing;
+- ``serialize`` around FastAPI's response-model validation and dump;
+- ``admission.wait`` for time queued by app.core.admission.
+
+Unsampled requests only pay for a context-variable lookup per span.
+
+A finished trace becomes one JSON line (request, status, duration, spans
+with offsets from the request start). It is put on a bounded queue, and a
+background thread writes it to ``tracing_dir/traces.jsonl``, rotated at
+``tracing_file_max_mb``. A full queue drops traces rather than blocking a
+request. ``python trace_report.py`` reads the files back and breaks down
+where the slowest requests spent their time.
+
+Background tasks run after the response is sent and still belong to the
+request's trace. Their spans start after ``duration_ms``.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import get_settings
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+_TRACE_ID = re.compile(r"^[0-9a-f]{8,32}$")
+
+traces_dropped = registry.register(Counter(
+    "foodbridge_traces_dropped_total", "Sampled traces not exported, by reason", ("reason",)))
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    sampled: bool
+    started: float = field(default_factory=time.perf_counter)
+    spans: list = field(default_factory=list)
+    dropped_spans: int = 0
+
+    def add(self, name: str, started: float, ended: float, attrs: Optional[dict]) -> None:
+        if len(self.spans) >= get_settings().tracing_max_spans:
+            self.dropped_spans += 1
+            return
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round((ended - started) * 1000, 3),
+        }
+        if attrs:
+            span["attrs"] = attrs
+        self.spans.append(span)
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def sampled_trace() -> Optional[Trace]:
+    trace = current_trace.get()
+    return trace if trace is not None and trace.sampled else None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the block as a span of the current trace; a no-op unless the request is sampled"""
+    trace = sampled_trace()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as exc:
+        attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        trace.add(name, started, time.perf_counter(), attrs)
+
+
+class JsonlExporter:
+    """Writes trace lines from a bounded queue on one background thread"""
+
+    def __init__(self, directory: str, max_bytes: int, backups: int, queue_size: int):
+        self.path = Path(directory) / "traces.jsonl"
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, record: dict) -> None:
+        self._start()
+        try:
+            self._queue.put_nowait(json.dumps(record, default=str))
+        except queue.Full:
+            traces_dropped.inc("queue_full")
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        os.makedirs(self.path.parent, exist_ok=True)
+        # RotatingFileHandler does the size-based rollover (traces.jsonl.1, .2, ...)
+        handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        while True:
+            line = self._queue.get()
+            try:
+                handler.emit(logging.makeLogRecord({"msg": line}))
+            except Exception:
+                traces_dropped.inc("write_error")
+                logger.exception("Could not write trace")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until queued traces are written (scripts and tests)"""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def _build_exporter() -> JsonlExporter:
+    settings = get_settings()
+    return JsonlExporter(
+        settings.tracing_dir,
+        max_bytes=int(settings.tracing_file_max_mb * 1024 * 1024),
+        backups=settings.tracing_file_backups,
+        queue_size=settings.tracing_queue_size,
+    )
+
+
+exporter = _build_exporter()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware that opens a trace per request and exports the sampled ones"""
+
+    def __init__(self, app):
+        self.app = app
+        self.sample_rate = get_settings().tracing_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or ()).get(b"x-trace-id", b"").decode("latin-1").lower()
+        trace_id = incoming if _TRACE_ID.match(incoming) else os.urandom(8).hex()
+        trace = Trace(trace_id, sampled=self.sample_rate > 0 and random.random() < self.sample_rate)
+        token = current_trace.set(trace)
+        state = {"status": 500, "responded": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]}
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                state["responded"] = time.perf_counter()
+            await send(message)
+
+        wall_start = datetime.utcnow()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            if trace.sampled:
+                ended = time.perf_counter()
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                exporter.export({
+                    "trace_id": trace_id,
+                    "start": wall_start.isoformat(),
+                    "method": scope.get("method", ""),
+                    "route": route,
+                    "path": scope.get("path", ""),
+                    "status": state["status"],
+                    "duration_ms": round(((state["responded"] or ended) - trace.started) * 1000, 3),
+                    "total_ms": round((ended - trace.started) * 1000, 3),
+                    "spans": trace.spans,
+                    "dropped_spans": trace.dropped_spans,
+                })
+
+
+def trace_engine(engine, name: str) -> None:
+    """Record a span per SQL statement and per commit on ``engine`` for sampled requests"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _statement_started(conn, cursor, statement, parameters, context, executemany):
+        if sampled_trace() is not None:
+            conn.info.setdefault("trace_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+        trace = sampled_trace()
+        started = conn.info.get("trace_started")
+        if trace is None or not started:
+            return
+        verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "statement"
+        attrs = {"engine": name, "sql": " ".join(statement.split())[:200]}
+        if executemany:
+            attrs["rows"] = len(parameters)
+        trace.add(f"db.{verb}", started.pop(), time.perf_counter(), attrs)
+
+    @event.listens_for(engine, "handle_error")
+    def _statement_failed(context):
+        started = context.connection.info.get("trace_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # No after-commit connection event, so the dialect's commit is timed directly
+    dialect = engine.dialect
+    original_do_commit = dialect.do_commit
+
+    def traced_do_commit(dbapi_connection):
+        with span("db.commit", engine=name):
+            original_do_commit(dbapi_connection)
+
+    dialect.do_commit = traced_do_commit
+
+
+def trace_serialization() -> None:
+    """Time FastAPI's response-model validation and dump as a ``serialize`` span"""
+    import fastapi.routing
+
+    original = fastapi.routing.serialize_response
+    if getattr(original, "traced", False):
+        return
+
+    async def traced_serialize_response(*args, **kwargs):
+        if sampled_trace() is None:
+            return await original(*args, **kwargs)
+        with span("serialize"):
+            return await original(*args, **kwargs)
+
+    traced_serialize_response.traced = True
+    fastapi.routing.serialize_response = traced_serialize_response
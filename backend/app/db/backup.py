@@ -0,0 +1,549 @@
+"""
+Online SQLite backups, WAL shipping and point-in-time restore
+
+Snapshots
+    ``create_snapshot`` copies the live database with SQLite's online backup
+    API a few pages at a time, pausing between steps so writers get the
+    lock back. The copy must pass ``PRAGMA integrity_check`` before it is
+    gzip-compressed into ``<backup_dir>/snapshots``. A JSON manifest
+    records when the copy started and finished, its sha256 and page count.
+
+WAL shipping (optional, WAL journal mode only)
+    ``WalShipper`` copies newly committed WAL frames into compressed
+    segments under ``<backup_dir>/wal`` every few seconds. With
+    ``SQLITE_WAL_SHIPPING=true``, app connections stop auto-checkpointing
+    and the shipper becomes the only checkpointer. It checkpoints only
+    while holding the write lock, after the frames have been copied, so a
+    WAL reset can never overwrite a frame that hasn't been shipped. If the
+    WAL was reset while the shipper wasn't running, the shipper starts a
+    new run. Restores never replay across a run boundary.
+
+Point-in-time restore
+    ``restore`` takes the newest snapshot finished before the target time
+    and writes WAL frames shipped after that snapshot started straight into
+    its pages, as a checkpoint would. Replay stops at the last segment
+    shipped at or before the target. The result has to pass
+    ``integrity_check`` before it can replace anything.
+
+``prune`` applies retention: keep the newest ``keep`` snapshots and drop
+those older than ``keep_days``, always keeping the newest one. WAL segments
+are dropped once no kept snapshot can use them.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+# The magic's low bit says which byte order the frame checksums use
+WAL_MAGIC_LE = 0x377F0682
+WAL_MAGIC_BE = 0x377F0683
+
+SNAPSHOT_PREFIX = "foodbridge-"
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+class BackupError(Exception):
+    pass
+
+
+def sqlite_path(database_url: str) -> Path:
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise BackupError(f"Not a file-backed SQLite database: {database_url} (use pg_dump for PostgreSQL)")
+    return Path(url.database).resolve()
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _iso(ts: datetime) -> str:
+    return ts.isoformat(timespec="microseconds")
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def integrity_check(path: Path) -> str:
+    """``PRAGMA integrity_check`` result ("ok" when the file is sound)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+        return "\n".join(row[0] for row in rows)
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+
+
+def create_snapshot(
+    db_path: Path,
+    backup_dir: Path,
+    step_pages: int = 256,
+    step_sleep: float = 0.02,
+    max_restarts: int = 5,
+) -> dict:
+    """Online, page-stepped, verified and compressed snapshot of ``db_path``; returns its manifest."""
+    if not db_path.exists():
+        raise BackupError(f"Database file not found: {db_path}")
+    snapshots = backup_dir / "snapshots"
+    snapshots.mkdir(parents=True, exist_ok=True)
+
+    started_at = _now()
+    name = f"{SNAPSHOT_PREFIX}{started_at.strftime(TIMESTAMP_FORMAT)}.db"
+    fd, tmp_name = tempfile.mkstemp(prefix=".snapshot-", suffix=".db", dir=snapshots)
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        steps = _online_copy(db_path, tmp, step_pages, step_sleep, max_restarts)
+        finished_at = _now()
+
+        result = integrity_check(tmp)
+        if result != "ok":
+            raise BackupError(f"Snapshot failed integrity_check: {result[:500]}")
+        conn = sqlite3.connect(tmp)
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            conn.close()
+
+        target = snapshots / f"{name}.gz"
+        with open(tmp, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        manifest = {
+            "file": target.name,
+            "source": str(db_path),
+            "started_at": _iso(started_at),
+            "finished_at": _iso(finished_at),
+            "page_size": page_size,
+            "page_count": page_count,
+            "size_bytes": tmp.stat().st_size,
+            "compressed_bytes": target.stat().st_size,
+            "sha256": _sha256(target),
+            "integrity_check": result,
+            "backup_steps": steps,
+        }
+        _write_json(snapshots / f"{name}.json", manifest)
+        return manifest
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _online_copy(db_path: Path, target: Path, step_pages: int, step_sleep: float, max_restarts: int) -> int:
+    """Backup API copy in ``step_pages`` steps, sleeping between steps so writers aren't held up.
+
+    A write from another connection restarts a stepped backup. If that
+    happens more than ``max_restarts`` times, the copy is redone in a single
+    step.
+    """
+    state = {"steps": 0, "restarts": 0, "remaining": None}
+
+    class _TooManyRestarts(Exception):
+        pass
+
+    def progress(status, remaining, total):
+        state["steps"] += 1
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        if remaining and step_sleep > 0:
+            time.sleep(step_sleep)
+
+    src = sqlite3.connect(db_path, timeout=30)
+    try:
+        dst = sqlite3.connect(target)
+        try:
+            try:
+                src.backup(dst, pages=max(1, step_pages), progress=progress)
+            except _TooManyRestarts:
+                logger.warning(f"Stepped backup restarted {state['restarts']} times; copying in one step")
+                src.backup(dst, pages=-1)
+                state["steps"] += 1
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return state["steps"]
+
+
+def list_snapshots(backup_dir: Path) -> list[dict]:
+    """Snapshot manifests, oldest first"""
+    manifests = []
+    for path in (backup_dir / "snapshots").glob(f"{SNAPSHOT_PREFIX}*.json"):
+        manifest = json.loads(path.read_text())
+        manifest["manifest"] = path.name
+        manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m["finished_at"])
+
+
+def _decompress_snapshot(backup_dir: Path, manifest: dict, target: Path) -> None:
+    source = backup_dir / "snapshots" / manifest["file"]
+    if _sha256(source) != manifest["sha256"]:
+        raise BackupError(f"Checksum mismatch for {source.name}")
+    with gzip.open(source, "rb") as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def verify_snapshot(backup_dir: Path, manifest: dict) -> str:
+    """Re-check a stored snapshot: checksum, decompression and integrity_check"""
+    with tempfile.TemporaryDirectory(dir=backup_dir) as tmp:
+        target = Path(tmp) / "verify.db"
+        _decompress_snapshot(backup_dir, manifest, target)
+        return integrity_check(target)
+
+
+# ---------------------------------------------------------------------------
+# WAL shipping
+
+
+def _wal_checksum(data: bytes, s1: int, s2: int, big_endian: bool) -> tuple[int, int]:
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    for i in range(0, len(words), 2):
+        s1 = (s1 + words[i] + s2) & 0xFFFFFFFF
+        s2 = (s2 + words[i + 1] + s1) & 0xFFFFFFFF
+    return s1, s2
+
+
+@dataclass
+class WalPosition:
+    """Where shipping has reached within one WAL generation (salts identify the generation)"""
+    salt1: int
+    salt2: int
+    checkpoint_seq: int
+    page_size: int
+    big_endian: bool
+    offset: int
+    s1: int
+    s2: int
+
+
+def _read_wal_header(wal) -> Optional[WalPosition]:
+    wal.seek(0)
+    header = wal.read(WAL_HEADER_SIZE)
+    if len(header) < WAL_HEADER_SIZE:
+        return None
+    magic, _version, page_size, ckpt_seq, salt1, salt2, c1, c2 = struct.unpack(">8I", header)
+    if magic not in (WAL_MAGIC_LE, WAL_MAGIC_BE):
+        return None
+    big_endian = magic == WAL_MAGIC_BE
+    s1, s2 = _wal_checksum(header[:24], 0, 0, big_endian)
+    if (s1, s2) != (c1, c2):
+        return None
+    return WalPosition(salt1, salt2, ckpt_seq, page_size, big_endian, WAL_HEADER_SIZE, s1, s2)
+
+
+def _read_committed_frames(wal, position: WalPosition) -> tuple[bytes, WalPosition, int]:
+    """Valid frames after ``position`` up to the last commit frame.
+
+    Returns the raw frames, the position after them and the number of frames.
+    """
+    frame_size = WAL_FRAME_HEADER_SIZE + position.page_size
+    wal.seek(position.offset)
+    s1, s2 = position.s1, position.s2
+    offset = position.offset
+    chunks, pending = [], []
+    committed = position
+    frames = 0
+    while True:
+        frame = wal.read(frame_size)
+        if len(frame) < frame_size:
+            break
+        _pgno, commit_size, salt1, salt2, c1, c2 = struct.unpack(">6I", frame[:WAL_FRAME_HEADER_SIZE])
+        if (salt1, salt2) != (position.salt1, position.salt2):
+            break
+        s1, s2 = _wal_checksum(frame[:8] + frame[WAL_FRAME_HEADER_SIZE:], s1, s2, position.big_endian)
+        if (s1, s2) != (c1, c2):
+            break
+        offset += frame_size
+        pending.append(frame)
+        if commit_size:
+            chunks.extend(pending)
+            frames += len(pending)
+            pending = []
+            committed = WalPosition(**{**position.__dict__, "offset": offset, "s1": s1, "s2": s2})
+    return b"".join(chunks), committed, frames
+
+
+class WalShipper:
+    """Ships committed WAL frames of ``db_path`` into ``<backup_dir>/wal`` segments"""
+
+    def __init__(self, db_path: Path, backup_dir: Path, checkpoint_frames: int = 1000, busy_timeout: float = 30.0):
+        self.db_path = db_path
+        self.wal_path = Path(f"{db_path}-wal")
+        self.wal_dir = backup_dir / "wal"
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.wal_dir / "state.json"
+        self.checkpoint_frames = checkpoint_frames
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else None
+
+        # isolation_level=None: transactions are issued explicitly below
+        self.lock_conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+        mode = self.lock_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != "wal":
+            self.lock_conn.close()
+            raise BackupError(f"WAL shipping needs journal_mode=WAL (database is in {mode} mode)")
+        self.lock_conn.execute("PRAGMA wal_autocheckpoint=0")
+        self.checkpoint_conn = sqlite3.connect(db_path, timeout=busy_timeout, isolation_level=None)
+        self.checkpoint_conn.execute("PRAGMA wal_autocheckpoint=0")
+
+    def close(self) -> None:
+        # Ship what's left first: closing the last connection checkpoints the WAL away
+        try:
+            self.ship_once(checkpoint=False)
+        finally:
+            self.checkpoint_conn.close()
+            self.lock_conn.close()
+
+    def _position(self) -> Optional[WalPosition]:
+        return WalPosition(**self.state["position"]) if self.state else None
+
+    def ship_once(self, checkpoint: bool = True) -> Optional[dict]:
+        """Copy newly committed frames into a segment; returns its manifest (None if nothing new)"""
+        # Holding the write lock: no frames can be appended, and no reset can happen, while copying
+        self.lock_conn.execute("BEGIN IMMEDIATE")
+        try:
+            frames, new_position, count, run_started_at = self._collect()
+            # Stamped while writers are still locked out: every commit before this instant is in
+            # the segment. A stamp taken after ROLLBACK could postdate a snapshot that holds
+            # commits the segment lacks, and plan_restore would accept it as covering that snapshot.
+            shipped_at = _iso(_now())
+            checkpointed = False
+            if checkpoint and new_position is not None:
+                frames_in_wal = (new_position.offset - WAL_HEADER_SIZE) // (WAL_FRAME_HEADER_SIZE + new_position.page_size)
+                if frames_in_wal >= self.checkpoint_frames:
+                    # PASSIVE from another connection; the next writer resets the WAL once it is fully backfilled
+                    self.checkpoint_conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+                    checkpointed = True
+        finally:
+            self.lock_conn.execute("ROLLBACK")
+
+        manifest = None
+        if count:
+            manifest = self._write_segment(frames, new_position, count, run_started_at, shipped_at)
+        if new_position is not None:
+            self.state = {
+                "position": new_position.__dict__,
+                "run_started_at": run_started_at,
+                "next_seq": (self.state or {}).get("next_seq", 1) + (1 if count else 0),
+                "checkpointed": checkpointed,
+            }
+            _write_json(self.state_path, self.state)
+        return manifest
+
+    def _collect(self):
+        run_started_at = (self.state or {}).get("run_started_at") or _iso(_now())
+        if not self.wal_path.exists():
+            return b"", None, 0, run_started_at
+        with open(self.wal_path, "rb") as wal:
+            header = _read_wal_header(wal)
+            if header is None:
+                return b"", None, 0, run_started_at
+            previous = self._position()
+            if previous is None or (previous.salt1, previous.salt2) != (header.salt1, header.salt2):
+                # New WAL generation. A reset bumps salt-1 by one, so it's contiguous only if it
+                # directly follows the generation we shipped and we had checkpointed that one.
+                contiguous = (
+                    previous is not None
+                    and header.salt1 == (previous.salt1 + 1) & 0xFFFFFFFF
+                    and (self.state or {}).get("checkpointed")
+                )
+                if not contiguous:
+                    if previous is not None:
+                        logger.warning("WAL was reset while frames were unshipped; starting a new shipping run")
+                    run_started_at = _iso(_now())
+                start = header
+            else:
+                start = previous
+            frames, position, count = _read_committed_frames(wal, start)
+        return frames, position, count, run_started_at
+
+    def _write_segment(self, frames: bytes, position: WalPosition, count: int, run_started_at: str,
+                       shipped_at: str) -> dict:
+        seq = (self.state or {}).get("next_seq", 1)
+        name = f"{seq:010d}.wal.gz"
+        with gzip.open(self.wal_dir / name, "wb", compresslevel=6) as fh:
+            fh.write(frames)
+        manifest = {
+            "file": name,
+            "seq": seq,
+            "shipped_at": shipped_at,
+            "run_started_at": run_started_at,
+            "page_size": position.page_size,
+            "frames": count,
+            "salt": [position.salt1, position.salt2],
+            "end_offset": position.offset,
+        }
+        _write_json(self.wal_dir / f"{seq:010d}.json", manifest)
+        return manifest
+
+    def run(self, interval: float) -> None:
+        """Ship every ``interval`` seconds until interrupted"""
+        try:
+            while True:
+                manifest = self.ship_once()
+                if manifest:
+                    logger.info(f"Shipped WAL segment {manifest['file']} ({manifest['frames']} frames)")
+                time.sleep(interval)
+        finally:
+            self.close()
+
+
+def list_segments(backup_dir: Path) -> list[dict]:
+    """WAL segment manifests in shipping order"""
+    segments = [json.loads(p.read_text()) for p in (backup_dir / "wal").glob("[0-9]*.json")]
+    return sorted(segments, key=lambda s: s["seq"])
+
+
+# ---------------------------------------------------------------------------
+# Restore
+
+
+def _replay_segments(db_file: Path, backup_dir: Path, segments: list[dict]) -> None:
+    """Write WAL frames into the database pages, as a checkpoint would"""
+    db_size_pages = None
+    page_size = None
+    with open(db_file, "r+b") as db:
+        for segment in segments:
+            page_size = segment["page_size"]
+            frame_size = WAL_FRAME_HEADER_SIZE + page_size
+            with gzip.open(backup_dir / "wal" / segment["file"], "rb") as fh:
+                while True:
+                    frame = fh.read(frame_size)
+                    if len(frame) < frame_size:
+                        break
+                    pgno, commit_size = struct.unpack(">2I", frame[:8])
+                    db.seek((pgno - 1) * page_size)
+                    db.write(frame[WAL_FRAME_HEADER_SIZE:])
+                    if commit_size:
+                        db_size_pages = commit_size
+        if db_size_pages is not None:
+            db.truncate(db_size_pages * page_size)
+
+
+def plan_restore(backup_dir: Path, target_time: Optional[datetime] = None) -> dict:
+    """Choose the snapshot and WAL segments that reconstruct the database at ``target_time``"""
+    target = _iso(target_time or _now())
+    snapshots = [s for s in list_snapshots(backup_dir) if s["finished_at"] <= target]
+    if not snapshots:
+        raise BackupError(f"No snapshot finished before {target}")
+    base = snapshots[-1]
+
+    # Frames committed after the snapshot started, from one unbroken shipping run that was
+    # already running when the snapshot started. Frames it already contains are harmless to
+    # replay: every page ends up at its latest version as of the last applied segment.
+    replay = []
+    for segment in list_segments(backup_dir):
+        if segment["shipped_at"] <= base["started_at"]:
+            continue
+        if segment["shipped_at"] > target:
+            break
+        if segment["run_started_at"] > base["started_at"]:
+            break
+        if replay and (segment["seq"] != replay[-1]["seq"] + 1 or segment["run_started_at"] != replay[0]["run_started_at"]):
+            break
+        replay.append(segment)
+
+    # Pages in the snapshot may be as new as finished_at, so a replay ending earlier could mix versions
+    if replay and replay[-1]["shipped_at"] < base["finished_at"]:
+        replay = []
+    restored_through = replay[-1]["shipped_at"] if replay else base["finished_at"]
+    return {"snapshot": base, "segments": replay, "target": target, "restored_through": restored_through}
+
+
+def restore(backup_dir: Path, output: Path, target_time: Optional[datetime] = None, replace: bool = False) -> dict:
+    """Rebuild the database as of ``target_time`` into ``output``.
+
+    The result is verified with integrity_check before it is moved into
+    place. With ``replace``, any existing ``output`` (and its -wal/-shm) is
+    replaced atomically; otherwise an existing ``output`` is an error.
+    """
+    plan = plan_restore(backup_dir, target_time)
+    if output.exists() and not replace:
+        raise BackupError(f"{output} already exists; restore to a new path or use --replace")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_name = tempfile.mkstemp(prefix=".restore-", suffix=".db", dir=output.parent)
+    os.close(fd)
+    tmp = Path(tmp_name)
+    try:
+        _decompress_snapshot(backup_dir, plan["snapshot"], tmp)
+        _replay_segments(tmp, backup_dir, plan["segments"])
+        result = integrity_check(tmp)
+        if result != "ok":
+            raise BackupError(f"Restored database failed integrity_check: {result[:500]}")
+        for suffix in ("-wal", "-shm"):
+            Path(f"{output}{suffix}").unlink(missing_ok=True)
+        os.replace(tmp, output)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return {
+        "output": str(output),
+        "snapshot": plan["snapshot"]["file"],
+        "segments_applied": len(plan["segments"]),
+        "restored_through": plan["restored_through"],
+        "integrity_check": "ok",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Retention
+
+
+def prune(backup_dir: Path, keep: int, keep_days: Optional[float] = None) -> dict:
+    """Drop snapshots beyond retention and the WAL segments no kept snapshot can use"""
+    snapshots = list_snapshots(backup_dir)
+    cutoff = _iso(_now() - timedelta(days=keep_days)) if keep_days else None
+    kept = snapshots[-max(1, keep):]
+    if cutoff:
+        kept = [s for s in kept if s["finished_at"] >= cutoff] or snapshots[-1:]
+    kept_files = {s["file"] for s in kept}
+
+    removed_snapshots = 0
+    for manifest in snapshots:
+        if manifest["file"] not in kept_files:
+            (backup_dir / "snapshots" / manifest["file"]).unlink(missing_ok=True)
+            (backup_dir / "snapshots" / manifest["manifest"]).unlink(missing_ok=True)
+            removed_snapshots += 1
+
+    removed_segments = 0
+    if kept:
+        oldest_start = kept[0]["started_at"]
+        for segment in list_segments(backup_dir):
+            if segment["shipped_at"] <= oldest_start:
+                (backup_dir / "wal" / segment["file"]).unlink(missing_ok=True)
+                (backup_dir / "wal" / f"{segment['seq']:010d}.json").unlink(missing_ok=True)
+                removed_segments += 1
+    return {"snapshots_removed": removed_snapshots, "segments_removed": removed_segments}
@@ -0,0 +1,146 @@
+"""
+Explicit schema migration step.
+
+Schema creation used to run from the app's startup hook on every boot, which
+put DDL and catalog inspection on the critical path of every new replica.
+Run this once per deploy instead:
+
+    python -m app.db.migrate
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from app.db.session import Base, engine
+
+
+def _reconcile_counters(conn):
+    from app.services.counters import reconcile_counters
+    reconcile_counters(conn)
+
+
+def _backfill_attribute_masks(conn):
+    from app.services.attributes import backfill_attribute_masks
+    backfill_attribute_masks(conn)
+
+
+def _backfill_pickup_bounds(conn):
+    from app.services.pickup_windows import backfill_pickup_bounds
+    backfill_pickup_bounds(conn)
+
+
+# Data fixes to run once the listed column has been added to an existing table:
+# either SQL or a callable taking the migration connection. They run in this
+# order, after every table has its new columns.
+_BACKFILLS = {
+    "items.created_at": "UPDATE items SET created_at = COALESCE(ready_at, claimed_at) WHERE created_at IS NULL",
+    "users.donation_count": _reconcile_counters,
+    "organizations.donation_count": _reconcile_counters,
+    "items.attribute_mask": _backfill_attribute_masks,
+    "items.pickup_start": _backfill_pickup_bounds,
+    "items.pickup_end": _backfill_pickup_bounds,
+    "items.pickup_days": _backfill_pickup_bounds,
+}
+
+
+def _add_missing_columns(bind: Engine) -> list[str]:
+    """Add columns declared on the models but missing from existing tables.
+
+    ``create_all`` only creates tables that do not exist yet, so databases
+    created by an older release would otherwise never pick up new columns.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    backfills = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+                backfill = _BACKFILLS.get(f"{table.name}.{column.name}")
+                if backfill is not None and backfill not in backfills:
+                    backfills.append(backfill)
+        backfills.sort(key=list(_BACKFILLS.values()).index)
+        for backfill in backfills:
+            if callable(backfill):
+                backfill(conn)
+            else:
+                conn.execute(text(backfill))
+    return added
+
+
+def _drop_event_item_foreign_key(bind: Engine) -> None:
+    """Events outlive their item's row in ``items`` (see app.services.archive).
+
+    SQLite does not enforce foreign keys here, and can only drop one by
+    rebuilding the table, so only other dialects are altered.
+    """
+    if bind.dialect.name == "sqlite" or "events" not in inspect(bind).get_table_names():
+        return
+    for fk in inspect(bind).get_foreign_keys("events"):
+        if fk["constrained_columns"] == ["item_id"] and fk.get("name"):
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE events DROP CONSTRAINT {fk["name"]}'))
+
+
+def _rebuild_items_with_autoincrement(bind: Engine) -> bool:
+    """Give an older SQLite ``items`` table AUTOINCREMENT so archived ids are never handed out again.
+
+    Without it SQLite reuses max(id) + 1, so archiving the newest row lets the
+    next listing take its id. SQLite can't alter a primary key, so the table
+    is rebuilt (its indexes are recreated by ``migrate``) and the id sequence
+    starts past every id in ``items`` and ``items_archive``.
+    """
+    if bind.dialect.name != "sqlite":
+        return False
+    from app.models.models import Item
+
+    with bind.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'items'")).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return False
+        table = Item.__table__
+        columns = ", ".join(column.name for column in table.columns)
+        create = str(CreateTable(table).compile(dialect=bind.dialect)).strip()
+        conn.execute(text(create.replace("CREATE TABLE items ", "CREATE TABLE items_rebuilt ", 1)))
+        conn.execute(text(f"INSERT INTO items_rebuilt ({columns}) SELECT {columns} FROM items"))
+        conn.execute(text("DROP TABLE items"))
+        conn.execute(text("ALTER TABLE items_rebuilt RENAME TO items"))
+        last_id = conn.execute(text(
+            "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM items UNION ALL SELECT MAX(id) FROM items_archive)"
+        )).scalar() or 0
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name IN ('items', 'items_rebuilt')"))
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('items', :seq)"), {"seq": last_id})
+    return True
+
+
+def migrate(bind: Engine = engine) -> list[str]:
+    """Create missing tables, columns and indexes. Safe to run repeatedly."""
+    # Register every model on Base.metadata before creating anything
+    import app.models.models  # noqa: F401
+
+    Base.metadata.create_all(bind=bind)
+    added = _add_missing_columns(bind)
+    _drop_event_item_foreign_key(bind)
+    _rebuild_items_with_autoincrement(bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    return added
+
+
+if __name__ == "__main__":
+    added_columns = migrate()
+    for name in added_columns:
+        print(f"➕ Added column {name}")
+    print("✅ Database schema is up to date")
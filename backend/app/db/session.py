@@ -1,6 +1,15 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from app.core.config import get_settings
+import itertools
+import logging
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+from app.core.config import get_settings, Settings
+from app.core.metrics import instrument_engine
+from app.core.tracing import trace_engine
+
+logger = logging.getLogger(__name__)
 
 
 class Base(DeclarativeBase):
@@ -9,17 +18,108 @@ class Base(DeclarativeBase):
 
 settings = get_settings()
 
-# For SQLite dev usage, allow cross-thread access used by reload/server threads
-if settings.database_url.startswith("sqlite"):
+
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    """PRAGMA statements for the configured SQLite profile (empty for "default")"""
+    if settings.sqlite_profile != "production":
+        return []
+    pragmas = [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA temp_store={settings.sqlite_temp_store}",
+    ]
+    if settings.sqlite_wal_shipping:
+        # The WAL shipper is the only checkpointer (see app.db.backup)
+        pragmas.append("PRAGMA wal_autocheckpoint=0")
+    return pragmas
+
+
+def build_engine(database_url: str, config: Settings = settings):
+    # For SQLite dev usage, allow cross-thread access used by reload/server threads
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, pool_pre_ping=True)
+
     engine = create_engine(
-        settings.database_url,
+        database_url,
         pool_pre_ping=True,
         connect_args={"check_same_thread": False},
     )
-else:
-    engine = create_engine(settings.database_url, pool_pre_ping=True)
+    pragmas = sqlite_pragmas(config)
+    if pragmas:
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+    return engine
+
+
+engine = build_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engines = [build_engine(url) for url in settings.database_replica_urls]
+instrument_engine(engine, "primary")
+trace_engine(engine, "primary")
+for i, replica in enumerate(replica_engines):
+    instrument_engine(replica, f"replica_{i}")
+    trace_engine(replica, f"replica_{i}")
+_next_replica = itertools.cycle(replica_engines) if replica_engines else None
+
+# Set on successful writes (epoch seconds); while it is in the future the client reads
+# from the primary. The SPA calls the API cross-origin without credentials, so it gets
+# the value from the response header and echoes it back as a request header; the
+# cookie covers same-origin and credentialed clients.
+READ_YOUR_WRITES_HEADER = "X-Primary-Until"
+READ_YOUR_WRITES_COOKIE = "fb_primary_until"
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica chosen for it and sends every write to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or (clause is not None and clause.is_dml):
+            return engine
+        return replica
+
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+
+
+def start_wal_checkpointer(engine=engine, interval: float = settings.sqlite_wal_checkpoint_seconds):
+    """Periodically fold the WAL back into the database file so it can't grow unbounded.
+
+    PASSIVE checkpoints never wait on readers or writers. Returns the thread's
+    stop event, or None when the engine isn't a WAL-mode SQLite database or
+    WAL shipping owns checkpointing.
+    """
+    if (
+        engine.dialect.name != "sqlite"
+        or not sqlite_pragmas(settings)
+        or settings.sqlite_wal_shipping
+        or interval <= 0
+    ):
+        return None
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                with engine.connect() as conn:
+                    conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+            except Exception as e:
+                logger.warning(f"WAL checkpoint failed: {e}")
+
+    threading.Thread(target=run, name="wal-checkpoint", daemon=True).start()
+    return stop
+
 
 def get_db():
     db = SessionLocal()
@@ -29,3 +129,26 @@ def get_db():
         db.close()
 
 
+def _wrote_recently(request: Request) -> bool:
+    now = time.time()
+    for value in (request.headers.get(READ_YOUR_WRITES_HEADER), request.cookies.get(READ_YOUR_WRITES_COOKIE)):
+        try:
+            primary_until = float(value or 0)
+        except ValueError:
+            continue
+        # A client-supplied value can't pin itself to the primary for longer than one window
+        if now < primary_until <= now + settings.read_your_writes_seconds + 1:
+            return True
+    return False
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes: a replica, unless none are configured or the client just wrote"""
+    if _next_replica is None or _wrote_recently(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal(info={"replica": next(_next_replica)})
+    try:
+        yield db
+    finally:
+        db.close()
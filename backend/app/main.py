@@ -1,29 +1,78 @@
-from fastapi import FastAPI
+import math
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .api.v1.routers.root import api_router
+from .core.admission import AdmissionMiddleware
 from .core.config import get_settings
-from .db.session import Base, engine
+from .core.metrics import MetricsMiddleware, registry
+from .core.tracing import TracingMiddleware, trace_serialization
+from .db.session import start_wal_checkpointer, replica_engines, READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_HEADER
 
 settings = get_settings()
 app = FastAPI(title=settings.app_name, version="0.1.0")
 
+# Innermost of the middlewares, so shed requests still get CORS headers and metrics
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the SPA: it echoes X-Primary-Until back (see get_read_db)
+    expose_headers=[READ_YOUR_WRITES_HEADER, "X-Trace-Id"],
 )
 
+if replica_engines:
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        # Pin the client's reads to the primary for a short window after it writes,
+        # so it never sees a replica that hasn't caught up with its own change
+        response = await call_next(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            window = settings.read_your_writes_seconds
+            primary_until = f"{time.time() + window:.3f}"
+            response.headers[READ_YOUR_WRITES_HEADER] = primary_until
+            response.set_cookie(
+                READ_YOUR_WRITES_COOKIE,
+                primary_until,
+                max_age=math.ceil(window),
+                httponly=True,
+                samesite="lax",
+            )
+        return response
+
+# Trace ids and spans for everything below, including admission queueing
+app.add_middleware(TracingMiddleware)
+trace_serialization()
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/")
 def read_root():
     return {"status": "ok"}
 
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 def on_startup():
-    # Create tables for SQLite dev runs
-    Base.metadata.create_all(bind=engine)
+    # Schema changes are an explicit deploy step (python -m app.db.migrate);
+    # AUTO_MIGRATE=true keeps the old behaviour for local dev runs
+    if settings.auto_migrate:
+        from .db.migrate import migrate
+        migrate()
+    start_wal_checkpointer()
 
 
@@ -10,6 +10,8 @@ from sqlalchemy import (
     Text,
     Float,
     JSON,
+    Index,
+    Table,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.db.session import Base
@@ -26,6 +28,13 @@ class User(Base):
     verified: Mapped[bool] = mapped_column(Boolean, default=False)
     password_hash: Mapped[str] = mapped_column(String(255))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    # Stored activity counters, kept current by create_item/claim_item
+    # (reconcile with `python -m app.services.counters`)
+    donation_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    claim_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    quantity_rescued: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")  # quantity claimed
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
     
     # Relationships
     claimed_items = relationship("Item", foreign_keys="Item.claimed_by_user_id", back_populates="claimed_by_user")
@@ -45,6 +54,14 @@ class Organization(Base):
     email: Mapped[Optional[str]] = mapped_column(String(255), default=None)
     capacity_json = Column(JSON, default={})
     verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
+    # IANA name pickup-window clock times are read in; NULL = the pickup_timezone setting
+    timezone: Mapped[Optional[str]] = mapped_column(String(64), default=None)
+
+    # Stored activity counters, kept current by create_item/claim_item
+    donation_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    claim_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    quantity_rescued: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")  # quantity of claimed items
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
 
     items = relationship("Item", back_populates="organization")
 
@@ -63,8 +80,18 @@ class Item(Base):
     ready_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     pickup_window: Mapped[Optional[str]] = mapped_column(String(100))
+    # pickup_window parsed on write (app.services.pickup_windows): first opening to last,
+    # NULL end = open-ended; a daily clock range adds its UTC minute of day, length and weekday bits
+    pickup_start: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    pickup_end: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    pickup_daily_open: Mapped[Optional[int]] = mapped_column(Integer)
+    pickup_daily_minutes: Mapped[Optional[int]] = mapped_column(Integer)
+    pickup_days: Mapped[Optional[int]] = mapped_column(Integer)
     status: Mapped[str] = mapped_column(String(32), default="listed")
     photo_url: Mapped[Optional[str]] = mapped_column(String(512))
+    # Allergen + storage bits (app.services.attributes), kept in sync on every write
+    attribute_mask: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, nullable=True)
     
     # Legacy fields (for backward compatibility)
     claimed_by_name: Mapped[Optional[str]] = mapped_column(String(100), default=None)
@@ -81,6 +108,41 @@ class Item(Base):
     claimed_by_user = relationship("User", foreign_keys=[claimed_by_user_id], back_populates="claimed_items")
     donated_by_user = relationship("User", foreign_keys=[donated_by_user_id], back_populates="donated_items")
 
+    __table_args__ = (
+        # Per-user history lookups, newest first (activity feed, dashboard)
+        Index("ix_items_claimer_claimed_at", "claimed_by_user_id", "claimed_at"),
+        Index("ix_items_donor_created_at", "donated_by_user_id", "created_at"),
+        # Allergy-safe / storage browsing: bitwise filters evaluated from the index
+        Index("ix_items_status_attribute_mask", "status", "attribute_mask"),
+        # Browse facets: the grouped scan behind ?facets= reads only this index
+        Index("ix_items_status_facets", "status", "category", "org_id", "attribute_mask"),
+        # ?available_between=: range on pickup_end, pickup_start checked from the index
+        Index("ix_items_status_pickup", "status", "pickup_end", "pickup_start"),
+        # Ids are never reused once archival deletes the newest rows (see app.services.archive)
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ArchivedItem(Base):
+    """Claimed and long-expired items moved out of ``items`` by the archival job.
+
+    Same columns and ids as ``items`` plus ``archived_at``, without foreign
+    keys. Read-only; query live and archived items together through
+    ``app.services.archive.ItemHistory``.
+    """
+    __table__ = Table(
+        "items_archive",
+        Base.metadata,
+        *(column._copy() for column in Item.__table__.columns),
+        Column("archived_at", DateTime, index=True),
+        Index("ix_items_archive_claimer_claimed_at", "claimed_by_user_id", "claimed_at"),
+        Index("ix_items_archive_donor_created_at", "donated_by_user_id", "created_at"),
+    )
+
+    organization = relationship(
+        "Organization", primaryjoin="foreign(ArchivedItem.org_id) == Organization.id", viewonly=True
+    )
+
 
 class Event(Base):
     __tablename__ = "events"
@@ -90,7 +152,8 @@ class Event(Base):
 
     # Actor/context
     user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
-    item_id: Mapped[Optional[int]] = mapped_column(ForeignKey("items.id"), nullable=True, index=True)
+    # No foreign key: events keep their item_id when the item moves to items_archive
+    item_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
     org_id: Mapped[Optional[int]] = mapped_column(ForeignKey("organizations.id"), nullable=True, index=True)
 
     # Event data
@@ -99,4 +162,36 @@ class Event(Base):
     ip_address: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     user_agent: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
 
+    __table_args__ = (
+        # Funnel analysis streams events per user in time order (id breaks ties);
+        # event_type and item_id make it a covering index for that scan
+        Index("ix_events_user_created_at", "user_id", "created_at", "id", "event_type", "item_id"),
+    )
+
+
+class SavedSearch(Base):
+    """A user's standing search; new items matching it trigger an email alert"""
+    __tablename__ = "saved_searches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
+    name: Mapped[str] = mapped_column(String(100))
+    category: Mapped[Optional[str]] = mapped_column(String(100), default=None)
+    keywords_json = Column(JSON, default=list)  # every keyword must appear in the item
+    lat: Mapped[Optional[float]] = mapped_column(Float, default=None)
+    lng: Mapped[Optional[float]] = mapped_column(Float, default=None)
+    radius_km: Mapped[Optional[float]] = mapped_column(Float, default=None)
+    exclude_allergens_json = Column(JSON, default=list)
+    active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Bumped on every change so other workers can sync their in-memory index
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class RateLimitBucket(Base):
+    """Shared token-bucket state for the database rate-limit backend"""
+    __tablename__ = "rate_limit_buckets"
 
+    key: Mapped[str] = mapped_column(String(320), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float)
+    updated_at: Mapped[float] = mapped_column(Float, index=True)  # epoch seconds
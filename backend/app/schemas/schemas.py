@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional, List, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
@@ -43,6 +44,8 @@ class UserProfile(BaseModel):
     created_at: datetime
     total_claims: int = 0
     total_donations: int = 0
+    quantity_rescued: float = 0.0
+    last_activity_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -63,6 +66,17 @@ class OrganizationCreate(BaseModel):
     phone: Optional[str] = None
     email: Optional[str] = None
     capacity_json: dict = {}
+    timezone: Optional[str] = None  # IANA name, e.g. "America/Toronto"; pickup windows are read in it
+
+    @field_validator('timezone')
+    @classmethod
+    def known_timezone(cls, v):
+        if v:
+            try:
+                ZoneInfo(v)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone '{v}'")
+        return v or None
 
 
 class OrganizationOut(BaseModel):
@@ -74,6 +88,11 @@ class OrganizationOut(BaseModel):
     lng: Optional[float]
     phone: Optional[str]
     email: Optional[str]
+    donation_count: int = 0
+    claim_count: int = 0
+    quantity_rescued: float = 0.0
+    last_activity_at: Optional[datetime] = None
+    timezone: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -115,6 +134,8 @@ class ItemOut(BaseModel):
     ready_at: Optional[datetime]
     expires_at: Optional[datetime]
     pickup_window: Optional[str]
+    pickup_start: Optional[datetime] = None
+    pickup_end: Optional[datetime] = None
     status: str
     photo_url: Optional[str]
     claimed_at: Optional[datetime] = None
@@ -135,6 +156,17 @@ class ItemOut(BaseModel):
         from_attributes = True
 
 
+class FacetValue(BaseModel):
+    value: Optional[str] = None
+    id: Optional[int] = None  # organization facet only
+    count: int
+
+
+class ItemsWithFacets(BaseModel):
+    items: List[ItemOut] = []
+    facets: dict[str, List[FacetValue]] = {}
+
+
 class UserClaimHistory(BaseModel):
     id: int
     item: ItemOut
@@ -155,6 +187,95 @@ class UserDashboard(BaseModel):
         from_attributes = True
 
 
+class ActivityEntry(BaseModel):
+    type: str
+    message: str
+    timestamp: datetime
+    item_id: int
+
+
+class ActivityPage(BaseModel):
+    items: List[ActivityEntry] = []
+    next_cursor: Optional[str] = None
+
+
+class SavedSearchCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    category: Optional[str] = None
+    keywords: List[str] = []
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lng: Optional[float] = Field(None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(None, gt=0, le=200)
+    exclude_allergens: List[str] = []
+
+
+class SavedSearchOut(BaseModel):
+    id: int
+    name: str
+    category: Optional[str] = None
+    keywords: List[str] = []
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    radius_km: Optional[float] = None
+    exclude_allergens: List[str] = []
+    created_at: datetime
+
+
+class MatchAssignment(BaseModel):
+    item_id: int
+    org_id: int
+    distance_km: float
+    storage_type: str
+    quantity: float
+
+
+class MatchUnassigned(BaseModel):
+    item_id: int
+    reason: str  # no_location, no_feasible_org or capacity
+
+
+class MatchingResult(BaseModel):
+    assignments: List[MatchAssignment] = []
+    unassigned: List[MatchUnassigned] = []
+    stats: dict = {}
+
+
+class RouteRequest(BaseModel):
+    start_lat: float = Field(ge=-90, le=90)
+    start_lng: float = Field(ge=-180, le=180)
+    item_ids: List[int] = Field(min_length=1)
+    start_time: Optional[datetime] = None  # default: now (UTC)
+    speed_kmh: Optional[float] = Field(None, gt=0)
+    service_minutes: Optional[float] = Field(None, ge=0)
+    return_to_start: bool = False
+
+
+class RouteStop(BaseModel):
+    item_id: int
+    title: str
+    org_id: int
+    org_name: str
+    lat: float
+    lng: float
+    leg_km: float
+    arrive_at: datetime
+    wait_minutes: float
+    depart_at: datetime
+    pickup_end: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+
+class RouteUnassigned(BaseModel):
+    item_id: int
+    reason: str  # not_found, unavailable, no_location, expired, time_window or not_scheduled
+
+
+class RouteResult(BaseModel):
+    stops: List[RouteStop] = []
+    unassigned: List[RouteUnassigned] = []
+    stats: dict = {}
+
+
 class ItemClaim(BaseModel):
     claimer_name: str = Field(min_length=2)
     claimer_phone: Optional[str] = None
@@ -0,0 +1,116 @@
+"""
+User activity feed: claims and donations merged into one newest-first stream
+
+Both kinds of activity come from a single UNION ALL over ``items`` and
+``items_archive``, one branch per kind and table, each served by that
+table's (user, timestamp) index. Pages are
+addressed with an opaque keyset cursor of (timestamp, item id, kind), so
+fetching page N costs the same as page 1 however long the history is.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, literal, or_, select, union_all
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.models import ArchivedItem, Item
+from app.services.archive import ItemHistory
+
+# kind -> (user column, timestamp column, message template)
+_BRANCHES = {
+    "claim": ("claimed_by_user_id", "claimed_at", "You claimed '{title}'"),
+    "donation": ("donated_by_user_id", "created_at", "You donated '{title}'"),
+}
+# Live and archived items; ids never overlap, so the merged order is unchanged
+_SOURCES = (Item, ArchivedItem)
+
+
+def encode_cursor(ts: datetime, item_id: int, kind: str) -> str:
+    raw = json.dumps([ts.isoformat(), item_id, kind]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, item_id, kind = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(ts), int(item_id), str(kind)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _branch(model, kind: str, user_id: int, limit: int, cursor: Optional[tuple[datetime, int, str]]):
+    user_name, ts_name, _ = _BRANCHES[kind]
+    user_column, ts_column = getattr(model, user_name), getattr(model, ts_name)
+    query = (
+        select(
+            literal(kind).label("kind"),
+            ts_column.label("ts"),
+            model.id.label("item_id"),
+            model.title.label("title"),
+        )
+        .where(user_column == user_id)
+        .where(ts_column.isnot(None))
+    )
+    if cursor is not None:
+        # Rows strictly after the cursor in (ts DESC, item_id DESC, kind DESC) order
+        c_ts, c_item_id, c_kind = cursor
+        after = or_(ts_column < c_ts, and_(ts_column == c_ts, model.id < c_item_id))
+        if kind < c_kind:
+            after = or_(after, and_(ts_column == c_ts, model.id == c_item_id))
+        query = query.where(after)
+    return select(query.order_by(ts_column.desc(), model.id.desc()).limit(limit).subquery())
+
+
+def _feed(user_id: int, limit: int, cursor=None):
+    return union_all(*(
+        _branch(model, kind, user_id, limit, cursor) for model in _SOURCES for kind in _BRANCHES
+    )).subquery("feed")
+
+
+def activity_entry(kind: str, ts: datetime, item_id: int, title: str) -> dict:
+    return {
+        "type": kind,
+        "message": _BRANCHES[kind][2].format(title=title),
+        "timestamp": ts,
+        "item_id": item_id,
+    }
+
+
+def activity_page(db: Session, user_id: int, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """One page of the user's activity feed plus the cursor for the next page."""
+    feed = _feed(user_id, limit + 1, decode_cursor(cursor) if cursor else None)
+    rows = db.execute(
+        select(feed).order_by(feed.c.ts.desc(), feed.c.item_id.desc(), feed.c.kind.desc()).limit(limit + 1)
+    ).all()
+
+    entries = [activity_entry(row.kind, row.ts, row.item_id, row.title) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last.ts, last.item_id, last.kind)
+    return {"items": entries, "next_cursor": next_cursor}
+
+
+def recent_items(db: Session, user_id: int, per_kind: int = 10) -> dict[str, list]:
+    """Latest claimed and donated items (with organizations) in a single query.
+
+    Returns ``{"claim": [(item, ts), ...], "donation": [...]}``, newest first.
+    """
+    feed = _feed(user_id, per_kind)
+    rows = (
+        db.query(ItemHistory, feed.c.kind, feed.c.ts)
+        .join(feed, feed.c.item_id == ItemHistory.id)
+        .options(joinedload(ItemHistory.organization))
+        .order_by(feed.c.ts.desc(), feed.c.item_id.desc())
+        .all()
+    )
+    out: dict[str, list] = {kind: [] for kind in _BRANCHES}
+    for item, kind, ts in rows:
+        if len(out[kind]) < per_kind:
+            out[kind].append((item, ts))
+    return out
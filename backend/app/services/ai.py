@@ -2,11 +2,16 @@
 AI Services for generating insights and analysis
 """
 import json
+import logging
+import time
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
-from openai import OpenAI
 from app.core.config import get_settings
+from app.core.metrics import openai_latency
+from app.core.tracing import span
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 class AIService:
@@ -14,25 +19,26 @@ class AIService:
     
     def __init__(self):
         self.client = None
-        print(f"Initializing AI Service...")
-        print(f"OpenAI enabled: {settings.openai_enabled}")
-        print(f"OpenAI API key set: {'Yes' if settings.openai_api_key else 'No'}")
-        print(f"OpenAI API key length: {len(settings.openai_api_key) if settings.openai_api_key else 0}")
+        logger.info(
+            "Initializing AI Service (OpenAI enabled: %s, API key set: %s)",
+            settings.openai_enabled,
+            "Yes" if settings.openai_api_key else "No",
+        )
         
         if settings.openai_enabled and settings.openai_api_key:
             try:
+                # The OpenAI SDK is slow to import, so only pay for it when it is actually configured
+                from openai import OpenAI
                 self.client = OpenAI(api_key=settings.openai_api_key)
-                print("OpenAI client initialized successfully")
+                logger.info("OpenAI client initialized successfully")
             except Exception as e:
-                print(f"Failed to initialize OpenAI client: {e}")
+                logger.warning(f"Failed to initialize OpenAI client: {e}")
         else:
-            print("OpenAI not enabled or API key not set")
+            logger.info("OpenAI not enabled or API key not set")
     
     def is_available(self) -> bool:
         """Check if AI service is available and configured"""
-        available = self.client is not None and settings.openai_enabled and settings.openai_api_key
-        print(f"AI service availability check: {available}")
-        return available
+        return bool(self.client is not None and settings.openai_enabled and settings.openai_api_key)
     
     def generate_analytics_insights(
         self, 
@@ -80,21 +86,28 @@ class AIService:
             
             # Call OpenAI API
             print("Calling OpenAI API...")
-            response = self.client.chat.completions.create(
-                model=settings.openai_model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert food waste reduction analyst providing actionable insights for FoodBridge, a platform that connects food donors with recipients to reduce waste and fight hunger."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            started = time.perf_counter()
+            try:
+                with span("openai.chat", model=settings.openai_model):
+                    response = self.client.chat.completions.create(
+                        model=settings.openai_model,
+                        messages=[
+                            {
+                                "role": "system", 
+                                "content": "You are an expert food waste reduction analyst providing actionable insights for FoodBridge, a platform that connects food donors with recipients to reduce waste and fight hunger."
+                            },
+                            {
+                                "role": "user", 
+                                "content": prompt
+                            }
+                        ],
+                        max_tokens=500,
+                        temperature=0.7
+                    )
+            except Exception:
+                openai_latency.observe("error", value=time.perf_counter() - started)
+                raise
+            openai_latency.observe("ok", value=time.perf_counter() - started)
             
             print("OpenAI API call successful!")
             
@@ -347,5 +360,7 @@ Format as bullet points, each insight should be 1-2 sentences maximum.
         ]
 
 
-# Global AI service instance
-ai_service = AIService()
+@lru_cache
+def get_ai_service() -> AIService:
+    """Return the shared AI service, constructing it on first use."""
+    return AIService()
@@ -0,0 +1,100 @@
+"""
+Hot/cold split of the items table
+
+``items`` holds the live inventory. ``archive_items.py`` moves items
+claimed, or expired unclaimed, more than ``archive_after_days`` ago into
+``items_archive`` in small batches. Each batch is one transaction:
+INSERT ... SELECT followed by DELETE, so an item is always in exactly
+one of the two tables. Ids are preserved, and events keep pointing at
+them.
+
+Readers that want full history (historical analytics, the dashboard and
+activity feed, counter reconciliation, snapshots and model training) use
+``ItemHistory``: the ``Item`` entity aliased onto ``items UNION ALL
+items_archive``. They query it exactly like ``Item``, so there is a
+single query path whether or not anything has been archived yet. Live
+paths (listings, claims, risk, matching) keep using ``Item`` and only
+ever touch the hot table.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased
+
+from app.models.models import ArchivedItem, Item
+
+logger = logging.getLogger(__name__)
+
+_items = Item.__table__
+_archive = ArchivedItem.__table__
+ITEM_COLUMNS = [column.name for column in _items.columns]
+
+item_history = union_all(
+    select(*(_items.c[name] for name in ITEM_COLUMNS)),
+    select(*(_archive.c[name] for name in ITEM_COLUMNS)),
+).subquery("item_history")
+
+# Read-only: instances loaded through it are plain Item objects, archived or not
+ItemHistory = aliased(Item, item_history, name="item_history")
+
+
+def archivable(cutoff: datetime):
+    """Items claimed, or expired unclaimed, before ``cutoff``"""
+    return or_(
+        and_(_items.c.status == "claimed", _items.c.claimed_at < cutoff),
+        and_(_items.c.status != "claimed", _items.c.expires_at < cutoff),
+    )
+
+
+def count_archivable(bind: Engine, older_than_days: float, now: Optional[datetime] = None) -> int:
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    with bind.connect() as conn:
+        return conn.execute(select(func.count()).select_from(_items).where(archivable(cutoff))).scalar() or 0
+
+
+def archive_items(bind: Engine, older_than_days: float, batch_size: int = 1000, pause: float = 0.0,
+                  max_batches: Optional[int] = None, now: Optional[datetime] = None) -> dict:
+    """Move archivable items to items_archive, ``batch_size`` per transaction; returns totals.
+
+    ``pause`` seconds between batches leave room for app writes (SQLite has a
+    single writer).
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    moved = batches = last_id = 0
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        with bind.begin() as conn:
+            # Walk the primary key forward so the whole run is one pass over items
+            ids = conn.execute(
+                select(_items.c.id).where(_items.c.id > last_id, archivable(cutoff))
+                .order_by(_items.c.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            conn.execute(insert(_archive).from_select(
+                ITEM_COLUMNS + ["archived_at"],
+                select(*(_items.c[name] for name in ITEM_COLUMNS), literal(now, _archive.c.archived_at.type))
+                .where(_items.c.id.in_(ids)),
+            ))
+            conn.execute(delete(_items).where(_items.c.id.in_(ids)))
+        moved += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    if moved:
+        logger.info(f"Archived {moved} items older than {cutoff.isoformat()} in {batches} batches")
+    return {
+        "moved": moved,
+        "batches": batches,
+        "cutoff": cutoff.isoformat(),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
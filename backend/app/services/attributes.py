@@ -0,0 +1,145 @@
+"""
+Normalized allergen / storage vocabulary and the per-item attribute bitmask
+
+Free-text ``allergens_json`` and ``storage_type`` values are mapped onto a
+fixed vocabulary, and ``Item.attribute_mask`` records one bit per allergen
+(low bits) and per storage type (bits 16+). The mask is kept in sync by ORM
+hooks on every insert/update, so list filters compile to bitwise
+predicates on an indexed integer column instead of a JSON scan:
+
+    exclude_allergens=peanuts,milk  ->  attribute_mask & <allergen bits> = 0
+    storage_type=frozen             ->  attribute_mask & <storage bits> != 0
+
+Allergens outside the vocabulary all share the "other" bit, so excluding an
+unrecognized allergen hides every item that declares any unrecognized one.
+For allergy filtering that is the safe direction to be wrong in.
+"""
+
+import json
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, event, update
+
+from app.models.models import Item
+
+# Canonical allergen -> bit (priority food allergens, plus a catch-all)
+ALLERGENS = [
+    "gluten", "milk", "eggs", "peanuts", "tree nuts", "soy", "sesame",
+    "fish", "shellfish", "mustard", "sulphites", "other",
+]
+ALLERGEN_BITS = {name: 1 << i for i, name in enumerate(ALLERGENS)}
+
+ALLERGEN_SYNONYMS = {
+    "wheat": "gluten", "barley": "gluten", "rye": "gluten", "oats": "gluten",
+    "dairy": "milk", "lactose": "milk", "egg": "eggs", "peanut": "peanuts",
+    "nuts": "tree nuts", "tree nut": "tree nuts", "treenuts": "tree nuts", "almonds": "tree nuts",
+    "soya": "soy", "soybean": "soy", "soybeans": "soy",
+    "crustaceans": "shellfish", "crustacean": "shellfish", "shrimp": "shellfish", "molluscs": "shellfish",
+    "sulfites": "sulphites", "sulphite": "sulphites", "sulfite": "sulphites",
+}
+
+STORAGE_TYPES = ["ambient", "refrigerated", "frozen", "other"]
+STORAGE_SHIFT = 16
+STORAGE_BITS = {name: 1 << (STORAGE_SHIFT + i) for i, name in enumerate(STORAGE_TYPES)}
+
+STORAGE_SYNONYMS = {
+    "room temperature": "ambient", "shelf stable": "ambient", "dry": "ambient", "pantry": "ambient",
+    "chilled": "refrigerated", "fridge": "refrigerated", "cold": "refrigerated", "refrigerator": "refrigerated",
+    "freezer": "frozen",
+}
+
+
+def normalize_allergen(value: str) -> str:
+    key = " ".join(str(value).strip().lower().replace("-", " ").replace("_", " ").split())
+    key = ALLERGEN_SYNONYMS.get(key, key)
+    return key if key in ALLERGEN_BITS else "other"
+
+
+def normalize_storage(value: Optional[str]) -> Optional[str]:
+    if not value or not str(value).strip():
+        return None
+    key = " ".join(str(value).strip().lower().replace("-", " ").replace("_", " ").split())
+    key = STORAGE_SYNONYMS.get(key, key)
+    return key if key in STORAGE_BITS else "other"
+
+
+def _as_list(allergens) -> list:
+    if isinstance(allergens, str):
+        # Rows written by raw SQL may hold the JSON text rather than a list
+        try:
+            allergens = json.loads(allergens)
+        except ValueError:
+            allergens = [allergens]
+    return allergens if isinstance(allergens, list) else []
+
+
+def allergen_bits(allergens: Iterable[str]) -> int:
+    mask = 0
+    for value in allergens:
+        if str(value).strip():
+            mask |= ALLERGEN_BITS[normalize_allergen(value)]
+    return mask
+
+
+def attribute_mask(allergens, storage_type: Optional[str]) -> int:
+    """Bitmask for an item's allergens and storage type"""
+    mask = allergen_bits(_as_list(allergens))
+    storage = normalize_storage(storage_type)
+    if storage:
+        mask |= STORAGE_BITS[storage]
+    return mask
+
+
+def split_csv(values: Optional[list[str]]) -> list[str]:
+    """Accept both ``?x=a&x=b`` and ``?x=a,b``"""
+    return [part.strip() for value in values or [] for part in value.split(",") if part.strip()]
+
+
+def storage_bits(names: Iterable[str]) -> int:
+    mask = 0
+    for name in names:
+        storage = normalize_storage(name)
+        if storage is None:
+            continue
+        if storage == "other" and name.strip().lower() != "other":
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown storage type '{name}'. Use one of: {', '.join(STORAGE_TYPES)}",
+            )
+        mask |= STORAGE_BITS[storage]
+    return mask
+
+
+def apply_attribute_filters(query, exclude_allergens: Optional[list[str]], storage_types: Optional[list[str]]):
+    """Add the bitwise exclude_allergens / storage_type predicates to an Item query"""
+    excluded = allergen_bits(split_csv(exclude_allergens))
+    if excluded:
+        query = query.filter(Item.attribute_mask.bitwise_and(excluded) == 0)
+    storage = storage_bits(split_csv(storage_types))
+    if storage:
+        query = query.filter(Item.attribute_mask.bitwise_and(storage) != 0)
+    return query
+
+
+@event.listens_for(Item, "before_insert")
+@event.listens_for(Item, "before_update")
+def _sync_attribute_mask(mapper, connection, target: Item):
+    target.attribute_mask = attribute_mask(target.allergens_json, target.storage_type)
+
+
+def backfill_attribute_masks(conn) -> int:
+    """Recompute ``attribute_mask`` for every item (migration backfill)"""
+    table = Item.__table__
+    rows = conn.execute(table.select().with_only_columns(table.c.id, table.c.allergens_json, table.c.storage_type))
+    updates = [
+        {"_id": row.id, "new_mask": attribute_mask(row.allergens_json, row.storage_type)}
+        for row in rows
+    ]
+    updates = [u for u in updates if u["new_mask"]]
+    if updates:
+        conn.execute(
+            update(table).where(table.c.id == bindparam("_id")).values(attribute_mask=bindparam("new_mask")),
+            updates,
+        )
+    return len(updates)
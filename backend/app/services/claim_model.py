@@ -0,0 +1,402 @@
+"""
+Claim-probability model behind the risk panel and risk-sorted listings
+
+A logistic regression over per-item features:
+
+- hours to expiry (log-scaled, capped at ``HORIZON_HOURS``) and whether it expires at all
+- quantity (log-scaled)
+- the org's claim history: smoothed claim rate and donation volume
+- hour of week and hour of day, as cyclic sin/cos pairs
+- category (one-hot over the training vocabulary) and storage type (one-hot)
+
+``train_claim_model.py`` fits it offline on resolved items: claimed ones
+are positives, and ones that expired unclaimed are negatives. Each item is
+observed at a random point of its listed life (between creation and its
+claim or expiry), which is how live items are seen: some time after
+listing, while still unclaimed. The org history counts the org's other
+resolved items (leave-one-out), so an item's own outcome doesn't leak into
+its features. The fitted weights are saved with standardization folded in,
+so scoring the whole live inventory is one ``X @ w + b`` over a single
+feature matrix.
+
+Live items are scored as of now: hours remaining and the current hour of
+week. Their org history is computed the same way, from the org's resolved
+items (live and archived), and cached per process for
+``claim_model_history_seconds``. A live item is unresolved, so it is never
+in its own history. Without an artifact, the old time-pressure heuristic
+is used, still computed vectorized.
+
+Known remaining skew: the training history covers the whole period,
+including items resolved after the observed one, while live history only
+has the past; and the training observation point is uniform over an
+item's life, while live requests see items whenever they arrive.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Query, Session
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import ArchivedItem, Item
+from app.services.attributes import STORAGE_TYPES, normalize_storage
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+HORIZON_HOURS = 720.0
+ORG_PRIOR_WEIGHT = 10.0
+OTHER_CATEGORY = "(other)"
+NUMERIC_FEATURES = [
+    "log_hours_to_expiry", "has_expiry", "log_quantity", "org_claim_rate", "log_org_donations",
+    "how_sin", "how_cos", "hod_sin", "hod_cos",
+]
+# Columns loaded for the risk panel and risk-sorted listings
+LIVE_COLUMNS = (Item.id, Item.title, Item.org_id, Item.category, Item.storage_type, Item.quantity, Item.expires_at)
+
+
+def model_path(path: Optional[str] = None) -> Path:
+    resolved = Path(path or get_settings().claim_model_path)
+    return resolved if resolved.is_absolute() else BACKEND_DIR / resolved
+
+
+@dataclass
+class ItemFrame:
+    """Column arrays for a batch of items, as of ``observed_at``"""
+    observed_at: np.ndarray  # datetime64[s]
+    expires_at: np.ndarray  # datetime64[s], NaT = never
+    quantity: np.ndarray  # float64, NaN = unknown
+    category: np.ndarray  # object
+    storage_type: np.ndarray  # object
+    org_claims: np.ndarray  # float64
+    org_donations: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.observed_at)
+
+
+def _normalize_categories(values: np.ndarray) -> np.ndarray:
+    uniques, inverse = np.unique(np.where(values == None, "", values).astype(str), return_inverse=True)  # noqa: E711
+    return np.array([" ".join(u.lower().split()) for u in uniques], dtype=object)[inverse]
+
+
+def _one_hot(values: np.ndarray, vocabulary: list[str], other: Optional[int]) -> np.ndarray:
+    index = {v: i for i, v in enumerate(vocabulary)}
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    columns = np.array([index.get(u, -1 if other is None else other) for u in uniques], dtype=np.int64)[inverse]
+    out = np.zeros((len(values), len(vocabulary)))
+    hit = columns >= 0
+    out[np.flatnonzero(hit), columns[hit]] = 1.0
+    return out
+
+
+def feature_matrix(frame: ItemFrame, categories: list[str], prior_rate: float) -> np.ndarray:
+    has_expiry = ~np.isnat(frame.expires_at)
+    hours = (frame.expires_at - frame.observed_at).astype("timedelta64[s]").astype(np.float64) / 3600.0
+    hours = np.where(has_expiry, np.clip(np.nan_to_num(hours, nan=HORIZON_HOURS), 0.0, HORIZON_HOURS), HORIZON_HOURS)
+    quantity = np.nan_to_num(frame.quantity.astype(np.float64), nan=1.0).clip(0.0, None)
+    org_rate = (frame.org_claims + ORG_PRIOR_WEIGHT * prior_rate) / (frame.org_donations + ORG_PRIOR_WEIGHT)
+
+    seconds = frame.observed_at.astype(np.int64)
+    # 1970-01-01 was a Thursday: shift so hour-of-week 0 is Monday 00:00
+    how = ((seconds // 3600) + 72) % 168
+    hod = (seconds // 3600) % 24
+    numeric = np.column_stack([
+        np.log1p(hours), has_expiry.astype(np.float64), np.log1p(quantity), org_rate,
+        np.log1p(frame.org_donations),
+        np.sin(2 * np.pi * how / 168), np.cos(2 * np.pi * how / 168),
+        np.sin(2 * np.pi * hod / 24), np.cos(2 * np.pi * hod / 24),
+    ])
+    storages = np.array([normalize_storage(s) or "" for s in frame.storage_type], dtype=object)
+    return np.hstack([
+        numeric,
+        _one_hot(_normalize_categories(frame.category), categories, other=categories.index(OTHER_CATEGORY)),
+        _one_hot(storages, STORAGE_TYPES, other=None),
+    ])
+
+
+@dataclass
+class ClaimModel:
+    weights: np.ndarray
+    bias: float
+    categories: list[str]
+    prior_rate: float
+    meta: dict = field(default_factory=dict)
+
+    @property
+    def feature_names(self) -> list[str]:
+        return NUMERIC_FEATURES + [f"category={c}" for c in self.categories] + [f"storage={s}" for s in STORAGE_TYPES]
+
+    def features(self, frame: ItemFrame) -> np.ndarray:
+        return feature_matrix(frame, self.categories, self.prior_rate)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Claim probability for each row of a feature matrix: one batched matrix multiply"""
+        return 1.0 / (1.0 + np.exp(-np.clip(X @ self.weights + self.bias, -30, 30)))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {**self.meta, "categories": self.categories, "prior_rate": self.prior_rate,
+                "feature_names": self.feature_names}
+        scratch = path.with_name(path.name + ".tmp.npz")
+        np.savez(scratch, weights=self.weights, bias=np.float64(self.bias), meta=np.array(json.dumps(meta)))
+        os.replace(scratch, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ClaimModel":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            model = cls(data["weights"].copy(), float(data["bias"]), meta["categories"], meta["prior_rate"], meta)
+        if len(model.weights) != len(model.feature_names):
+            raise ValueError(f"{path} has {len(model.weights)} weights for {len(model.feature_names)} features")
+        return model
+
+
+_cached: Optional[ClaimModel] = None
+_cached_key = None
+
+
+def get_claim_model() -> Optional[ClaimModel]:
+    """The trained model, loaded once per process and reloaded when the artifact changes"""
+    global _cached, _cached_key
+    path = model_path()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        _cached, _cached_key = None, None
+        return None
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key != _cached_key:
+        try:
+            _cached = ClaimModel.load(path)
+        except Exception as e:
+            logger.error(f"Could not load claim model {path}: {e}")
+            _cached = None
+        _cached_key = key
+    return _cached
+
+
+# --- training -----------------------------------------------------------------
+
+def _auc(y: np.ndarray, score: np.ndarray) -> float:
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if not positives or not negatives:
+        return float("nan")
+    order = np.argsort(score, kind="mergesort")
+    ranks = np.empty(len(score))
+    ranks[order] = np.arange(1, len(score) + 1)
+    # Average ranks across ties so constant scores give 0.5
+    _, inverse, counts = np.unique(score, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, weights=ranks) / counts)[inverse]
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def _log_loss(y: np.ndarray, p: np.ndarray) -> float:
+    p = np.clip(p, 1e-7, 1 - 1e-7)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def _fit_logistic(X: np.ndarray, y: np.ndarray, l2: float, max_iter: int = 50) -> tuple[np.ndarray, float]:
+    """L2-regularized logistic regression by Newton's method; returns weights on unscaled features"""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = np.hstack([(X - mean) / std, np.ones((len(X), 1))])
+    n, k = Z.shape
+    penalty = np.full(k, l2 / n)
+    penalty[-1] = 0.0  # no penalty on the intercept
+    prior = min(max(y.mean(), 1e-4), 1 - 1e-4)
+    w = np.zeros(k)
+    w[-1] = np.log(prior / (1 - prior))
+    for _ in range(max_iter):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Z @ w, -30, 30)))
+        gradient = Z.T @ (p - y) / n + penalty * w
+        hessian = (Z.T * (p * (1 - p))) @ Z / n + np.diag(penalty + 1e-9)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.max(np.abs(step)) < 1e-6:
+            break
+    weights = w[:-1] / std
+    return weights, float(w[-1] - np.sum(w[:-1] * mean / std))
+
+
+def _leave_one_out_org_history(org_id: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    _, inverse = np.unique(org_id, return_inverse=True)
+    donations = np.bincount(inverse).astype(np.float64)
+    claims = np.bincount(inverse, weights=y)
+    return claims[inverse] - y, donations[inverse] - 1.0
+
+
+def heuristic_risk(hours_left: np.ndarray, quantity: np.ndarray) -> np.ndarray:
+    """The original risk panel score: time pressure plus a quantity factor"""
+    return 1.0 / (1.0 + hours_left) + 0.05 * quantity
+
+
+def train(columns: dict, now: datetime, l2: float = 1.0, min_category_count: int = 20,
+          holdout: float = 0.2, max_rows: Optional[int] = None, seed: int = 42) -> tuple[ClaimModel, dict]:
+    """Fit on resolved items; ``columns`` holds numpy arrays named like the items table.
+
+    Quality is reported on the newest ``holdout`` share of items (fit on the
+    rest); the returned model is then refit on every resolved item.
+    """
+    now64 = np.datetime64(now, "s")
+    rng = np.random.default_rng(seed)
+    created = np.where(np.isnat(columns["created_at"]), columns["ready_at"], columns["created_at"])
+    expires = columns["expires_at"]
+    claimed = ~np.isnat(columns["claimed_at"])
+    expired = ~claimed & ~np.isnat(expires) & (expires < now64)
+    resolved = np.flatnonzero((claimed | expired) & ~np.isnat(created))
+    if max_rows and len(resolved) > max_rows:
+        resolved = np.sort(rng.choice(resolved, max_rows, replace=False))
+    resolved = resolved[np.argsort(created[resolved], kind="stable")]
+    if len(resolved) < 50:
+        raise ValueError(f"Only {len(resolved)} resolved items; need at least 50 to train")
+
+    y = claimed[resolved].astype(np.float64)
+    org_claims, org_donations = _leave_one_out_org_history(columns["org_id"][resolved], y)
+    # Observe each item at a uniform point between listing and its claim or expiry
+    resolved_at = np.where(claimed, columns["claimed_at"], expires)[resolved]
+    life = (resolved_at - created[resolved]).astype("timedelta64[s]").astype(np.int64).clip(0, None)
+    observed = created[resolved] + (life * rng.random(len(resolved))).astype("timedelta64[s]")
+    frame = ItemFrame(
+        observed_at=observed,
+        expires_at=expires[resolved],
+        quantity=columns["quantity"][resolved].astype(np.float64),
+        category=columns["category"][resolved],
+        storage_type=columns["storage_type"][resolved],
+        org_claims=org_claims,
+        org_donations=org_donations,
+    )
+    names, counts = np.unique(_normalize_categories(frame.category), return_counts=True)
+    categories = sorted(str(n) for n, c in zip(names, counts) if c >= min_category_count and n) + [OTHER_CATEGORY]
+    prior_rate = float(y.mean())
+    X = feature_matrix(frame, categories, prior_rate)
+
+    split = int(len(y) * (1 - holdout))
+    weights, bias = _fit_logistic(X[:split], y[:split], l2)
+    model = ClaimModel(weights, bias, categories, prior_rate)
+    p = model.predict(X[split:])
+    hours = np.expm1(X[split:, 0])
+    quantity = np.expm1(X[split:, 2])
+    report = {
+        "rows": int(len(y)),
+        "train_rows": split,
+        "holdout_rows": int(len(y) - split),
+        "claim_rate": round(prior_rate, 4),
+        "holdout_auc": round(_auc(y[split:], p), 4),
+        "holdout_log_loss": round(_log_loss(y[split:], p), 4),
+        "baseline_log_loss": round(_log_loss(y[split:], np.full(len(p), y[:split].mean())), 4),
+        # Lower heuristic risk should mean more likely to be claimed
+        "heuristic_auc": round(_auc(y[split:], -heuristic_risk(hours, quantity)), 4),
+    }
+
+    weights, bias = _fit_logistic(X, y, l2)
+    model = ClaimModel(weights, bias, categories, prior_rate, meta={
+        "trained_at": now.isoformat(), "l2": l2, "report": report,
+    })
+    return model, report
+
+
+# --- live scoring ---------------------------------------------------------------
+
+class OrgHistoryCache:
+    """Per-org (claims, resolved items) over live and archived items, as training counts them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history: Optional[dict[int, tuple[float, float]]] = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, now: datetime) -> dict[int, tuple[float, float]]:
+        ttl = get_settings().claim_model_history_seconds
+        with self._lock:
+            if self._history is not None and time.monotonic() - self._loaded_at < ttl:
+                self.hits += 1
+                return self._history
+            self.misses += 1
+        history: dict[int, tuple[float, float]] = {}
+        # Per table rather than through ItemHistory so each grouped scan can use its own indexes
+        for entity in (Item, ArchivedItem):
+            claimed = entity.claimed_at.isnot(None)
+            rows = db.execute(
+                select(entity.org_id, func.sum(case((claimed, 1), else_=0)), func.count())
+                .where(claimed | (entity.expires_at < now))
+                .group_by(entity.org_id)
+            )
+            for org_id, claims, resolved in rows:
+                previous = history.get(org_id, (0.0, 0.0))
+                history[org_id] = (previous[0] + float(claims or 0), previous[1] + float(resolved))
+        with self._lock:
+            self._history, self._loaded_at = history, time.monotonic()
+        return history
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._history or ()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+org_history_cache = OrgHistoryCache()
+register_cache("claim_org_history", org_history_cache.stats)
+
+
+def live_frame(db: Session, rows: list, now: datetime) -> ItemFrame:
+    """Feature inputs for LIVE_COLUMNS rows, observed now"""
+    history = org_history_cache.get(db, now)
+    counts = np.array([history.get(row.org_id, (0.0, 0.0)) for row in rows], dtype=np.float64).reshape(-1, 2)
+    return ItemFrame(
+        observed_at=np.full(len(rows), np.datetime64(now, "s")),
+        expires_at=np.array([row.expires_at for row in rows], dtype="datetime64[s]"),
+        quantity=np.array([row.quantity for row in rows], dtype=np.float64),
+        category=np.array([row.category for row in rows], dtype=object),
+        storage_type=np.array([row.storage_type for row in rows], dtype=object),
+        org_claims=counts[:, 0],
+        org_donations=counts[:, 1],
+    )
+
+
+def score_inventory(db: Session, query: Query, now: datetime) -> tuple[list, np.ndarray, Optional[np.ndarray]]:
+    """Rows of ``query`` (as LIVE_COLUMNS) with a risk score each, higher = more likely to go unclaimed.
+
+    Returns (rows, risk, claim_probability); the probability is None when no
+    trained model is available and the heuristic was used.
+    """
+    rows = query.with_entities(*LIVE_COLUMNS).all()
+    if not rows:
+        return rows, np.empty(0), None
+    model = get_claim_model()
+    if model is None:
+        expires = np.array([row.expires_at for row in rows], dtype="datetime64[s]")
+        hours_left = (expires - np.datetime64(now, "s")).astype(np.float64) / 3600.0
+        hours_left = np.where(np.isnat(expires), 9999.0, np.clip(np.nan_to_num(hours_left), 0.0, None))
+        quantity = np.array([row.quantity for row in rows], dtype=np.float64)
+        quantity = np.where(np.isnan(quantity) | (quantity == 0), 1.0, quantity)
+        return rows, heuristic_risk(hours_left, quantity), None
+    probability = model.predict(model.features(live_frame(db, rows, now)))
+    return rows, 1.0 - probability, probability
+
+
+def top_indices(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the ``limit`` highest scores, highest first"""
+    if limit >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    return top[np.argsort(-scores[top], kind="stable")]
@@ -0,0 +1,212 @@
+"""
+Server-side map clustering of listed items (GET /items/clusters)
+
+Items are located at their organization, so the work splits in two:
+
+1. One grouped query counts live listings per (organization, category).
+   The result is small (orgs x categories) and is shared by every zoom
+   level.
+2. Per zoom level, organizations are binned into a global grid of
+   ``cluster_cells_per_tile`` x ``cluster_cells_per_tile`` cells per map
+   tile. Each cell records its item count, count-weighted centroid and
+   category mix.
+
+A request only picks the cells of its zoom whose centroid falls in the
+bounding box. If that is still more than ``max_clusters`` cells (a huge
+viewport at a deep zoom), it steps out a zoom level until it fits, so the
+payload stays at a few hundred records however many items are underneath.
+
+Both levels are cached per process. Item writes here call ``invalidate()``;
+other workers' writes show up after ``cluster_cache_seconds``.
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import Item, Organization
+
+MAX_ZOOM = 22
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    """``min_lng,min_lat,max_lng,max_lat`` (the GeoJSON order)"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise HTTPException(status_code=400, detail="bbox is outside lat -90..90 / lng -180..180 or inverted")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def cell_degrees(zoom: int, cells_per_tile: int) -> float:
+    return 360.0 / (2 ** zoom * cells_per_tile)
+
+
+@dataclass
+class Cell:
+    key: tuple[int, int]
+    count: int = 0
+    lat_sum: float = 0.0
+    lng_sum: float = 0.0
+    categories: dict = field(default_factory=dict)
+    org_ids: set = field(default_factory=set)
+
+    @property
+    def lat(self) -> float:
+        return self.lat_sum / self.count
+
+    @property
+    def lng(self) -> float:
+        return self.lng_sum / self.count
+
+    def out(self, zoom: int, size: float) -> dict:
+        i, j = self.key
+        return {
+            "id": f"{zoom}/{i}/{j}",
+            "lat": round(self.lat, 6),
+            "lng": round(self.lng, 6),
+            "count": self.count,
+            "organizations": len(self.org_ids),
+            # A single-org cell is just that org's marker
+            "org_id": next(iter(self.org_ids)) if len(self.org_ids) == 1 else None,
+            "categories": dict(sorted(self.categories.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "bounds": [j * size, i * size, (j + 1) * size, (i + 1) * size],
+        }
+
+
+class ClusterCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orgs: Optional[list[tuple]] = None  # (org_id, lat, lng, {category: count}, total)
+        self._loaded_at = 0.0
+        self._grids: dict[int, dict[tuple[int, int], Cell]] = {}
+        # Lookups of a zoom level's grid: hits skip both the DB query and the bucketing
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._orgs = None
+            self._grids = {}
+
+    def _org_counts(self, db: Session) -> list[tuple]:
+        ttl = get_settings().cluster_cache_seconds
+        with self._lock:
+            if self._orgs is not None and time.monotonic() - self._loaded_at < ttl:
+                return self._orgs
+        now = datetime.utcnow()
+        rows = (
+            db.query(Item.org_id, Item.category, func.count(Item.id))
+            .filter(Item.status == "listed")
+            .filter((Item.expires_at.is_(None)) | (Item.expires_at >= now))
+            .group_by(Item.org_id, Item.category)
+            .all()
+        )
+        by_org: dict[int, dict] = {}
+        for org_id, category, count in rows:
+            categories = by_org.setdefault(org_id, {})
+            label = category or "Other"
+            categories[label] = categories.get(label, 0) + count
+        located = (
+            db.query(Organization.id, Organization.lat, Organization.lng)
+            .filter(Organization.id.in_(list(by_org)))
+            .filter(Organization.lat.isnot(None), Organization.lng.isnot(None))
+            .all()
+        ) if by_org else []
+        orgs = [(org_id, lat, lng, by_org[org_id], sum(by_org[org_id].values())) for org_id, lat, lng in located]
+        with self._lock:
+            self._orgs, self._loaded_at, self._grids = orgs, time.monotonic(), {}
+        return orgs
+
+    def grid(self, db: Session, zoom: int) -> dict[tuple[int, int], Cell]:
+        orgs = self._org_counts(db)
+        with self._lock:
+            grid = self._grids.get(zoom)
+            if grid is not None:
+                self.hits += 1
+                return grid
+            self.misses += 1
+        size = cell_degrees(zoom, get_settings().cluster_cells_per_tile)
+        grid = {}
+        for org_id, lat, lng, categories, total in orgs:
+            key = (math.floor(lat / size), math.floor(lng / size))
+            cell = grid.get(key)
+            if cell is None:
+                cell = grid[key] = Cell(key)
+            cell.count += total
+            cell.lat_sum += lat * total
+            cell.lng_sum += lng * total
+            cell.org_ids.add(org_id)
+            for category, count in categories.items():
+                cell.categories[category] = cell.categories.get(category, 0) + count
+        with self._lock:
+            if self._orgs is orgs:
+                self._grids[zoom] = grid
+        return grid
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._grids),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+cluster_cache = ClusterCache()
+register_cache("clusters", cluster_cache.stats)
+
+
+def _in_bbox(cell: Cell, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> bool:
+    if not min_lat <= cell.lat <= max_lat:
+        return False
+    if min_lng <= max_lng:
+        return min_lng <= cell.lng <= max_lng
+    return cell.lng >= min_lng or cell.lng <= max_lng  # bbox crossing the antimeridian
+
+
+def clusters(db: Session, bbox: tuple[float, float, float, float], zoom: int, max_clusters: int) -> dict:
+    """Clusters of listed items inside ``bbox`` at ``zoom`` (or coarser, to stay under ``max_clusters``)"""
+    cells_per_tile = get_settings().cluster_cells_per_tile
+    zoom = max(0, min(MAX_ZOOM, zoom))
+    while True:
+        grid = cluster_cache.grid(db, zoom)
+        size = cell_degrees(zoom, cells_per_tile)
+        min_lng, min_lat, max_lng, max_lat = bbox
+        lat_cells = math.floor(max_lat / size) - math.floor(min_lat / size) + 1
+        lng_span = max_lng - min_lng if min_lng <= max_lng else 360 - (min_lng - max_lng)
+        if lat_cells * (lng_span / size + 1) < len(grid):
+            # Small viewport: probe its cells directly instead of scanning the grid
+            i_range = range(math.floor(min_lat / size), math.floor(max_lat / size) + 1)
+            j_lo = math.floor(min_lng / size)
+            wrap = round(360 / size)
+            j_range = [j_lo + k for k in range(min(int(lng_span / size) + 2, wrap))]
+            candidates = (
+                grid.get((i, (j + wrap // 2) % wrap - wrap // 2)) for i in i_range for j in j_range
+            )
+            found = [cell for cell in candidates if cell is not None and _in_bbox(cell, *bbox)]
+        else:
+            found = [cell for cell in grid.values() if _in_bbox(cell, *bbox)]
+        if len(found) <= max_clusters or zoom == 0:
+            break
+        zoom -= 1
+    found.sort(key=lambda cell: -cell.count)
+    return {
+        "zoom": zoom,
+        "cell_degrees": size,
+        "total": sum(cell.count for cell in found),
+        "clusters": [cell.out(zoom, size) for cell in found[:max_clusters]],
+    }
@@ -0,0 +1,297 @@
+"""
+Columnar snapshots of the analytics tables
+
+``analytics_snapshot.py`` copies items (live and archived), events and
+organizations into one ``.npy`` file per column. The loader memory-maps
+those files, so heavy analytics and the EDA notebook scan full history as
+vectorized numpy passes over the page cache instead of through the OLTP
+database.
+
+Layout (``settings.analytics_snapshot_dir``)::
+
+    CURRENT                       name of the newest complete snapshot
+    20261019T031500/
+        manifest.json             tables, row counts, column kinds, timestamps
+        items/status.npy          int32 codes, -1 for NULL
+        items/status.dict.json    code -> string
+        items/ready_at.npy        datetime64[s], NaT for NULL
+        ...
+
+Column kinds:
+
+- ``int``: int64, -1 for NULL (ids and bitmasks are never negative)
+- ``float``: float64, NaN for NULL
+- ``time``: datetime64[s] (naive UTC, like the database), NaT for NULL
+- ``str``: dictionary-encoded; int32 codes plus a JSON list of values
+
+A snapshot is written into a new directory and published by replacing
+CURRENT, so readers never see a half-written one. Rows are bounded by each
+table's max id at the start and streamed in chunks, so memory stays flat
+however large the tables are.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import Event, Organization
+from app.services.archive import ItemHistory
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+TABLES = {
+    "items": (ItemHistory, [
+        ("id", "int"), ("org_id", "int"), ("donated_by_user_id", "int"), ("claimed_by_user_id", "int"),
+        ("status", "str"), ("category", "str"), ("storage_type", "str"), ("quantity", "float"),
+        ("attribute_mask", "int"), ("created_at", "time"), ("ready_at", "time"), ("expires_at", "time"),
+        ("claimed_at", "time"),
+    ]),
+    "events": (Event, [
+        ("id", "int"), ("created_at", "time"), ("user_id", "int"), ("item_id", "int"), ("org_id", "int"),
+        ("event_type", "str"),
+    ]),
+    "organizations": (Organization, [
+        ("id", "int"), ("name", "str"), ("type", "str"), ("address", "str"), ("lat", "float"), ("lng", "float"),
+    ]),
+}
+
+_DTYPES = {"int": np.int64, "float": np.float64, "time": "datetime64[s]", "str": np.int32}
+
+
+def snapshot_root(path: Optional[str] = None) -> Path:
+    root = Path(path or get_settings().analytics_snapshot_dir)
+    return root if root.is_absolute() else BACKEND_DIR / root
+
+
+def _encode(kind: str, values: list, dictionary: Optional[dict]) -> np.ndarray:
+    if kind == "int":
+        return np.array([-1 if v is None else v for v in values], dtype=np.int64)
+    if kind == "float":
+        return np.array(values, dtype=np.float64)
+    if kind == "time":
+        return np.array(values, dtype="datetime64[s]")
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        codes[i] = -1 if v is None else dictionary.setdefault(v, len(dictionary))
+    return codes
+
+
+def _write_table(bind: Engine, name: str, directory: Path, batch_size: int) -> dict:
+    model, columns = TABLES[name]
+    table_dir = directory / name
+    table_dir.mkdir(parents=True)
+    with bind.connect() as conn:
+        max_id = conn.execute(select(func.max(model.id))).scalar() or 0
+        capacity = conn.execute(select(func.count(model.id)).where(model.id <= max_id)).scalar() or 0
+        arrays = {
+            column: np.lib.format.open_memmap(table_dir / f"{column}.npy", mode="w+",
+                                              dtype=_DTYPES[kind], shape=(capacity,))
+            for column, kind in columns
+        }
+        dictionaries = {column: {} for column, kind in columns if kind == "str"}
+        query = (
+            select(*(getattr(model, column) for column, _ in columns))
+            .where(model.id <= max_id)
+            .order_by(model.id)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        rows = 0
+        for chunk in conn.execute(query).partitions():
+            # Rows deleted after the count leave the tail unused; inserts are excluded by max_id
+            chunk = chunk[:capacity - rows]
+            if not chunk:
+                break
+            end = rows + len(chunk)
+            for i, (column, kind) in enumerate(columns):
+                arrays[column][rows:end] = _encode(kind, [row[i] for row in chunk], dictionaries.get(column))
+            rows = end
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    for column, dictionary in dictionaries.items():
+        (table_dir / f"{column}.dict.json").write_text(json.dumps(list(dictionary)))
+    return {"rows": rows, "max_id": max_id, "columns": dict(columns)}
+
+
+def write_snapshot(bind: Engine, root: Optional[Path] = None, keep: Optional[int] = None,
+                   batch_size: int = 50_000) -> dict:
+    """Write a complete snapshot, publish it as CURRENT and prune old ones; returns its manifest"""
+    settings = get_settings()
+    root = root or snapshot_root()
+    keep = settings.analytics_snapshot_keep if keep is None else keep
+    started = datetime.utcnow()
+    name = started.strftime("%Y%m%dT%H%M%S")
+    directory = root / name
+    scratch = root / f".{name}.tmp"
+    shutil.rmtree(scratch, ignore_errors=True)
+    scratch.mkdir(parents=True)
+    try:
+        tables = {table: _write_table(bind, table, scratch, batch_size) for table in TABLES}
+        manifest = {
+            "name": name,
+            "started_at": started.isoformat(),
+            "finished_at": datetime.utcnow().isoformat(),
+            "tables": tables,
+        }
+        (scratch / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        os.replace(scratch, directory)
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    pointer = root / "CURRENT.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, root / "CURRENT")
+    prune(root, keep)
+    return manifest
+
+
+def prune(root: Path, keep: int) -> list[str]:
+    """Delete all but the newest ``keep`` snapshots (never the CURRENT one).
+
+    Processes that still map an older snapshot keep reading it: the files
+    are unlinked, not truncated.
+    """
+    current = _current_name(root)
+    names = sorted(p.name for p in root.iterdir() if p.is_dir() and (p / "manifest.json").exists())
+    removed = []
+    for name in names[:max(0, len(names) - max(1, keep))]:
+        if name != current:
+            shutil.rmtree(root / name, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def _current_name(root: Path) -> Optional[str]:
+    try:
+        return (root / "CURRENT").read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class Table:
+    """One table of a snapshot; columns are read-only memory maps"""
+
+    def __init__(self, directory: Path, meta: dict):
+        self.directory = directory
+        self.rows = meta["rows"]
+        self.kinds = meta["columns"]
+        self._columns: dict[str, np.ndarray] = {}
+        self._dictionaries: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """The column's values (codes for dictionary-encoded strings), zero-copy"""
+        array = self._columns.get(column)
+        if array is None:
+            if column not in self.kinds:
+                raise KeyError(column)
+            array = np.load(self.directory / f"{column}.npy", mmap_mode="r")[:self.rows]
+            self._columns[column] = array
+        return array
+
+    def dictionary(self, column: str) -> np.ndarray:
+        values = self._dictionaries.get(column)
+        if values is None:
+            values = np.array(json.loads((self.directory / f"{column}.dict.json").read_text()), dtype=object)
+            self._dictionaries[column] = values
+        return values
+
+    def code(self, column: str, value: str) -> int:
+        """Code of ``value`` in a string column, or -2 (matches nothing) when absent"""
+        matches = np.flatnonzero(self.dictionary(column) == value)
+        return int(matches[0]) if len(matches) else -2
+
+    def decode(self, column: str) -> np.ndarray:
+        """Materialize a string column as an object array (None for NULL)"""
+        codes = self[column]
+        values = np.append(self.dictionary(column), None)
+        return values[np.where(codes < 0, len(values) - 1, codes)]
+
+
+@dataclass
+class Snapshot:
+    name: str
+    directory: Path
+    manifest: dict
+    tables: dict
+
+    @property
+    def finished_at(self) -> datetime:
+        return datetime.fromisoformat(self.manifest["finished_at"])
+
+    def __getitem__(self, table: str) -> Table:
+        return self.tables[table]
+
+
+def load_snapshot(root: Optional[Path] = None, name: Optional[str] = None) -> Optional[Snapshot]:
+    """Open a snapshot (default: CURRENT) without reading its columns; None if there is none"""
+    root = root or snapshot_root()
+    name = name or _current_name(root)
+    if not name:
+        return None
+    directory = root / name
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text())
+    except FileNotFoundError:
+        return None
+    tables = {table: Table(directory / table, meta) for table, meta in manifest["tables"].items()}
+    return Snapshot(name, directory, manifest, tables)
+
+
+_cached: Optional[Snapshot] = None
+_checked_at = 0.0
+# Requests served from the snapshot (hits) vs. sent back to the database (misses)
+_lookups = {"hits": 0, "misses": 0}
+
+
+def current_snapshot(max_age: Optional[timedelta] = None) -> Optional[Snapshot]:
+    """CURRENT snapshot for request handlers, or None when missing or older than ``max_age``.
+
+    The opened snapshot (and its mapped columns) is reused across requests
+    until CURRENT points somewhere else; CURRENT is re-read at most once a second.
+    """
+    global _cached, _checked_at
+    now = time.monotonic()
+    if _cached is None or now - _checked_at >= 1.0:
+        _checked_at = now
+        root = snapshot_root()
+        name = _current_name(root)
+        if name is None:
+            _cached = None
+        elif _cached is None or _cached.name != name:
+            _cached = load_snapshot(root, name)
+    if max_age is None:
+        max_age = timedelta(hours=get_settings().analytics_snapshot_max_age_hours)
+    if _cached is None or datetime.utcnow() - _cached.finished_at > max_age:
+        _lookups["misses"] += 1
+        return None
+    _lookups["hits"] += 1
+    return _cached
+
+
+def snapshot_stats() -> dict:
+    lookups = _lookups["hits"] + _lookups["misses"]
+    return {
+        "size": 0 if _cached is None else 1,
+        **_lookups,
+        "hit_rate": round(_lookups["hits"] / lookups, 4) if lookups else 0.0,
+    }
+
+
+register_cache("analytics_snapshot", snapshot_stats)
@@ -0,0 +1,145 @@
+"""
+Stored activity counters on users and organizations
+
+Profile and organization pages used to COUNT(*) the whole items table on
+every request. Each user and organization row now carries its own donation
+and claim counts, rescued quantity and last activity time. They are bumped
+inside the create/claim transactions and can be rebuilt from ``items`` and
+``items_archive`` at any time:
+
+    python -m app.services.counters
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import Organization, User
+from app.services.archive import ItemHistory
+
+COUNTER_COLUMNS = ("donation_count", "claim_count", "quantity_rescued", "last_activity_at")
+
+
+def record_donation(db: Session, org_id: int, user_id: Optional[int], when: datetime) -> None:
+    """Count a new listing against its organization and donor (caller commits)."""
+    db.query(Organization).filter(Organization.id == org_id).update(
+        {
+            Organization.donation_count: Organization.donation_count + 1,
+            Organization.last_activity_at: when,
+        },
+        synchronize_session=False,
+    )
+    if user_id is not None:
+        db.query(User).filter(User.id == user_id).update(
+            {User.donation_count: User.donation_count + 1, User.last_activity_at: when},
+            synchronize_session=False,
+        )
+
+
+def record_claim(db: Session, org_id: int, user_id: Optional[int], quantity: Optional[float], when: datetime) -> None:
+    """Count a claim against the item's organization and the claimer (caller commits)."""
+    quantity = quantity or 0.0
+    db.query(Organization).filter(Organization.id == org_id).update(
+        {
+            Organization.claim_count: Organization.claim_count + 1,
+            Organization.quantity_rescued: Organization.quantity_rescued + quantity,
+            Organization.last_activity_at: when,
+        },
+        synchronize_session=False,
+    )
+    if user_id is not None:
+        db.query(User).filter(User.id == user_id).update(
+            {
+                User.claim_count: User.claim_count + 1,
+                User.quantity_rescued: User.quantity_rescued + quantity,
+                User.last_activity_at: when,
+            },
+            synchronize_session=False,
+        )
+
+
+def _actual_counters(bind, donation_key, claim_key) -> dict[int, dict]:
+    """Recompute counters keyed by ``donation_key``/``claim_key`` with grouped scans of item history."""
+    actual: dict[int, dict] = {}
+
+    def row(key):
+        return actual.setdefault(key, {
+            "donation_count": 0, "claim_count": 0, "quantity_rescued": 0.0, "last_activity_at": None,
+        })
+
+    donations = bind.execute(
+        select(donation_key, func.count(ItemHistory.id), func.max(ItemHistory.created_at))
+        .where(donation_key.isnot(None))
+        .group_by(donation_key)
+    )
+    for key, count, last in donations:
+        entry = row(key)
+        entry["donation_count"] = count
+        entry["last_activity_at"] = last
+
+    claims = bind.execute(
+        select(claim_key, func.count(ItemHistory.id), func.coalesce(func.sum(ItemHistory.quantity), 0.0), func.max(ItemHistory.claimed_at))
+        .where(claim_key.isnot(None))
+        .where(ItemHistory.status == "claimed")
+        .group_by(claim_key)
+    )
+    for key, count, quantity, last in claims:
+        entry = row(key)
+        entry["claim_count"] = count
+        entry["quantity_rescued"] = float(quantity)
+        if last is not None and (entry["last_activity_at"] is None or last > entry["last_activity_at"]):
+            entry["last_activity_at"] = last
+    return actual
+
+
+def _reconcile_table(bind, model, donation_key, claim_key) -> int:
+    actual = _actual_counters(bind, donation_key, claim_key)
+    empty = {"donation_count": 0, "claim_count": 0, "quantity_rescued": 0.0, "last_activity_at": None}
+
+    drifted = []
+    stored_rows = bind.execute(select(model.id, *(getattr(model, col) for col in COUNTER_COLUMNS)))
+    for stored in stored_rows:
+        expected = actual.get(stored.id, empty)
+        current = {col: getattr(stored, col) for col in COUNTER_COLUMNS}
+        if (
+            current["donation_count"] != expected["donation_count"]
+            or current["claim_count"] != expected["claim_count"]
+            or abs((current["quantity_rescued"] or 0.0) - expected["quantity_rescued"]) > 1e-9
+            or current["last_activity_at"] != expected["last_activity_at"]
+        ):
+            drifted.append({"_id": stored.id, **{f"new_{col}": expected[col] for col in COUNTER_COLUMNS}})
+
+    if drifted:
+        table = model.__table__
+        bind.execute(
+            update(table).where(table.c.id == bindparam("_id")).values(
+                {col: bindparam(f"new_{col}") for col in COUNTER_COLUMNS}
+            ),
+            drifted,
+        )
+    return len(drifted)
+
+
+def reconcile_counters(bind) -> dict[str, int]:
+    """Rebuild stored counters from live and archived items; returns the number of drifted rows fixed.
+
+    ``bind`` may be a Session or a Connection; the caller commits.
+    """
+    return {
+        "users": _reconcile_table(bind, User, ItemHistory.donated_by_user_id, ItemHistory.claimed_by_user_id),
+        "organizations": _reconcile_table(bind, Organization, ItemHistory.org_id, ItemHistory.org_id),
+    }
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile_counters(db)
+        db.commit()
+        print(f"✅ Counters reconciled: {fixed['users']} user rows and {fixed['organizations']} organization rows fixed")
+    finally:
+        db.close()
@@ -5,11 +5,14 @@ Email notification service for food waste tracker
 import os
 import smtplib
 import logging
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
 from datetime import datetime
 from app.models.models import Item, Organization, User
+from app.core.metrics import email_latency
+from app.core.tracing import span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -52,10 +55,17 @@ def send_email(to_email: str, subject: str, html_content: str, text_content: str
             msg.attach(MIMEText(text_content, 'plain'))
         msg.attach(MIMEText(html_content, 'html'))
 
-        with smtplib.SMTP(settings["SMTP_SERVER"], settings["SMTP_PORT"]) as server:
-            server.starttls()
-            server.login(settings["EMAIL_USER"], settings["EMAIL_PASSWORD"])
-            server.sendmail(msg['From'], [to_email], msg.as_string())
+        started = time.perf_counter()
+        try:
+            with span("smtp.send", server=settings["SMTP_SERVER"]), \
+                    smtplib.SMTP(settings["SMTP_SERVER"], settings["SMTP_PORT"]) as server:
+                server.starttls()
+                server.login(settings["EMAIL_USER"], settings["EMAIL_PASSWORD"])
+                server.sendmail(msg['From'], [to_email], msg.as_string())
+        except Exception:
+            email_latency.observe("error", value=time.perf_counter() - started)
+            raise
+        email_latency.observe("ok", value=time.perf_counter() - started)
 
         logger.info(f"✅ Email sent successfully to {to_email}")
         return True
@@ -307,3 +317,71 @@ def send_registration_welcome_email(user: User):
     
     subject = "🌱 Welcome to FoodBridge!"
     return send_email(user.email, subject, html_content, text_content)
+
+
+def send_saved_search_alert(user: User, item: Item, organization: Optional[Organization], search_names: list[str]):
+    """Tell a user that a new item matches one or more of their saved searches"""
+
+    searches = ", ".join(search_names)
+    location = ""
+    if organization:
+        location = organization.name + (f" ({organization.address})" if organization.address else "")
+
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; }}
+            .header {{ background-color: #4CAF50; color: white; padding: 20px; text-align: center; }}
+            .content {{ padding: 20px; }}
+            .item-details {{ background-color: #f9f9f9; padding: 15px; border-radius: 5px; margin: 15px 0; }}
+            .footer {{ background-color: #f1f1f1; padding: 15px; text-align: center; font-size: 12px; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>🔎 New Match for Your Saved Search</h1>
+        </div>
+
+        <div class="content">
+            <h2>Hi {user.name},</h2>
+            <p>A new item matching <strong>{searches}</strong> was just listed:</p>
+
+            <div class="item-details">
+                <h3>📦 {item.title}</h3>
+                {f'<p><strong>Description:</strong> {item.description}</p>' if item.description else ''}
+                {f'<p><strong>Quantity:</strong> {item.quantity}</p>' if item.quantity else ''}
+                {f'<p><strong>Category:</strong> {item.category}</p>' if item.category else ''}
+                {f'<p><strong>Pickup at:</strong> {location}</p>' if location else ''}
+                {f'<p><strong>Expires:</strong> {item.expires_at.strftime("%B %d, %Y at %I:%M %p")}</p>' if item.expires_at else ''}
+            </div>
+
+            <p>Claim it soon - items go fast! 🌱</p>
+        </div>
+
+        <div class="footer">
+            <p>You're receiving this because of a saved search on FoodBridge. Delete the search to stop these alerts.</p>
+        </div>
+    </body>
+    </html>
+    """
+
+    text_content = f"""
+    NEW MATCH FOR YOUR SAVED SEARCH
+
+    Hi {user.name},
+
+    A new item matching {searches} was just listed:
+
+    ITEM: {item.title}
+    {f'Description: {item.description}' if item.description else ''}
+    {f'Pickup at: {location}' if location else ''}
+
+    Claim it soon - items go fast!
+
+    - FoodBridge Team
+    """
+
+    subject = f"🔎 New match: {item.title}"
+    return send_email(user.email, subject, html_content, text_content)
@@ -0,0 +1,158 @@
+"""
+Facet counts for the Browse filters (GET /items?facets=...)
+
+All requested facets come from one aggregate over the filtered items
+query. Category, organization and the attribute bitmask (which carries
+both allergens and the normalized storage type, see app.services.attributes)
+are grouped in a single scan:
+
+- PostgreSQL: ``GROUP BY GROUPING SETS ((category), (org_id), (attribute_mask))``,
+  one set per requested dimension, told apart with ``GROUPING()``;
+- elsewhere: one ``GROUP BY`` over the requested columns together, rolled
+  up per dimension in Python (the groups are few compared with the rows).
+
+Results are cached per filter signature for ``facet_cache_seconds``; item
+writes in this process clear the cache, other workers' writes show up when
+the entry expires.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import Item, Organization
+from app.services.attributes import ALLERGEN_BITS, STORAGE_BITS
+
+FACETS = ("category", "storage_type", "allergens", "organization")
+
+# facet -> the column it is grouped on
+_COLUMNS = {
+    "category": Item.category,
+    "organization": Item.org_id,
+    "storage_type": Item.attribute_mask,
+    "allergens": Item.attribute_mask,
+}
+
+
+def parse_facets(values: list[str]) -> tuple[str, ...]:
+    names = []
+    for name in values:
+        if name not in FACETS:
+            raise HTTPException(status_code=400, detail=f"Unknown facet '{name}'. Use any of: {', '.join(FACETS)}")
+        if name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+class FacetCache:
+    def __init__(self):
+        self._entries: dict[tuple, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, facets: dict, ttl: float, max_entries: int) -> None:
+        if ttl <= 0 or max_entries <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= max_entries:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + ttl, facets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+facet_cache = FacetCache()
+register_cache("facets", facet_cache.stats)
+
+
+def _grouped_counts(db: Session, query, names: tuple[str, ...]) -> dict[str, dict]:
+    """Per requested column: value -> item count, from a single aggregate"""
+    columns = list(dict.fromkeys(_COLUMNS[name] for name in names))
+    counts: dict[str, dict] = {column.key: {} for column in columns}
+    if db.get_bind().dialect.name == "postgresql" and len(columns) > 1:
+        rows = query.with_entities(
+            *columns, func.grouping(*columns).label("grouping_id"), func.count(Item.id)
+        ).group_by(func.grouping_sets(*(tuple_(column) for column in columns))).order_by(None).all()
+        for *values, grouping_id, count in rows:
+            # GROUPING() sets the bit of each column rolled up in this row; exactly one is kept
+            for i, column in enumerate(columns):
+                if not grouping_id & (1 << (len(columns) - 1 - i)):
+                    counts[column.key][values[i]] = count
+        return counts
+    statement = query.with_entities(*columns, func.count(Item.id)).group_by(*columns).order_by(None).statement
+    rows = db.execute(statement).all()
+    for i, column in enumerate(columns):
+        bucket = counts[column.key]
+        for row in rows:
+            bucket[row[i]] = bucket.get(row[i], 0) + row[-1]
+    return counts
+
+
+def _ranked(counts: dict, limit: int) -> list[dict]:
+    ranked = sorted(((value, count) for value, count in counts.items() if count), key=lambda vc: (-vc[1], vc[0]))
+    return [{"value": value, "count": count} for value, count in ranked[:limit]]
+
+
+def compute_facets(db: Session, query, names: tuple[str, ...], limit: int) -> dict[str, list[dict]]:
+    counts = _grouped_counts(db, query, names)
+    facets: dict[str, list[dict]] = {}
+    masks = counts.get("attribute_mask", {})
+    for name in names:
+        if name == "category":
+            facets[name] = _ranked({value: count for value, count in counts["category"].items() if value}, limit)
+        elif name in ("allergens", "storage_type"):
+            bits = ALLERGEN_BITS if name == "allergens" else STORAGE_BITS
+            facets[name] = _ranked(
+                {label: sum(count for mask, count in masks.items() if (mask or 0) & bit) for label, bit in bits.items()},
+                limit,
+            )
+        elif name == "organization":
+            top = _ranked({org_id: count for org_id, count in counts["org_id"].items() if org_id is not None}, limit)
+            names_by_id = dict(
+                db.query(Organization.id, Organization.name).filter(Organization.id.in_([f["value"] for f in top])).all()
+            ) if top else {}
+            facets[name] = [{"value": names_by_id.get(f["value"]), "id": f["value"], "count": f["count"]} for f in top]
+    return facets
+
+
+def facets_for(db: Session, query, names: tuple[str, ...], signature: tuple, limit: int = 20) -> dict:
+    """Facet counts for the filtered ``query``, cached under its filter ``signature``"""
+    key = (signature, names, limit)
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+    settings = get_settings()
+    facets = compute_facets(db, query, names, limit)
+    facet_cache.put(key, facets, settings.facet_cache_seconds, settings.facet_cache_max_entries)
+    return facets
@@ -0,0 +1,193 @@
+"""
+Funnel analysis over the events table in one streaming pass
+
+Events of the funnel's types are read ordered by (user_id, created_at)
+through a server-side cursor (``yield_per``), so only one user's open
+attempts are ever held in memory. An attempt is opened by the first step
+and keyed by item, so "viewed bread, claimed soup" doesn't count as a
+conversion. Later steps must follow in order within ``window`` of the
+first one. A repeat of the first step while an attempt is still open is
+ignored; once the window has passed, it opens a new attempt.
+
+Time-to-convert is kept in fixed log-spaced histograms (plus exact
+count/sum/min/max), so the result has the same size whether it
+summarizes a thousand events or tens of millions.
+"""
+
+import bisect
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import Event
+
+# Upper bounds (seconds) of the time-to-convert histogram buckets; the last bucket is open-ended
+BUCKETS = [1, 5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 28800, 43200, 86400,
+           172800, 259200, 604800, 1209600, 2592000]
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_window(value: str) -> timedelta:
+    """``"90s"``, ``"30m"``, ``"24h"``, ``"7d"`` or ``"2w"``"""
+    match = _WINDOW.match(value or "")
+    if not match or float(match.group(1)) <= 0:
+        raise HTTPException(status_code=400, detail="window must look like 30m, 24h or 7d")
+    return timedelta(**{_UNITS[match.group(2)]: float(match.group(1))})
+
+
+def parse_steps(value: str) -> list[str]:
+    steps = [s.strip() for s in (value or "").split(",") if s.strip()]
+    if len(steps) < 2 or len(steps) > 10:
+        raise HTTPException(status_code=400, detail="steps must list 2 to 10 event types")
+    if len(set(steps)) != len(steps):
+        raise HTTPException(status_code=400, detail="steps must not repeat an event type")
+    return steps
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th value (max for the open-ended bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(min(BUCKETS[i], round(self.max, 1))) if i < len(BUCKETS) else round(self.max, 1)
+        return round(self.max, 1)
+
+    def to_dict(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_seconds": round(self.total / self.count, 1),
+            "min_seconds": round(self.min, 1),
+            "p50_seconds": self.quantile(0.5),
+            "p90_seconds": self.quantile(0.9),
+            "p99_seconds": self.quantile(0.99),
+            "max_seconds": round(self.max, 1),
+            "buckets": [
+                {"le": BUCKETS[i] if i < len(BUCKETS) else None, "count": n}
+                for i, n in enumerate(self.counts) if n
+            ],
+        }
+
+
+def compute_funnel(rows: Iterable[tuple], steps: list[str], window: timedelta) -> dict:
+    """Fold (user_id, item_id, event_type, created_at) rows, ordered by user then time, into a funnel"""
+    position = {step: i for i, step in enumerate(steps)}
+    last = len(steps) - 1
+    reached = [0] * len(steps)
+    from_start = [_Histogram() for _ in steps]
+    from_previous = [_Histogram() for _ in steps]
+    users = [0] * len(steps)
+    user_reached = [False] * len(steps)
+    window_s = window.total_seconds()
+
+    current_user = object()
+    # item_id -> [started_at, last step reached, reached_at]
+    attempts: dict = {}
+    events = 0
+    for user_id, item_id, event_type, created_at in rows:
+        events += 1
+        if user_id != current_user:
+            # Rows arrive grouped by user, so distinct users are counted without a set
+            for i, hit in enumerate(user_reached):
+                users[i] += hit
+                user_reached[i] = False
+            current_user = user_id
+            attempts.clear()
+        step = position[event_type]
+        attempt = attempts.get(item_id)
+        if step == 0:
+            if attempt is not None and created_at - attempt[0] <= window and attempt[1] < last:
+                continue
+            attempts[item_id] = [created_at, 0, created_at]
+            reached[0] += 1
+            user_reached[0] = True
+            continue
+        if attempt is None or attempt[1] != step - 1:
+            continue
+        since_start = created_at - attempt[0]
+        if since_start > window:
+            del attempts[item_id]
+            continue
+        from_start[step].add(since_start.total_seconds())
+        from_previous[step].add((created_at - attempt[2]).total_seconds())
+        attempt[1], attempt[2] = step, created_at
+        reached[step] += 1
+        user_reached[step] = True
+        if step == last:
+            del attempts[item_id]
+    for i, hit in enumerate(user_reached):
+        users[i] += hit
+
+    result_steps = []
+    for i, step in enumerate(steps):
+        entry = {
+            "event_type": step,
+            "count": reached[i],
+            "users": users[i],
+            "conversion_from_start": round(reached[i] / reached[0], 4) if reached[0] else 0.0,
+        }
+        if i:
+            entry["conversion_from_previous"] = round(reached[i] / reached[i - 1], 4) if reached[i - 1] else 0.0
+            entry["time_from_start"] = from_start[i].to_dict()
+            entry["time_from_previous"] = from_previous[i].to_dict()
+        result_steps.append(entry)
+    return {
+        "steps": result_steps,
+        "window_seconds": window_s,
+        "events_scanned": events,
+        "overall_conversion": result_steps[-1]["conversion_from_start"],
+    }
+
+
+def funnel(db: Session, steps: list[str], window: timedelta, since: Optional[datetime] = None,
+           batch_size: int = 10_000) -> dict:
+    """Stream the funnel's events from the database, in the order of ix_events_user_created_at"""
+    event_type = Event.event_type
+    if db.get_bind().dialect.name == "sqlite":
+        # Without ANALYZE statistics SQLite picks ix_events_event_type and sorts
+        # every matching row in a temp b-tree; filtering on an expression keeps
+        # it walking the (user_id, created_at) index in order instead
+        event_type = Event.event_type + ""
+    query = (
+        select(Event.user_id, Event.item_id, Event.event_type, Event.created_at)
+        .where(Event.user_id.isnot(None), event_type.in_(steps))
+        .order_by(Event.user_id, Event.created_at, Event.id)
+    )
+    if since is not None:
+        query = query.where(Event.created_at >= since)
+    # stream_results: a server-side cursor where the driver has one (psycopg2's
+    # named cursors); sqlite3 already steps through results lazily
+    rows = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        result = compute_funnel(rows, steps, window)
+    finally:
+        rows.close()
+    result["since"] = since.isoformat() if since else None
+    return result
@@ -0,0 +1,381 @@
+"""
+Structured pickup windows parsed from the free-text ``Item.pickup_window``
+
+Donors type the window however they like ("9 AM - 5 PM", "Mon-Fri 9-5",
+"5-7pm", "Available until 6 PM", "2 hours"). It is parsed once per write
+(ORM hooks below, the bulk generator and a migration backfill) into:
+
+- ``pickup_start`` / ``pickup_end``: the span from the first opening to
+  the last one (NULL end = open-ended);
+- for a clock range, which repeats every day (or on the named weekdays)
+  until the item expires: ``pickup_daily_open`` (UTC minute of day),
+  ``pickup_daily_minutes`` (length) and ``pickup_days`` (UTC weekday bits,
+  Monday = 1). One-off windows leave them NULL.
+
+A window that never opens before the item expires ("weekends 10am-2pm"
+on an item gone by Thursday) is stored as no span and ``pickup_days`` =
+``NEVER``: ``available_between`` never returns it and routes skip it.
+
+"What can I pick up between t0 and t1" stays an indexed range query on the
+span, plus integer checks on the daily columns for recurring windows:
+
+    available_between=<t0>,<t1>  ->  pickup_start <= t1 AND pickup_end >= t0
+                                     AND (one-off OR some opening overlaps [t0, t1])
+
+Clock times are the donor's local time: the organization's ``timezone``
+(IANA name), else ``pickup_timezone``. They are read on the day the item
+is ready (``ready_at``, else ``created_at``, both naive UTC) and stored in
+naive UTC. A window that is already over by then rolls to the next allowed
+day. A recurring window is converted to UTC at its first opening, so after
+a daylight-saving change its later openings are an hour off. "until 6 PM"
+and "after 5 PM" are one-off, like durations ("2 hours", "1 day"), which run
+from the ready moment. The result is clipped to [``ready_at``, ``expires_at``].
+Text that can't be read falls back to that range, so an item with no window
+is pickable from ready to expiry. ``pickup_end`` stays NULL only when
+nothing bounds it, or the window never opens (above).
+"""
+
+import logging
+import re
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, event, inspect, or_, select, union_all, update
+
+from app.core.config import get_settings
+from app.models.models import Item, Organization
+
+logger = logging.getLogger(__name__)
+
+_CLOCK = r"(?:(noon|midday|midnight)|(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?)"
+_RANGE = re.compile(rf"{_CLOCK}\s*(?:-|–|to|until|till)\s*{_CLOCK}")
+_UNTIL = re.compile(rf"(?:until|till|til|before|by)\s+{_CLOCK}")
+_FROM = re.compile(rf"(?:after|from)\s+{_CLOCK}")
+_DURATION = re.compile(r"^(?:(?:available\s+)?(?:for|within)\s+)?(\d+(?:\.\d+)?)\s*(m|mins?|minutes?|h|hrs?|hours?|d|days?)?$")
+_UNITS = {"m": 1 / 60, "d": 24.0}
+_DAY_NAME = r"mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?"
+_DAY = re.compile(rf"\b({_DAY_NAME})\b")
+_DAY_RANGE = re.compile(rf"\b({_DAY_NAME})\s*(?:-|–|to|through|thru)\s*({_DAY_NAME})\b")
+_WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+EVERY_DAY = 0b1111111
+# pickup_days of a window that never opens while the item is listed (no span either)
+NEVER = 0
+# Queries at least this long always contain an opening of any recurring window they overlap
+_WEEK = timedelta(days=7)
+PICKUP_COLUMNS = ("pickup_start", "pickup_end", "pickup_daily_open", "pickup_daily_minutes", "pickup_days")
+
+
+def _clock(groups: tuple, meridiem_hint: Optional[str] = None) -> Optional[time]:
+    """(word, hour, minute, meridiem) groups of ``_CLOCK`` -> a time of day"""
+    word, hour, minute, meridiem = groups
+    if word:
+        return time(12) if word in ("noon", "midday") else time(0)
+    hour, minute = int(hour), int(minute or 0)
+    meridiem = (meridiem or meridiem_hint or "").replace(".", "")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _days(text: str) -> int:
+    """Weekday bits (Monday = 1) named in ``text``; every day when it names none"""
+    mask = 0
+    if re.search(r"\bweekdays?\b", text):
+        mask |= 0b0011111
+    if re.search(r"\bweekends?\b", text):
+        mask |= 0b1100000
+    for first, last in _DAY_RANGE.findall(text):
+        day, last = _WEEKDAYS.index(first[:3]), _WEEKDAYS.index(last[:3])
+        while True:  # "fri-mon" wraps through the weekend
+            mask |= 1 << day
+            if day == last:
+                break
+            day = (day + 1) % 7
+    for name in _DAY.findall(_DAY_RANGE.sub(" ", text)):
+        mask |= 1 << _WEEKDAYS.index(name[:3])
+    return mask or EVERY_DAY
+
+
+def _parse(text: str, anchor: datetime) -> tuple[Optional[datetime], Optional[datetime], Optional[int]]:
+    """(start, end, days) named by ``text`` relative to ``anchor``; None where the text says nothing.
+
+    ``days`` is set for a clock range, which repeats on those weekdays; (start,
+    end) is then its first opening that hasn't closed by ``anchor``.
+    """
+    text = " ".join(text.lower().split())
+    match = _DURATION.match(text)
+    if match:
+        amount, unit = float(match.group(1)), (match.group(2) or "h")[0]
+        return anchor, anchor + timedelta(hours=amount * _UNITS.get(unit, 1.0)), None
+
+    day = datetime.combine(anchor.date(), time(0))
+    match = _RANGE.search(text)
+    if match:
+        first, second = match.groups()[:4], match.groups()[4:]
+        # "5-7pm": the start borrows the end's meridiem when that keeps it before the end
+        end = _clock(second)
+        start = _clock(first, second[3] if first[3] is None and second[3] else None)
+        if start is not None and end is not None and start > end and first[3] is None and second[3]:
+            start = _clock(first)
+        if start is None or end is None:
+            return None, None, None
+        if start > end and first[3] is None and second[3] is None and start.hour <= 12:
+            end = time(end.hour + 12, end.minute)  # "7-5" is a working day, not an overnight shift
+        length = _since_midnight(end) - _since_midnight(start)
+        if length <= timedelta(0):
+            length += timedelta(days=1)  # overnight, or "... - midnight"
+        days = _days(text)
+        # From yesterday's opening (an overnight window may still be open) to a week ahead
+        for offset in range(-1, 8):
+            start_at = day + timedelta(days=offset) + _since_midnight(start)
+            if days >> start_at.weekday() & 1 and start_at + length > anchor:
+                return start_at, start_at + length, days
+        return None, None, None
+
+    match = _UNTIL.search(text)
+    if match:
+        end = _clock(match.groups())
+        if end is None:
+            return None, None, None
+        end_at = day + _since_midnight(end)
+        if end_at <= anchor:
+            end_at += timedelta(days=1)
+        return anchor, end_at, None
+
+    match = _FROM.search(text)
+    if match:
+        start = _clock(match.groups())
+        return (day + _since_midnight(start), None, None) if start is not None else (None, None, None)
+    return None, None, None
+
+
+def _since_midnight(value: time) -> timedelta:
+    return timedelta(hours=value.hour, minutes=value.minute)
+
+
+@lru_cache(maxsize=256)
+def _zone(name: Optional[str]):
+    name = name or get_settings().pickup_timezone
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone '{name}'; reading pickup windows in UTC")
+        return timezone.utc
+
+
+def _local(moment: datetime, zone) -> datetime:
+    return moment.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+
+def _utc(moment: Optional[datetime], zone) -> Optional[datetime]:
+    if moment is None:
+        return None
+    return moment.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _rotate(days: int, shift: int) -> int:
+    return sum(1 << (day + shift) % 7 for day in range(7) if days >> day & 1)
+
+
+def _midnight(moment: datetime) -> datetime:
+    return datetime.combine(moment.date(), time(0))
+
+
+def _last_opening(first: datetime, days: int, expires_at: datetime) -> datetime:
+    """Start of the last opening (same UTC time of day as ``first``) that begins before ``expires_at``"""
+    last = _midnight(expires_at) + (first - _midnight(first))
+    if last >= expires_at:
+        last -= timedelta(days=1)
+    while last > first and not days >> last.weekday() & 1:
+        last -= timedelta(days=1)
+    return max(first, last)
+
+
+def pickup_bounds(pickup_window: Optional[str], ready_at: Optional[datetime], expires_at: Optional[datetime],
+                  created_at: Optional[datetime] = None, tz: Optional[str] = None) -> dict:
+    """Values of ``PICKUP_COLUMNS`` for an item, see the module docstring; ``tz`` is the org's timezone"""
+    anchor = ready_at or created_at
+    start = end = days = None
+    daily_open = daily_minutes = None
+    parsed = False
+    if pickup_window and pickup_window.strip() and anchor is not None:
+        zone = _zone(tz)
+        start, end, days = _parse(pickup_window, _local(anchor, zone))
+        parsed = start is not None or end is not None
+        if days is not None:
+            days = _rotate(days, (_utc(start, zone).date() - start.date()).days)
+        start, end = _utc(start, zone), _utc(end, zone)
+    if days is not None:
+        length = end - start
+        last = _last_opening(start, days, expires_at) if expires_at is not None else None
+        if last is None or last > start:
+            daily_open = (start - _midnight(start)) // timedelta(minutes=1)
+            daily_minutes = length // timedelta(minutes=1)
+            end = None if last is None else last + length
+        else:
+            days = None  # the item is gone before the window comes round again
+    if ready_at is not None and (start is None or start < ready_at):
+        start = ready_at
+    if start is None:
+        start = anchor
+    if expires_at is not None and (end is None or end > expires_at):
+        end = expires_at
+    if start is not None and end is not None and end < start:
+        if parsed:
+            # The written window never opens during the item's life: nothing can be picked up
+            return {**dict.fromkeys(PICKUP_COLUMNS), "pickup_days": NEVER}
+        start, end, days = anchor, expires_at, None  # ready/expiry out of order; keep what the dates say
+    if days is None:
+        daily_open = daily_minutes = None
+    return {
+        "pickup_start": start,
+        "pickup_end": end,
+        "pickup_daily_open": daily_open,
+        "pickup_daily_minutes": daily_minutes,
+        "pickup_days": days,
+    }
+
+
+def next_opening(start: Optional[datetime], end: Optional[datetime], daily_open: Optional[int],
+                 daily_minutes: Optional[int], days: Optional[int], after: datetime
+                 ) -> tuple[Optional[datetime], Optional[datetime]]:
+    """(open, close) of the first opening of a stored window still open at or after ``after``.
+
+    One-off windows are their (start, end). When no opening is left, the
+    whole span is returned (and is already over).
+    """
+    if days is None or daily_open is None or daily_minutes is None:
+        return start, end
+    length = timedelta(minutes=daily_minutes)
+    day = _midnight(max(after, start) if start is not None else after)
+    for offset in range(-1, 8):
+        opens = day + timedelta(days=offset, minutes=daily_open)
+        closes = opens + length
+        if not days >> opens.weekday() & 1:
+            continue
+        if start is not None:
+            opens = max(opens, start)
+        if end is not None:
+            closes = min(closes, end)
+        if closes > after and closes >= opens:
+            return opens, closes
+    return start, end
+
+
+def parse_available_between(value: Optional[str], now: Optional[datetime] = None
+                            ) -> Optional[tuple[datetime, datetime]]:
+    """``start,end`` (ISO datetimes or ``now``) -> a (start, end) pair; a single value is one instant"""
+    if not value:
+        return None
+    now = now or datetime.utcnow()
+    parts = [part.strip() for part in value.split(",")]
+    if len(parts) > 2:
+        raise HTTPException(status_code=400, detail="available_between must be start,end (ISO datetimes or 'now')")
+    bounds = []
+    for part in parts:
+        if part in ("", "now"):
+            bounds.append(now)
+            continue
+        try:
+            moment = datetime.fromisoformat(part.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"available_between: '{part}' is not an ISO datetime or 'now'")
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        bounds.append(moment)
+    start, end = bounds[0], bounds[-1]
+    if end < start:
+        raise HTTPException(status_code=400, detail="available_between: end is before start")
+    return start, end
+
+
+def _open_during(start: datetime, end: datetime):
+    """A recurring window has an opening overlapping [start, end]"""
+    if end - start >= _WEEK:
+        return True
+    clauses = [Item.pickup_start >= start, Item.pickup_end <= end]  # the span's first or last opening
+    # An opening starts within a day of its UTC midnight and lasts at most a day
+    day = _midnight(start) - timedelta(days=2)
+    while day <= end:
+        clauses.append(and_(
+            Item.pickup_days.bitwise_and(1 << day.weekday()) != 0,
+            Item.pickup_daily_open <= (end - day) / timedelta(minutes=1),
+            Item.pickup_daily_open + Item.pickup_daily_minutes >= (start - day) / timedelta(minutes=1),
+        ))
+        day += timedelta(days=1)
+    return or_(*clauses)
+
+
+def apply_available_between(query, window: Optional[tuple[datetime, datetime]]):
+    """Listed items with a pickup opening that overlaps ``window``.
+
+    Open-ended items (NULL ``pickup_end``) match too. ``pickup_end >= t0 OR
+    pickup_end IS NULL`` would stop SQLite ranging over the index, so the
+    ids come from two range scans of ix_items_status_pickup instead.
+    Recurring windows are then checked opening by opening on the candidate
+    days, with integer comparisons on the daily columns.
+    """
+    if window is None:
+        return query
+    start, end = window
+    listed = select(Item.id).where(Item.status == "listed", Item.pickup_start <= end)
+    query = query.filter(Item.id.in_(union_all(
+        listed.where(Item.pickup_end >= start),
+        listed.where(Item.pickup_end.is_(None)),
+    )))
+    recurring = _open_during(start, end)
+    return query if recurring is True else query.filter(or_(Item.pickup_days.is_(None), recurring))
+
+
+# Changing any of these re-parses the window
+_INPUTS = ("pickup_window", "ready_at", "expires_at", "created_at", "org_id")
+
+
+def _org_timezone(connection, org_id: Optional[int]) -> Optional[str]:
+    if org_id is None:
+        return None
+    return connection.execute(select(Organization.timezone).where(Organization.id == org_id)).scalar()
+
+
+@event.listens_for(Item, "before_insert")
+@event.listens_for(Item, "before_update")
+def _sync_pickup_bounds(mapper, connection, target: Item):
+    state = inspect(target)
+    if state.persistent and not any(state.attrs[name].history.has_changes() for name in _INPUTS):
+        return
+    text = target.pickup_window
+    tz = _org_timezone(connection, target.org_id) if text and text.strip() else None
+    bounds = pickup_bounds(text, target.ready_at, target.expires_at, target.created_at or datetime.utcnow(), tz)
+    for column, value in bounds.items():
+        setattr(target, column, value)
+
+
+def backfill_pickup_bounds(conn, batch_size: int = 5000) -> int:
+    """Parse ``pickup_window`` into ``PICKUP_COLUMNS`` for every item (migration backfill)"""
+    table, orgs = Item.__table__, Organization.__table__
+    rows = conn.execute(
+        select(table.c.id, table.c.pickup_window, table.c.ready_at, table.c.expires_at, table.c.created_at,
+               orgs.c.timezone)
+        .select_from(table.outerjoin(orgs, orgs.c.id == table.c.org_id))
+    ).all()
+    statement = update(table).where(table.c.id == bindparam("_id")).values(
+        **{column: bindparam(f"new_{column}") for column in PICKUP_COLUMNS}
+    )
+    updated = 0
+    for offset in range(0, len(rows), batch_size):
+        updates = []
+        for row in rows[offset:offset + batch_size]:
+            bounds = pickup_bounds(row.pickup_window, row.ready_at, row.expires_at, row.created_at, row.timezone)
+            if any(value is not None for value in bounds.values()):
+                updates.append({"_id": row.id, **{f"new_{column}": value for column, value in bounds.items()}})
+        if updates:
+            conn.execute(statement, updates)
+            updated += len(updates)
+    return updated
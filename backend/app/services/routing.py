@@ -0,0 +1,378 @@
+"""
+Volunteer pickup routes with time windows (POST /volunteer/route)
+
+Given a start point and the items a volunteer wants to collect, order the
+pickups to keep the distance driven short while arriving at each one
+inside its pickup window: they wait if early, and a stop can't be reached
+after its window closes. A route is one trip, so each stop uses its next
+opening at or after departure (``pickup_windows.next_opening``): today's
+9-5 for a daily "9 AM - 5 PM" listing, not the span up to its expiry.
+
+1. A haversine distance matrix over start + stops is built in one numpy
+   call (``matching.haversine_matrix``); travel time is distance / speed.
+2. Construction: cheapest feasible insertion. Every unrouted stop is
+   priced at every gap of the current route at once, as a (stops x gaps)
+   array. A gap is feasible when the stop is reached before it closes and
+   the delay pushed onto later stops fits their slack (the maximum push
+   forward of Savelsbergh's insertion tests). The cheapest feasible
+   insertion wins.
+   Greedy choices can use up slack a later stop needed, so when stops are
+   left out a repair (``_repair``) retries sequential insertion in other
+   orders and swaps left-out stops for routed ones that fit back in, for
+   up to half the time budget. Stops that still fit nowhere are reported,
+   not forced in: "time_window" when even a direct trip from the start
+   misses the window, "not_scheduled" when it only conflicts with the
+   other stops.
+3. Local search: 2-opt. All segment reversals are priced at once; the
+   improving ones are tried best first, and a move is kept only if the
+   re-timed route still meets every window. This repeats until nothing
+   improves or ``route_time_budget_ms`` runs out.
+
+Distances are symmetric, so reversing a segment doesn't change its own
+length and a move's gain only depends on the two edges it swaps. Routes
+are open (they end at the last pickup) unless ``return_to_start`` is set.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.models import Item, Organization
+from app.services.matching import haversine_matrix
+from app.services.pickup_windows import NEVER, next_opening
+
+EPS = 1e-9
+
+
+def schedule(route: list[int], travel: np.ndarray, opens: np.ndarray, closes: np.ndarray,
+             service: float) -> Optional[list[float]]:
+    """Service start time of every route position (minutes), or None if a window is missed"""
+    starts = [0.0]
+    departure = 0.0
+    for prev, node in zip(route, route[1:]):
+        arrival = departure + travel[prev, node]
+        if arrival > closes[node] + EPS:
+            return None
+        start = max(arrival, opens[node])
+        starts.append(start)
+        departure = start + service
+    return starts
+
+
+def _route_length(route: list[int], dist: np.ndarray) -> float:
+    return float(dist[route[:-1], route[1:]].sum()) if len(route) > 1 else 0.0
+
+
+def _insert_all(dist, travel, opens, closes, service, route: list[int], pending: list[int], closed_end: bool):
+    """Cheapest feasible insertion of ``pending`` into ``route``; returns the stops that fit nowhere"""
+    pending = np.array(pending, dtype=np.int64)
+    while len(pending):
+        r = np.array(route)
+        starts = np.array(schedule(route, travel, opens, closes, service))
+        departures = starts + service
+        departures[0] = 0.0
+        arrivals = np.concatenate([[0.0], departures[:-1] + travel[r[:-1], r[1:]]])
+        # Max push forward: how far each position's start can slip before some later window breaks
+        slack = np.empty(len(r))
+        slack[-1] = closes[r[-1]] - starts[-1]
+        for i in range(len(r) - 2, -1, -1):
+            slack[i] = min(closes[r[i]] - starts[i], starts[i + 1] - arrivals[i + 1] + slack[i + 1])
+
+        # Gaps: after position p (before p + 1); the last gap of an open route has no successor
+        gaps = len(r) - 1 if closed_end else len(r)
+        prev = r[:gaps]
+        has_next = np.arange(gaps) < len(r) - 1
+        nxt = np.where(has_next, r[np.minimum(np.arange(gaps) + 1, len(r) - 1)], 0)
+
+        arrive = departures[:gaps][None, :] + travel[pending][:, prev]
+        ok = arrive <= closes[pending][:, None] + EPS
+        leave = np.maximum(arrive, opens[pending][:, None]) + service
+        next_arrive = leave + travel[pending][:, nxt]
+        next_start = np.maximum(next_arrive, opens[nxt][None, :])
+        next_position = np.minimum(np.arange(gaps) + 1, len(r) - 1)
+        delay = next_start - starts[next_position][None, :]
+        ok &= ~has_next[None, :] | (delay <= slack[next_position][None, :] + EPS)
+
+        cost = dist[pending][:, prev] + np.where(has_next, dist[pending][:, nxt] - dist[prev, nxt], 0.0)
+        cost = np.where(ok, cost, np.inf)
+        best = int(np.argmin(cost))
+        k, gap = divmod(best, gaps)
+        if not np.isfinite(cost[k, gap]):
+            break
+        route.insert(gap + 1, int(pending[k]))
+        pending = np.delete(pending, k)
+    return [int(node) for node in pending]
+
+
+def _construct(dist, travel, opens, closes, service, order: list[int], closed_end: bool):
+    """Sequential insertion: each stop of ``order`` in turn at its cheapest feasible gap"""
+    route = [0, len(dist) - 1] if closed_end else [0]
+    unrouted = []
+    for node in order:
+        unrouted += _insert_all(dist, travel, opens, closes, service, route, [node], closed_end)
+    return route, unrouted
+
+
+def _repair(dist, travel, opens, closes, service, route: list[int], unrouted: list[int], closed_end: bool,
+            deadline: float, restarts: int = 20) -> tuple[list[int], list[int]]:
+    """Try to fit stops the first construction left out; returns the best (route, unrouted) found.
+
+    Greedy insertion can paint itself into a corner: an early choice uses up
+    the slack a later stop needed. Two repairs, until ``deadline``:
+
+    1. Restarts: sequential insertion, each stop in turn at its cheapest
+       feasible gap, in other orders (by opening time, by deadline, by
+       distance from the start, by window width, then seeded shuffles). The
+       route with the fewest left-out stops is kept, shortest first on ties.
+    2. Removal and reinsertion: each left-out stop takes the place of one
+       routed stop, and the route is kept only if the removed stop then
+       fits back in somewhere too.
+    """
+    stops = sorted(set(route[1:len(route) - (1 if closed_end else 0)]) | set(unrouted))
+    best = (len(unrouted), _route_length(route, dist), route, unrouted)
+    orders = [
+        sorted(stops, key=lambda node: (opens[node], closes[node])),
+        sorted(stops, key=lambda node: (closes[node], opens[node])),
+        sorted(stops, key=lambda node: dist[0, node]),
+        sorted(stops, key=lambda node: (closes[node] - opens[node], closes[node])),
+    ]
+    rng = np.random.default_rng(0)
+    for attempt in range(restarts):
+        if not best[0] or time.perf_counter() >= deadline:
+            break
+        order = orders[attempt] if attempt < len(orders) else [int(node) for node in rng.permutation(stops)]
+        candidate, left = _construct(dist, travel, opens, closes, service, order, closed_end)
+        key = (len(left), _route_length(candidate, dist))
+        if key < best[:2]:
+            best = (*key, candidate, left)
+
+    _, _, route, unrouted = best
+    route, unrouted = list(route), list(unrouted)
+    improved = True
+    while unrouted and improved and time.perf_counter() < deadline:
+        improved = False
+        for stop in unrouted:
+            for position in range(1, len(route) - (1 if closed_end else 0)):
+                if time.perf_counter() >= deadline:
+                    break
+                trial = route[:position] + route[position + 1:]
+                if not _insert_all(dist, travel, opens, closes, service, trial, [stop, route[position]], closed_end):
+                    route = trial
+                    unrouted.remove(stop)
+                    improved = True
+                    break
+            if improved or time.perf_counter() >= deadline:
+                break
+    return route, unrouted
+
+
+def _reversal_fits(route: list[int], starts: list[float], lo: int, hi: int, travel, opens, closes,
+                   service: float) -> bool:
+    """Whether reversing route[lo..hi] still meets every window, re-timing only what changes.
+
+    Positions before ``lo`` keep their times. Past ``hi``, once a stop is
+    reached no later than before, every later stop is too.
+    """
+    departure = starts[lo - 1] + (service if lo > 1 else 0.0)
+    prev = route[lo - 1]
+    for position in range(lo, len(route)):
+        node = route[hi - (position - lo)] if position <= hi else route[position]
+        arrival = departure + travel[prev, node]
+        if arrival > closes[node] + EPS:
+            return False
+        start = max(arrival, opens[node])
+        if position > hi and start <= starts[position] + EPS:
+            return True
+        departure = start + service
+        prev = node
+    return True
+
+
+def _two_opt(dist, travel, opens, closes, service, route: list[int], closed_end: bool, deadline: float) -> int:
+    """Improve ``route`` in place with window-feasible 2-opt moves; returns the number applied"""
+    applied = 0
+    last = len(route) - (2 if closed_end else 1)  # last position that may move
+    if last < 2:
+        return 0
+    while time.perf_counter() < deadline:
+        r = np.array(route)
+        starts = schedule(route, travel, opens, closes, service)
+        i = np.arange(1, last + 1)[:, None]
+        j = np.arange(1, last + 1)[None, :]
+        before, first, end = r[i - 1], r[i], r[j]
+        after_index = np.minimum(j + 1, len(r) - 1)
+        has_after = j + 1 <= len(r) - 1
+        after = r[after_index]
+        gain = dist[before, end] - dist[before, first]
+        gain = gain + np.where(has_after, dist[first, after] - dist[end, after], 0.0)
+        gain = np.where(j > i, gain, np.inf).ravel()
+        candidates = np.flatnonzero(gain < -EPS)
+        improved = False
+        for flat in candidates[np.argsort(gain[candidates], kind="stable")]:
+            lo, hi = (value + 1 for value in divmod(int(flat), last))
+            if _reversal_fits(route, starts, lo, hi, travel, opens, closes, service):
+                route[lo:hi + 1] = route[lo:hi + 1][::-1]
+                applied += 1
+                improved = True
+                break
+            if time.perf_counter() >= deadline:
+                break
+        if not improved:
+            break
+    return applied
+
+
+def solve_route(lat: np.ndarray, lng: np.ndarray, opens: np.ndarray, closes: np.ndarray, speed_kmh: float,
+                service_minutes: float, return_to_start: bool = False, time_budget: float = 0.5) -> dict:
+    """Order stops 1..n (node 0 is the start) under their [open, close] windows, in minutes from departure.
+
+    Returns ``{"route", "unrouted", "dist", "starts", "construction_km", "distance_km", "moves"}``;
+    ``route`` lists node indices starting with 0 (and ending with the return node when
+    ``return_to_start``).
+    """
+    started = time.perf_counter()
+    lat, lng = np.asarray(lat, dtype=float), np.asarray(lng, dtype=float)
+    opens, closes = np.asarray(opens, dtype=float), np.asarray(closes, dtype=float)
+    if return_to_start:
+        # The return is one more node at the start's coordinates with no window
+        lat, lng = np.append(lat, lat[0]), np.append(lng, lng[0])
+        opens, closes = np.append(opens, 0.0), np.append(closes, np.inf)
+    dist = haversine_matrix(lat, lng, lat, lng)
+    travel = dist / speed_kmh * 60.0
+    stops = list(range(1, len(lat) - (1 if return_to_start else 0)))
+    route = [0, len(lat) - 1] if return_to_start else [0]
+
+    # Stops with the earliest deadlines are offered first so ties favour them
+    stops.sort(key=lambda node: (closes[node], opens[node]))
+    unrouted = _insert_all(dist, travel, opens, closes, service_minutes, route, stops, return_to_start)
+    if unrouted:
+        route, unrouted = _repair(dist, travel, opens, closes, service_minutes, route, unrouted, return_to_start,
+                                  started + time_budget / 2)
+    construction_km = _route_length(route, dist)
+    moves = _two_opt(dist, travel, opens, closes, service_minutes, route, return_to_start,
+                     started + time_budget)
+    if unrouted and moves:
+        # A shorter route can have room for stops that didn't fit before
+        unrouted = _insert_all(dist, travel, opens, closes, service_minutes, route, unrouted, return_to_start)
+    return {
+        "route": route,
+        "unrouted": unrouted,
+        "dist": dist,
+        "starts": schedule(route, travel, opens, closes, service_minutes),
+        "construction_km": construction_km,
+        "distance_km": _route_length(route, dist),
+        "moves": moves,
+    }
+
+
+def plan_route(
+    db: Session,
+    start_lat: float,
+    start_lng: float,
+    item_ids: list[int],
+    start_time: Optional[datetime] = None,
+    speed_kmh: Optional[float] = None,
+    service_minutes: Optional[float] = None,
+    return_to_start: bool = False,
+) -> dict:
+    """Load the requested items and return an ordered, timed pickup route"""
+    settings = get_settings()
+    speed_kmh = speed_kmh or settings.matching_speed_kmh
+    service_minutes = settings.route_service_minutes if service_minutes is None else service_minutes
+    departure = start_time or datetime.utcnow()
+    started = time.perf_counter()
+
+    rows = (
+        db.query(Item.id, Item.title, Item.status, Item.org_id, Item.ready_at, Item.expires_at,
+                 Item.pickup_start, Item.pickup_end, Item.pickup_daily_open, Item.pickup_daily_minutes,
+                 Item.pickup_days, Organization.name, Organization.lat, Organization.lng)
+        .join(Organization, Organization.id == Item.org_id)
+        .filter(Item.id.in_(item_ids))
+        .all()
+    )
+    by_id = {row.id: row for row in rows}
+    stops, unassigned = [], []
+    for item_id in dict.fromkeys(item_ids):
+        row = by_id.get(item_id)
+        if row is None:
+            unassigned.append({"item_id": item_id, "reason": "not_found"})
+        elif row.status != "listed":
+            unassigned.append({"item_id": item_id, "reason": "unavailable"})
+        elif row.lat is None or row.lng is None:
+            unassigned.append({"item_id": item_id, "reason": "no_location"})
+        elif row.expires_at is not None and row.expires_at <= departure:
+            unassigned.append({"item_id": item_id, "reason": "expired"})
+        elif row.pickup_days == NEVER:
+            unassigned.append({"item_id": item_id, "reason": "time_window"})  # its window never opens
+        else:
+            stops.append(row)
+    loaded = time.perf_counter()
+
+    def minutes(value: Optional[datetime], default: float) -> float:
+        return default if value is None else (value - departure).total_seconds() / 60.0
+
+    windows = [
+        next_opening(row.pickup_start or row.ready_at, row.pickup_end or row.expires_at, row.pickup_daily_open,
+                     row.pickup_daily_minutes, row.pickup_days, departure)
+        for row in stops
+    ]
+    closes = [np.inf] + [minutes(close, np.inf) for _, close in windows]
+    result = solve_route(
+        [start_lat] + [row.lat for row in stops],
+        [start_lng] + [row.lng for row in stops],
+        [0.0] + [max(0.0, minutes(opens, 0.0)) for opens, _ in windows],
+        closes,
+        speed_kmh,
+        service_minutes,
+        return_to_start,
+        settings.route_time_budget_ms / 1000,
+    )
+    solved = time.perf_counter()
+
+    route, dist, starts = result["route"], result["dist"], result["starts"]
+    out = []
+    for position in range(1, len(route)):
+        node = route[position]
+        if return_to_start and position == len(route) - 1:
+            break
+        row = stops[node - 1]
+        arrive = starts[position - 1] + (service_minutes if position > 1 else 0.0) \
+            + dist[route[position - 1], node] / speed_kmh * 60.0
+        out.append({
+            "item_id": row.id,
+            "title": row.title,
+            "org_id": row.org_id,
+            "org_name": row.name,
+            "lat": row.lat,
+            "lng": row.lng,
+            "leg_km": round(float(dist[route[position - 1], node]), 3),
+            "arrive_at": departure + timedelta(minutes=arrive),
+            "wait_minutes": round(starts[position] - arrive, 1),
+            "depart_at": departure + timedelta(minutes=starts[position] + service_minutes),
+            "pickup_end": windows[node - 1][1],
+            "expires_at": row.expires_at,
+        })
+    for node in result["unrouted"]:
+        reachable = dist[0, node] / speed_kmh * 60.0 <= closes[node] + EPS
+        unassigned.append({"item_id": stops[node - 1].id, "reason": "not_scheduled" if reachable else "time_window"})
+
+    # No service time at the start, nor at the return node
+    finish = starts[-1] + (service_minutes if out and not return_to_start else 0.0)
+    return {
+        "stops": out,
+        "unassigned": unassigned,
+        "stats": {
+            "stops": len(out),
+            "distance_km": round(result["distance_km"], 3),
+            "construction_km": round(result["construction_km"], 3),
+            "two_opt_moves": result["moves"],
+            "duration_minutes": round(finish, 1),
+            "finish_at": departure + timedelta(minutes=finish),
+            "load_ms": round((loaded - started) * 1000, 1),
+            "solve_ms": round((solved - loaded) * 1000, 1),
+        },
+    }
@@ -0,0 +1,285 @@
+"""
+Saved-search alerts: match each new item against every subscription
+
+Subscriptions are held in an in-memory inverted index keyed by
+(category, keyword, geo cell). Each dimension uses "*" when the search
+doesn't constrain it:
+
+- category: the normalized category, or "*"
+- keyword: one of the search's keywords (the longest, usually the rarest),
+  or "*" when it has none; the remaining keywords are verified afterwards
+- cell: every grid cell its radius overlaps, or "*" when it has no location
+
+A new item probes {its category, *} x {its tokens, *} x {its cell, *}.
+That's a few dozen dict lookups however many subscriptions exist, so only
+real candidates get the exact checks (all keywords, haversine distance,
+excluded allergens).
+
+Each process keeps its own index. Creates and deletes made in this process
+apply immediately; changes from other workers are picked up by an
+incremental sync on ``updated_at`` every ``saved_search_sync_seconds``.
+
+``updated_at`` is stamped before the writing transaction commits, so a row
+can become visible after a newer one has already been synced. Each sync
+therefore reaches back ``saved_search_sync_overlap_seconds`` before the
+newest change seen, and skips rows whose version it has already applied.
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.models import Item, Organization, SavedSearch, User
+from app.services.attributes import allergen_bits
+
+logger = logging.getLogger(__name__)
+
+ANY = "*"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> set[str]:
+    return set(_TOKEN.findall(text.lower())) if text else set()
+
+
+def normalize_category(category: Optional[str]) -> Optional[str]:
+    return " ".join(category.lower().split()) if category and category.strip() else None
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+@dataclass
+class Subscription:
+    """A saved search compiled for matching"""
+    id: int
+    user_id: int
+    name: str
+    category: Optional[str]
+    keywords: frozenset
+    lat: Optional[float]
+    lng: Optional[float]
+    radius_km: Optional[float]
+    allergen_mask: int
+
+    @classmethod
+    def from_row(cls, row: SavedSearch) -> "Subscription":
+        keywords = frozenset(token for keyword in row.keywords_json or [] for token in tokenize(keyword))
+        geo = row.lat is not None and row.lng is not None and row.radius_km
+        return cls(
+            id=row.id,
+            user_id=row.user_id,
+            name=row.name,
+            category=normalize_category(row.category),
+            keywords=keywords,
+            lat=row.lat if geo else None,
+            lng=row.lng if geo else None,
+            radius_km=row.radius_km if geo else None,
+            allergen_mask=allergen_bits(row.exclude_allergens_json or []),
+        )
+
+    def matches(self, tokens: set[str], lat: Optional[float], lng: Optional[float], attribute_mask: int) -> bool:
+        if self.allergen_mask & attribute_mask:
+            return False
+        if not self.keywords <= tokens:
+            return False
+        if self.radius_km is not None:
+            if lat is None or lng is None:
+                return False
+            return haversine_km(self.lat, self.lng, lat, lng) <= self.radius_km
+        return True
+
+
+class SubscriptionIndex:
+    """Inverted index of subscriptions by (category, keyword, geo cell)"""
+
+    def __init__(self, cell_degrees: float = 0.5):
+        self.cell_degrees = cell_degrees
+        self._subscriptions: dict[int, Subscription] = {}
+        self._keys: dict[int, list[tuple]] = {}
+        self._postings: dict[tuple, dict[int, Subscription]] = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.loaded = False
+        self.synced_at: Optional[datetime] = None
+        self.last_sync_check = 0.0
+        # updated_at of each row applied inside the overlap window, so re-read rows are skipped
+        self._applied: dict[int, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def _cells(self, sub: Subscription) -> list:
+        if sub.radius_km is None:
+            return [ANY]
+        dlat = sub.radius_km / KM_PER_DEGREE_LAT
+        dlng = sub.radius_km / (KM_PER_DEGREE_LAT * max(0.01, math.cos(math.radians(sub.lat))))
+        lat_lo, lng_lo = self.cell(sub.lat - dlat, sub.lng - dlng)
+        lat_hi, lng_hi = self.cell(sub.lat + dlat, sub.lng + dlng)
+        return [(i, j) for i in range(lat_lo, lat_hi + 1) for j in range(lng_lo, lng_hi + 1)]
+
+    def _index_keys(self, sub: Subscription) -> list[tuple]:
+        category = sub.category or ANY
+        keyword = max(sub.keywords, key=lambda k: (len(k), k)) if sub.keywords else ANY
+        return [(category, keyword, cell) for cell in self._cells(sub)]
+
+    def add(self, sub: Subscription) -> None:
+        with self._lock:
+            self._remove(sub.id)
+            keys = self._index_keys(sub)
+            for key in keys:
+                self._postings.setdefault(key, {})[sub.id] = sub
+            self._subscriptions[sub.id] = sub
+            self._keys[sub.id] = keys
+
+    def remove(self, subscription_id: int) -> None:
+        with self._lock:
+            self._remove(subscription_id)
+
+    def _remove(self, subscription_id: int) -> None:
+        for key in self._keys.pop(subscription_id, ()):
+            posting = self._postings.get(key)
+            if posting is not None:
+                posting.pop(subscription_id, None)
+                if not posting:
+                    del self._postings[key]
+        self._subscriptions.pop(subscription_id, None)
+
+    def candidates(self, category: Optional[str], tokens: set[str], lat: Optional[float], lng: Optional[float]):
+        categories = (normalize_category(category), ANY) if category else (ANY,)
+        keywords = (*tokens, ANY)
+        cells = (self.cell(lat, lng), ANY) if lat is not None and lng is not None else (ANY,)
+        found: dict[int, Subscription] = {}
+        with self._lock:
+            postings = self._postings
+            for c in categories:
+                for k in keywords:
+                    for g in cells:
+                        posting = postings.get((c, k, g))
+                        if posting:
+                            found.update(posting)
+        return found.values()
+
+    def match(self, title: str, description: Optional[str], category: Optional[str],
+              lat: Optional[float], lng: Optional[float], attribute_mask: int = 0) -> list[Subscription]:
+        """Subscriptions a new item satisfies"""
+        tokens = tokenize(title) | tokenize(description) | tokenize(category)
+        return [
+            sub for sub in self.candidates(category, tokens, lat, lng)
+            if sub.matches(tokens, lat, lng, attribute_mask)
+        ]
+
+    def sync(self, db: Session, every: float = 0.0, overlap: float = 0.0) -> None:
+        """Load subscriptions (first call) or apply changes made since the last sync.
+
+        ``overlap`` seconds before the newest change seen are read again to catch
+        rows committed late with an earlier ``updated_at``. Only the first load
+        waits for a sync already in progress; after that, callers that find one
+        running match against the current index.
+        """
+        if not self._due(every):
+            return
+        if not self._sync_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            if not self._due(every):  # synced while this caller waited for the lock
+                return
+            self.last_sync_check = time.monotonic()
+            query = db.query(SavedSearch)
+            if self.loaded and self.synced_at is not None:
+                query = query.filter(SavedSearch.updated_at >= self.synced_at - timedelta(seconds=overlap))
+            elif not self.loaded:
+                query = query.filter(SavedSearch.active.is_(True))
+            for row in query.all():
+                if self._applied.get(row.id) == row.updated_at:
+                    continue
+                if row.active:
+                    self.add(Subscription.from_row(row))
+                else:
+                    self.remove(row.id)
+                self._applied[row.id] = row.updated_at
+                if self.synced_at is None or row.updated_at > self.synced_at:
+                    self.synced_at = row.updated_at
+            if self.synced_at is not None:
+                horizon = self.synced_at - timedelta(seconds=overlap)
+                self._applied = {i: at for i, at in self._applied.items() if at is not None and at >= horizon}
+            self.loaded = True
+        finally:
+            self._sync_lock.release()
+
+    def _due(self, every: float) -> bool:
+        return not self.loaded or time.monotonic() - self.last_sync_check >= every
+
+
+subscription_index = SubscriptionIndex(get_settings().saved_search_cell_degrees)
+
+
+def saved_search_out(row: SavedSearch) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "category": row.category,
+        "keywords": row.keywords_json or [],
+        "lat": row.lat,
+        "lng": row.lng,
+        "radius_km": row.radius_km,
+        "exclude_allergens": row.exclude_allergens_json or [],
+        "created_at": row.created_at,
+    }
+
+
+def matching_subscriptions(db: Session, item: Item, organization: Optional[Organization]) -> list[Subscription]:
+    settings = get_settings()
+    subscription_index.sync(db, every=settings.saved_search_sync_seconds, overlap=settings.saved_search_sync_overlap_seconds)
+    lat = organization.lat if organization else None
+    lng = organization.lng if organization else None
+    return subscription_index.match(item.title, item.description, item.category, lat, lng, item.attribute_mask or 0)
+
+
+def notify_new_items(item_ids: Iterable[int]) -> int:
+    """Email every user with a saved search matching one of the new items; returns emails sent.
+
+    Runs after the response (a FastAPI background task) with its own session.
+    """
+    from app.db.session import SessionLocal
+    from app.services.email import send_saved_search_alert
+
+    sent = 0
+    db = SessionLocal()
+    try:
+        for item_id in item_ids:
+            item = db.query(Item).filter(Item.id == item_id).first()
+            if item is None or item.status != "listed":
+                continue
+            organization = db.query(Organization).filter(Organization.id == item.org_id).first()
+            by_user: dict[int, list[str]] = {}
+            for sub in matching_subscriptions(db, item, organization):
+                if sub.user_id != item.donated_by_user_id:
+                    by_user.setdefault(sub.user_id, []).append(sub.name)
+            if not by_user:
+                continue
+            users = db.query(User).filter(User.id.in_(by_user)).all()
+            for user in users:
+                if user.email and send_saved_search_alert(user, item, organization, by_user[user.id]):
+                    sent += 1
+    except Exception as e:
+        logger.error(f"Saved-search alerts failed: {e}")
+    finally:
+        db.close()
+    return sent
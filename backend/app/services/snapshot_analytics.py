@@ -0,0 +1,115 @@
+"""
+Heavy analytics computed from the columnar snapshot (app.services.columnar)
+
+Each function mirrors the SQL version in the analytics router and returns
+the same shape, as whole-column numpy passes over the memory-mapped arrays.
+Time windows end when the snapshot finished rather than now: the snapshot
+holds nothing newer, so a window ending now would under-count its last
+day(s). Each payload carries that moment as ``as_of``.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from app.services.columnar import Snapshot
+
+DAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def cohorts(snapshot: Snapshot, weeks: int) -> dict:
+    items = snapshot["items"]
+    as_of = snapshot.finished_at
+    end = np.datetime64(as_of.date(), "D")
+    start = end - np.timedelta64(weeks * 7, "D")
+
+    donors = items["donated_by_user_id"]
+    ready = items["ready_at"]
+    mask = (donors >= 0) & (ready >= start) & (ready < end + np.timedelta64(1, "D"))
+    user = donors[mask]
+    week = (ready[mask].astype("datetime64[D]") - start).astype(np.int64) // 7
+
+    # Distinct (donor, week) pairs, sorted by donor then week, so each donor's
+    # first pair holds their cohort week
+    pairs = np.unique(np.stack([user, week], axis=1), axis=0) if len(user) else np.empty((0, 2), np.int64)
+    _, starts, owner = np.unique(pairs[:, 0], return_index=True, return_inverse=True)
+    first_week = pairs[starts, 1]
+    pair_cohort = first_week[owner]
+    offset = pairs[:, 1] - pair_cohort
+    cohort_weeks, cohort_sizes = np.unique(first_week, return_counts=True)
+
+    max_offset = min(12, weeks)
+    in_grid = offset < max_offset
+    grid = np.zeros((len(cohort_weeks), max_offset), dtype=np.int64)
+    np.add.at(grid, (np.searchsorted(cohort_weeks, pair_cohort[in_grid]), offset[in_grid]), 1)
+    rates = grid / np.maximum(cohort_sizes, 1)[:, None]
+
+    start_date = as_of.date() - timedelta(weeks=weeks)
+    return {
+        "as_of": as_of.isoformat(),
+        "labels": [(start_date + timedelta(weeks=int(w))).isoformat() for w in cohort_weeks],
+        "offsets": list(range(max_offset)),
+        "matrix": [[round(float(r), 4) for r in row] for row in rates],
+    }
+
+
+def locations(snapshot: Snapshot, limit: int) -> dict:
+    items, orgs = snapshot["items"], snapshot["organizations"]
+    # Organizations sharing an address and coordinates are one location, as in the SQL GROUP BY
+    keys: dict = {}
+    location_of_org = np.array([
+        keys.setdefault((a, la if la == la else None, ln if ln == ln else None), len(keys)) if a is not None else -1
+        for a, la, ln in zip(orgs.decode("address"), orgs["lat"].tolist(), orgs["lng"].tolist())
+    ], dtype=np.int64)
+    by_key = list(keys)
+
+    # Item -> location through a sorted join on org id
+    order = np.argsort(orgs["id"])
+    sorted_ids = orgs["id"][order]
+    item_org = items["org_id"]
+    if len(sorted_ids):
+        position = np.searchsorted(sorted_ids, item_org).clip(0, len(sorted_ids) - 1)
+        item_location = np.where(sorted_ids[position] == item_org, location_of_org[order][position], -1)
+    else:
+        item_location = np.full(len(item_org), -1, dtype=np.int64)
+
+    def top(time_column: str) -> list:
+        selected = item_location[(item_location >= 0) & ~np.isnat(items[time_column])]
+        counts = np.bincount(selected, minlength=len(keys))
+        best = np.argsort(-counts, kind="stable")[:limit]
+        return [
+            {"address": by_key[i][0], "lat": by_key[i][1], "lng": by_key[i][2], "count": int(counts[i])}
+            for i in best if counts[i] > 0
+        ]
+
+    return {
+        "as_of": snapshot.finished_at.isoformat(),
+        "top_donation_locations": top("ready_at"),
+        "top_claim_locations": top("claimed_at"),
+    }
+
+
+def predictions(snapshot: Snapshot) -> dict:
+    ready = snapshot["items"]["ready_at"]
+    as_of = snapshot.finished_at
+    start = np.datetime64(as_of - timedelta(days=30), "s")
+    recent = ready[ready >= start].astype(np.int64)
+
+    hour_counts = np.bincount((recent % 86400) // 3600, minlength=24)
+    # 1970-01-01 was a Thursday; 0 = Sunday like SQL's extract('dow')
+    day_counts = np.bincount((recent // 86400 + 4) % 7, minlength=7)
+    hour_data = {h: int(c) for h, c in enumerate(hour_counts) if c}
+    day_data = {d: int(c) for d, c in enumerate(day_counts) if c}
+
+    best_hours = sorted(hour_data.items(), key=lambda x: x[1], reverse=True)[:3]
+    best_days = sorted(day_data.items(), key=lambda x: x[1], reverse=True)[:3]
+    return {
+        "as_of": as_of.isoformat(),
+        "hourly_patterns": [{"hour": h, "count": hour_data.get(h, 0)} for h in range(24)],
+        "daily_patterns": [{"day": DAY_NAMES[d], "day_number": d, "count": day_data.get(d, 0)} for d in range(7)],
+        "predictions": {
+            "best_donation_hours": [{"hour": h, "count": c} for h, c in best_hours],
+            "best_donation_days": [{"day": DAY_NAMES[d], "count": c} for d, c in best_days],
+            "next_peak_time": f"{best_hours[0][0]:02d}:00" if best_hours else "12:00",
+        },
+    }
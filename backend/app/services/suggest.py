@@ -0,0 +1,320 @@
+"""
+Type-ahead suggestions for the Browse search box
+
+An in-memory prefix index over live listings (titles and categories) and
+organization names. Every word start of a normalized term is a key in one
+sorted array, so "bre" finds both "bread rolls" and "whole wheat bread":
+a prefix lookup is a ``bisect`` to the first key >= the prefix and a walk
+forward while keys still start with it. Matches are ranked by the number
+of live items behind them (listed and not yet expired).
+
+Each process keeps its own index, loaded on first use:
+
+- create and claim in this process apply immediately (``item_listed`` /
+  ``item_unlisted``);
+- expiry is applied on read from a heap ordered by ``expires_at``;
+- a full reload every ``suggest_refresh_seconds`` picks up changes made
+  by other workers. One request runs it; requests arriving meanwhile are
+  served from the old index rather than queueing behind (or repeating) it.
+
+Short prefixes that match much of the index keep a ranked head that is
+adjusted as counts change, so they never rescan the whole array.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.metrics import register_cache
+from app.models.models import Item, Organization
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(_TOKEN.findall(text.lower())) if text else ""
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Like ``normalize``, but a trailing space is kept so 'whole ' won't match 'wholesale'"""
+    key = normalize(prefix)
+    return key + " " if key and prefix[-1:].isspace() else key
+
+
+def _word_starts(key: str) -> list[str]:
+    return [key[i:] for i in range(len(key)) if i == 0 or key[i - 1] == " "]
+
+
+@dataclass
+class Term:
+    kind: str
+    key: str
+    text: str  # display form, as first seen
+    count: int = 0
+
+
+def _rank(term: Term, prefix: str) -> tuple:
+    """Sort key: most live items, then terms that start with the prefix, then shortest"""
+    return -term.count, not term.key.startswith(prefix), len(term.key), term.key
+
+
+class SuggestIndex:
+    """Sorted word-start keys plus ranked heads for broad prefixes.
+
+    Walking the keys under a prefix is cheap while few keys share it. For
+    a prefix matching more than ``broad`` keys ("b"), the ranked top
+    ``head_size`` terms are kept in ``_heads`` and adjusted in place as
+    counts change, so short prefixes don't rescan most of the index.
+    """
+
+    def __init__(self, broad: int = 256, head_size: int = 40):
+        self.broad = broad
+        self.head_size = head_size
+        self._lock = threading.Lock()
+        self._keys: list[tuple[str, int]] = []  # (word-start suffix, term id), sorted
+        self._terms: dict[int, Term] = {}
+        self._term_ids: dict[tuple[str, str], int] = {}
+        self._next_id = 0
+        # item id -> (term ids it counts towards, expires_at)
+        self._items: dict[int, tuple[tuple[int, ...], Optional[datetime]]] = {}
+        self._org_terms: dict[int, int] = {}
+        self._expiry: list[tuple[datetime, int]] = []
+        # broad prefix -> best term ids, ranked; always the true top len(head)
+        self._heads: dict[str, list[int]] = {}
+        self._bulk = False
+        self.loaded_at: Optional[float] = None
+        # Lookups answered from a ranked head (hits) vs. by walking the keys (misses)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @property
+    def live_items(self) -> int:
+        return len(self._items)
+
+    def _term(self, kind: str, text: Optional[str]) -> Optional[int]:
+        key = normalize(text)
+        if not key:
+            return None
+        term_id = self._term_ids.get((kind, key))
+        if term_id is None:
+            term_id = self._next_id
+            self._next_id += 1
+            self._terms[term_id] = Term(kind, key, " ".join(text.split()))
+            self._term_ids[(kind, key)] = term_id
+            for suffix in _word_starts(key):
+                if self._bulk:
+                    self._keys.append((suffix, term_id))  # sorted once at the end of load()
+                else:
+                    bisect.insort(self._keys, (suffix, term_id))
+        return term_id
+
+    def _drop_term(self, term_id: int) -> None:
+        term = self._terms.pop(term_id)
+        del self._term_ids[(term.kind, term.key)]
+        for suffix in _word_starts(term.key):
+            i = bisect.bisect_left(self._keys, (suffix, term_id))
+            if i < len(self._keys) and self._keys[i] == (suffix, term_id):
+                del self._keys[i]
+
+    def _reranked(self, term_id: int, improved: bool, gone: bool = False) -> None:
+        """Fix the heads of every prefix of ``term_id`` after its count changed"""
+        if not self._heads:
+            return
+        term = self._terms[term_id]
+        prefixes = {suffix[:n] for suffix in _word_starts(term.key) for n in range(1, len(suffix) + 1)}
+        for prefix in prefixes:
+            head = self._heads.get(prefix)
+            if head is None:
+                continue
+            was_in = term_id in head
+            if was_in:
+                head.remove(term_id)
+            elif not improved:
+                continue
+            # A term that fell to the end may now trail terms outside the head, so it
+            # only stays if it still beats the last entry (or it moved up)
+            keep = improved and was_in or bool(head) and _rank(term, prefix) < _rank(self._terms[head[-1]], prefix)
+            if keep and not gone:
+                bisect.insort(head, term_id, key=lambda t: _rank(self._terms[t], prefix))
+                del head[self.head_size:]
+            if len(head) < self.head_size // 2:
+                # Too many entries dropped out; rebuilt on the next lookup
+                del self._heads[prefix]
+
+    def _add_org(self, org_id: int, name: Optional[str]) -> None:
+        if org_id in self._org_terms:
+            return
+        term_id = self._term("organization", name)
+        if term_id is not None:
+            self._org_terms[org_id] = term_id
+            self._reranked(term_id, improved=True)
+
+    def _add_item(self, item_id: int, title: Optional[str], category: Optional[str], org_id: Optional[int],
+                  expires_at: Optional[datetime]) -> None:
+        if item_id in self._items:
+            return
+        term_ids = [self._term("title", title), self._term("category", category), self._org_terms.get(org_id)]
+        term_ids = tuple(t for t in term_ids if t is not None)
+        for term_id in term_ids:
+            self._terms[term_id].count += 1
+            self._reranked(term_id, improved=True)
+        self._items[item_id] = (term_ids, expires_at)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, item_id))
+
+    def _remove_item(self, item_id: int) -> None:
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return
+        for term_id in entry[0]:
+            term = self._terms[term_id]
+            term.count -= 1
+            # Titles and categories exist only while something live uses them;
+            # organizations stay suggestible with a count of zero
+            gone = term.count <= 0 and term.kind != "organization"
+            self._reranked(term_id, improved=False, gone=gone)
+            if gone:
+                self._drop_term(term_id)
+
+    def _expire(self, now: datetime) -> None:
+        expiry = self._expiry
+        while expiry and expiry[0][0] < now:
+            expires_at, item_id = heapq.heappop(expiry)
+            entry = self._items.get(item_id)
+            if entry is not None and entry[1] == expires_at:
+                self._remove_item(item_id)
+
+    def load(self, organizations, items, now: Optional[datetime] = None) -> None:
+        """Replace the whole index: ``organizations`` as (id, name), ``items`` as
+        (id, title, category, org_id, expires_at) rows of live listings"""
+        fresh = SuggestIndex(self.broad, self.head_size)
+        fresh._bulk = True
+        for org_id, name in organizations:
+            fresh._add_org(org_id, name)
+        for item_id, title, category, org_id, expires_at in items:
+            fresh._add_item(item_id, title, category, org_id, expires_at)
+        fresh._keys.sort()
+        fresh._bulk = False
+        fresh._expire(now or datetime.utcnow())
+        with self._lock:
+            for name in ("_keys", "_terms", "_term_ids", "_next_id", "_items", "_org_terms", "_expiry", "_heads"):
+                setattr(self, name, getattr(fresh, name))
+            self.loaded_at = time.monotonic()
+
+    def org_added(self, org_id: int, name: Optional[str]) -> None:
+        with self._lock:
+            self._add_org(org_id, name)
+
+    def item_listed(self, item_id: int, title: Optional[str], category: Optional[str], org_id: Optional[int],
+                    expires_at: Optional[datetime]) -> None:
+        if expires_at is not None and expires_at < datetime.utcnow():
+            return
+        with self._lock:
+            self._add_item(item_id, title, category, org_id, expires_at)
+
+    def item_unlisted(self, item_id: int) -> None:
+        with self._lock:
+            self._remove_item(item_id)
+
+    def _ranked(self, prefix: str, limit: int) -> list[int]:
+        keys, terms = self._keys, self._terms
+        start = bisect.bisect_left(keys, (prefix,))
+        head = self._heads.get(prefix)
+        if head is not None:
+            self.hits += 1
+            return head[:limit]
+        self.misses += 1
+        broad = start + self.broad < len(keys) and keys[start + self.broad][0].startswith(prefix)
+        seen: set[int] = set()
+        i = start
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            seen.add(keys[i][1])
+            i += 1
+        best = heapq.nsmallest(max(limit, self.head_size) if broad else limit, seen,
+                               key=lambda t: _rank(terms[t], prefix))
+        if broad:
+            self._heads[prefix] = best
+        return best[:limit]
+
+    def suggest(self, prefix: str, limit: int = 8, now: Optional[datetime] = None) -> list[dict]:
+        """Completions of ``prefix``, most live items first"""
+        key = normalize_prefix(prefix)
+        if not key:
+            return []
+        with self._lock:
+            self._expire(now or datetime.utcnow())
+            return [
+                {"text": term.text, "type": term.kind, "count": term.count}
+                for term in (self._terms[t] for t in self._ranked(key, limit))
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._heads),
+                "terms": len(self._terms),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+suggest_index = SuggestIndex()
+register_cache("suggest_heads", suggest_index.stats)
+
+
+_reload_lock = threading.Lock()
+
+
+def _stale(every: float) -> bool:
+    return suggest_index.loaded_at is None or time.monotonic() - suggest_index.loaded_at >= every
+
+
+def refresh(db: Session, every: Optional[float] = None) -> None:
+    """(Re)load the index from the database when it's missing or older than ``every`` seconds.
+
+    Only the first load waits for a reload already in progress; after that,
+    requests that find one running keep using the current index.
+    """
+    every = get_settings().suggest_refresh_seconds if every is None else every
+    if not _stale(every):
+        return
+    if not _reload_lock.acquire(blocking=suggest_index.loaded_at is None):
+        return
+    try:
+        if not _stale(every):  # reloaded while this request waited for the lock
+            return
+        now = datetime.utcnow()
+        started = time.perf_counter()
+        organizations = db.query(Organization.id, Organization.name).all()
+        items = (
+            db.query(Item.id, Item.title, Item.category, Item.org_id, Item.expires_at)
+            .filter(Item.status == "listed")
+            .filter((Item.expires_at.is_(None)) | (Item.expires_at >= now))
+            .all()
+        )
+        suggest_index.load(organizations, items, now)
+    finally:
+        _reload_lock.release()
+    logger.info(f"Suggest index loaded: {len(suggest_index)} terms over {suggest_index.live_items} live items "
+                f"in {time.perf_counter() - started:.2f}s")
+
+
+def suggestions(db: Session, prefix: str, limit: int = 8) -> list[dict]:
+    refresh(db)
+    return suggest_index.suggest(prefix, limit)
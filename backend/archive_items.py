@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Item archival job for FoodBridge
+
+Moves items claimed, or expired without being claimed, more than
+ARCHIVE_AFTER_DAYS ago from ``items`` into ``items_archive`` (see
+app/services/archive.py), so the hot table stays the size of the live
+inventory. Events, history analytics, the dashboard and the activity feed
+are unaffected. Run it from cron, e.g. nightly:
+
+    python archive_items.py                      # archive with the configured settings
+    python archive_items.py --dry-run            # only count what would move
+    python archive_items.py --days 90 --batch-size 500
+
+Each batch is its own short transaction, with ARCHIVE_BATCH_PAUSE_MS
+between batches, so it is safe to run while the app is serving traffic.
+"""
+
+import argparse
+import sys
+
+from app.core.config import get_settings
+from app.db.session import engine
+from app.services import archive
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=settings.archive_after_days,
+                        help="Archive items claimed/expired more than this many days ago (default: ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size,
+                        help="Items moved per transaction (default: ARCHIVE_BATCH_SIZE)")
+    parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+    parser.add_argument("--dry-run", action="store_true", help="Count archivable items and exit")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        count = archive.count_archivable(engine, args.days)
+        print(f"📦 {count:,} items claimed or expired more than {args.days:g} days ago would be archived")
+        return
+
+    try:
+        result = archive.archive_items(
+            engine,
+            args.days,
+            batch_size=args.batch_size,
+            pause=settings.archive_batch_pause_ms / 1000,
+            max_batches=args.max_batches,
+        )
+    except Exception as e:
+        print(f"❌ Archival failed: {e}")
+        sys.exit(1)
+    print(f"✅ Archived {result['moved']:,} items (cutoff {result['cutoff']}) "
+          f"in {result['batches']} batches, {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
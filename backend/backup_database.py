@@ -1,57 +1,140 @@
 #!/usr/bin/env python3
 """
 Database backup utility for FoodBridge
-Automatically creates timestamped backups of the database
+
+Online, compressed and verified SQLite snapshots, optional WAL shipping for
+point-in-time restore, and retention (see app/db/backup.py for details):
+
+    python backup_database.py                      # snapshot + retention (same as `backup`)
+    python backup_database.py backup
+    python backup_database.py list
+    python backup_database.py verify [--all]
+    python backup_database.py ship-wal             # long-running; set SQLITE_WAL_SHIPPING=true for the app
+    python backup_database.py restore --output restored.db [--to "2026-10-19T12:30:00"] [--replace]
+    python backup_database.py prune
+
+Restores are built in a scratch file and must pass integrity_check before
+they're moved into place. Restore to a new path and point DATABASE_URL at it,
+or stop the app before restoring over the live database with --replace.
 """
 
-import shutil
-import os
+import argparse
+import logging
+import sys
 from datetime import datetime
 from pathlib import Path
 
+from app.core.config import get_settings
+from app.db import backup
+
+BACKEND_DIR = Path(__file__).parent
+
+
+def _backup_dir(settings) -> Path:
+    path = Path(settings.backup_dir)
+    return path if path.is_absolute() else BACKEND_DIR / path
+
+
 def backup_database():
-    """Create a timestamped backup of the database"""
-    
-    # Paths
-    backend_dir = Path(__file__).parent
-    db_file = backend_dir / "database.db"
-    backups_dir = backend_dir / "backups"
-    
-    # Create backups directory if it doesn't exist
-    backups_dir.mkdir(exist_ok=True)
-    
-    # Generate timestamp for backup filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_filename = f"database_backup_{timestamp}.db"
-    backup_path = backups_dir / backup_filename
-    
-    # Create backup
-    if db_file.exists():
-        shutil.copy2(db_file, backup_path)
-        print(f"✅ Database backed up to: {backup_path}")
-        
-        # Keep only last 10 backups to save space
-        backups = sorted(backups_dir.glob("database_backup_*.db"))
-        if len(backups) > 10:
-            for old_backup in backups[:-10]:
-                old_backup.unlink()
-                print(f"🗑️ Removed old backup: {old_backup.name}")
-                
-        return backup_path
-    else:
-        print("❌ No database file found to backup")
+    """Create a verified, compressed snapshot of the database and apply retention"""
+    settings = get_settings()
+    backup_dir = _backup_dir(settings)
+    try:
+        manifest = backup.create_snapshot(
+            backup.sqlite_path(settings.database_url),
+            backup_dir,
+            step_pages=settings.backup_step_pages,
+            step_sleep=settings.backup_step_sleep_ms / 1000,
+        )
+    except backup.BackupError as e:
+        print(f"❌ {e}")
         return None
 
-def restore_database(backup_path):
-    """Restore database from a backup"""
-    backend_dir = Path(__file__).parent
-    db_file = backend_dir / "database.db"
-    
-    if Path(backup_path).exists():
-        shutil.copy2(backup_path, db_file)
-        print(f"✅ Database restored from: {backup_path}")
-    else:
-        print(f"❌ Backup file not found: {backup_path}")
+    ratio = manifest["compressed_bytes"] / max(1, manifest["size_bytes"])
+    print(f"✅ Database backed up to: {backup_dir / 'snapshots' / manifest['file']}")
+    print(f"   {manifest['page_count']} pages in {manifest['backup_steps']} steps, "
+          f"{manifest['size_bytes']:,} -> {manifest['compressed_bytes']:,} bytes ({ratio:.0%}), integrity ok")
+
+    removed = backup.prune(backup_dir, settings.backup_keep, settings.backup_keep_days)
+    if removed["snapshots_removed"] or removed["segments_removed"]:
+        print(f"🗑️ Removed {removed['snapshots_removed']} old snapshots and {removed['segments_removed']} WAL segments")
+    return backup_dir / "snapshots" / manifest["file"]
+
+
+def restore_database(output, to_time=None, replace=False):
+    """Restore the database as of ``to_time`` (default: latest) into ``output``"""
+    settings = get_settings()
+    try:
+        result = backup.restore(_backup_dir(settings), Path(output), to_time, replace=replace)
+    except backup.BackupError as e:
+        print(f"❌ {e}")
+        return None
+    print(f"✅ Database restored to: {result['output']}")
+    print(f"   from {result['snapshot']} + {result['segments_applied']} WAL segments, "
+          f"through {result['restored_through']}, integrity ok")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("backup", help="Take a snapshot and apply retention")
+    sub.add_parser("list", help="List snapshots and WAL segments")
+    verify = sub.add_parser("verify", help="Re-verify stored snapshots")
+    verify.add_argument("--all", action="store_true", help="Verify every snapshot, not just the newest")
+    sub.add_parser("ship-wal", help="Continuously ship WAL segments (point-in-time restore)")
+    restore = sub.add_parser("restore", help="Restore to a point in time")
+    restore.add_argument("--output", required=True, help="Database file to write")
+    restore.add_argument("--to", type=datetime.fromisoformat, help="UTC time to restore to (default: latest)")
+    restore.add_argument("--replace", action="store_true", help="Overwrite --output if it exists")
+    sub.add_parser("prune", help="Apply retention")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    backup_dir = _backup_dir(settings)
+    command = args.command or "backup"
+
+    if command == "backup":
+        sys.exit(0 if backup_database() else 1)
+    elif command == "list":
+        for manifest in backup.list_snapshots(backup_dir):
+            print(f"📦 {manifest['file']}  finished {manifest['finished_at']}  {manifest['compressed_bytes']:,} bytes")
+        segments = backup.list_segments(backup_dir)
+        if segments:
+            print(f"📜 {len(segments)} WAL segments, {segments[0]['shipped_at']} .. {segments[-1]['shipped_at']}")
+    elif command == "verify":
+        snapshots = backup.list_snapshots(backup_dir)
+        failed = 0
+        for manifest in snapshots if args.all else snapshots[-1:]:
+            try:
+                result = backup.verify_snapshot(backup_dir, manifest)
+            except backup.BackupError as e:
+                result = str(e)
+            failed += result != "ok"
+            print(f"{'✅' if result == 'ok' else '❌'} {manifest['file']}: {result[:200]}")
+        sys.exit(1 if failed or not snapshots else 0)
+    elif command == "ship-wal":
+        logging.basicConfig(level=logging.INFO)
+        if not settings.sqlite_wal_shipping:
+            print("⚠️ SQLITE_WAL_SHIPPING is not set: app connections may checkpoint frames before they are shipped")
+        try:
+            shipper = backup.WalShipper(
+                backup.sqlite_path(settings.database_url), backup_dir, settings.backup_wal_checkpoint_frames
+            )
+        except backup.BackupError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"🚚 Shipping WAL segments to {backup_dir / 'wal'} every {settings.backup_wal_ship_seconds}s")
+        try:
+            shipper.run(settings.backup_wal_ship_seconds)
+        except KeyboardInterrupt:
+            pass
+    elif command == "restore":
+        sys.exit(0 if restore_database(args.output, args.to, args.replace) else 1)
+    elif command == "prune":
+        removed = backup.prune(backup_dir, settings.backup_keep, settings.backup_keep_days)
+        print(f"🗑️ Removed {removed['snapshots_removed']} snapshots and {removed['segments_removed']} WAL segments")
+
 
 if __name__ == "__main__":
-    backup_database()
+    main()
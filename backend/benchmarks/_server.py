@@ -0,0 +1,73 @@
+"""
+Helpers shared by the benchmark scripts: a throwaway uvicorn server on a
+scratch database, and latency summaries.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(env: dict | None = None, database_url: str | None = None, timeout: float = 30.0):
+    """Start uvicorn against a migrated scratch database and yield its base URL."""
+    with tempfile.TemporaryDirectory(prefix="foodbridge-bench-") as tmp:
+        server_env = {
+            **os.environ,
+            "DATABASE_URL": database_url or f"sqlite:///{tmp}/bench.db",
+            "AUTO_MIGRATE": "true",
+            **(env or {}),
+        }
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=server_env,
+        )
+        try:
+            started = time.perf_counter()
+            while True:
+                try:
+                    with urllib.request.urlopen(f"{base_url}/health", timeout=0.5):
+                        break
+                except OSError:
+                    if proc.poll() is not None or time.perf_counter() - started > timeout:
+                        raise RuntimeError("Benchmark server failed to start")
+                    time.sleep(0.05)
+            yield base_url
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def percentiles(samples: list[float]) -> dict:
+    """p50/p95/p99/max of latency samples (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
@@ -0,0 +1,124 @@
+"""
+Overload benchmark: an analytics storm next to claims and listings
+
+Many clients hammer the heavy analytics routes (series, cohorts,
+explain/detailed) while a few create-and-claim items and browse the list.
+Reports claim and list latency, plus how many analytics requests were
+served or shed with a 503. Run it with and without admission control:
+
+    python -m benchmarks.admission --database-url sqlite:///./bench.db
+    python -m benchmarks.admission --database-url sqlite:///./bench.db --no-admission
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from benchmarks._server import percentiles, running_server
+
+ANALYTICS = ["/api/v1/analytics/series", "/api/v1/analytics/cohorts", "/api/v1/analytics/explain/detailed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="sqlite:/// URL of a generated dataset (copied, never modified)")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of mixed load")
+    parser.add_argument("--analytics-clients", type=int, default=48)
+    parser.add_argument("--claim-clients", type=int, default=4)
+    parser.add_argument("--list-clients", type=int, default=4)
+    parser.add_argument("--no-admission", action="store_true", help="Run with ADMISSION_ENABLED=false")
+    args = parser.parse_args()
+
+    env = {"ADMISSION_ENABLED": "false" if args.no_admission else "true", "AUTH_RATE_LIMIT_ENABLED": "false"}
+    with tempfile.TemporaryDirectory(prefix="foodbridge-admission-") as tmp:
+        database_url = None
+        if args.database_url:
+            copy = Path(tmp) / "bench.db"
+            shutil.copyfile(args.database_url.removeprefix("sqlite:///"), copy)
+            database_url = f"sqlite:///{copy}"
+        with running_server(env=env, database_url=database_url, timeout=120) as base_url:
+            results = _run(base_url, args)
+
+    print(json.dumps({"config": vars(args), **results}, indent=2))
+
+
+def _run(base_url: str, args) -> dict:
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        client.post("/api/v1/auth/register", json={
+            "name": "Bench", "email": "bench@example.com", "role": "donor", "password": "benchpass",
+        }).raise_for_status()
+        token = client.post("/api/v1/auth/login", json={
+            "email": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+        org = client.post("/api/v1/orgs/", json={"name": "Bench Org", "type": "restaurant"}).json()
+    auth = {"Authorization": f"Bearer {token}"}
+
+    deadline = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    latency: dict[str, list[float]] = {"claim": [], "list": [], "analytics": []}
+    statuses: dict[str, dict[str, int]] = {name: {} for name in latency}
+
+    def record(kind: str, status: int, elapsed: float) -> None:
+        with lock:
+            statuses[kind][str(status)] = statuses[kind].get(str(status), 0) + 1
+            if status < 400:
+                latency[kind].append(elapsed)
+
+    def analytics_worker(offset: int):
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            n = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                resp = client.get(ANALYTICS[n % len(ANALYTICS)])
+                record("analytics", resp.status_code, time.perf_counter() - started)
+                n += 1
+                if resp.status_code == 503:
+                    # Back off for Retry-After, as a well-behaved client would
+                    time.sleep(min(float(resp.headers.get("retry-after", 1)), max(0.0, deadline - time.perf_counter())))
+
+    def claim_worker():
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                item = client.post("/api/v1/items/", headers=auth, json={
+                    "org_id": org["id"], "title": "Bench bread", "category": "Bakery",
+                    "expires_at": (datetime.utcnow() + timedelta(hours=6)).isoformat(),
+                })
+                if item.status_code == 200:
+                    item = client.post(f"/api/v1/items/{item.json()['id']}/claim", headers=auth,
+                                       json={"claimer_name": "Bench"})
+                record("claim", item.status_code, time.perf_counter() - started)
+
+    def list_worker():
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                resp = client.get("/api/v1/items/", params={"status": "listed", "limit": 20})
+                record("list", resp.status_code, time.perf_counter() - started)
+
+    threads = [threading.Thread(target=analytics_worker, args=(i,)) for i in range(args.analytics_clients)]
+    threads += [threading.Thread(target=claim_worker) for _ in range(args.claim_clients)]
+    threads += [threading.Thread(target=list_worker) for _ in range(args.list_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        kind: {
+            "statuses": statuses[kind],
+            "throughput_per_s": round(len(latency[kind]) / args.duration, 2),
+            "latency": percentiles(latency[kind]),
+        }
+        for kind in latency
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Deterministic scale-data generator
+
+Bulk-loads organizations, users, items and events into a (new or existing)
+database with realistic shapes:
+
+- organizations clustered around a handful of metro centres
+- items listed over the last --days days, weighted toward weekdays and the
+  late-afternoon surplus peak, with category-dependent storage, allergens,
+  shelf life and pickup windows
+- roughly two thirds of past listings claimed (fewer for short shelf lives and
+  late-night listings), with claim delays skewed short
+- view -> claim-start -> claim event funnels for each item
+
+Timestamps are anchored to --end (default: today, 00:00 UTC), so the same
+--seed and --end always produce the same rows. Example:
+
+    python -m benchmarks.generate_data --database-url sqlite:///./bench.db \\
+        --orgs 10000 --users 100000 --items 1000000 --events 10000000
+"""
+
+import argparse
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import bcrypt
+from sqlalchemy import event, insert
+
+from app.db.migrate import migrate
+from app.db.session import build_engine
+from app.models.models import Event, Item, Organization, User
+from app.services.attributes import attribute_mask
+from app.services.counters import reconcile_counters
+from app.services.pickup_windows import pickup_bounds
+
+# (lat, lng, weight) metro centres organizations cluster around
+METROS = [
+    (43.6532, -79.3832, 0.30),   # Toronto
+    (45.5017, -73.5673, 0.20),   # Montreal
+    (49.2827, -123.1207, 0.18),  # Vancouver
+    (51.0447, -114.0719, 0.12),  # Calgary
+    (45.4215, -75.6972, 0.10),   # Ottawa
+    (53.5461, -113.4938, 0.10),  # Edmonton
+]
+
+ORG_TYPES = ["Restaurant", "Grocery Store", "Bakery", "Cafe", "Catering", "Food Bank",
+             "Charity", "Community Center", "School", "Hospital"]
+ORG_TYPE_WEIGHTS = [25, 20, 10, 10, 5, 10, 8, 6, 3, 3]
+
+# category -> (weight, storage types, possible allergens, shelf life hours range)
+CATEGORIES = {
+    "Bakery": (18, ["ambient"], ["gluten", "milk", "eggs", "sesame"], (12, 72)),
+    "Produce": (20, ["ambient", "refrigerated"], [], (24, 168)),
+    "Prepared Food": (22, ["refrigerated"], ["gluten", "milk", "soy", "eggs", "peanuts"], (4, 36)),
+    "Dairy": (10, ["refrigerated"], ["milk"], (48, 240)),
+    "Meat": (6, ["refrigerated", "frozen"], [], (24, 720)),
+    "Pantry": (12, ["ambient"], ["gluten", "soy", "peanuts", "tree nuts"], (720, 4320)),
+    "Frozen": (5, ["frozen"], ["gluten", "milk"], (720, 2160)),
+    "Beverages": (7, ["ambient", "refrigerated"], [], (168, 2160)),
+}
+
+PICKUP_WINDOWS = ["9 AM - 5 PM", "10 AM - 4 PM", "Mon-Fri 9 AM - 5 PM", "11 AM - 7 PM", "8 AM - 8 PM", "5 PM - 9 PM",
+                  "Available until 6 PM", "Available until midnight", "2 hours", "3 hours"]
+
+# Hour-of-day weights: small morning bump, big late-afternoon surplus peak
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 9, 10, 9, 9, 11, 14, 16, 15, 11, 7, 4, 2, 1]
+WEEKDAY_WEIGHTS = [10, 10, 10, 11, 13, 9, 7]  # Monday..Sunday
+
+BATCH = 5000
+
+
+def _weighted_timestamp(rng: random.Random, start: datetime, days: int) -> datetime:
+    while True:
+        day = rng.randrange(days)
+        ts = start + timedelta(days=day)
+        if rng.random() * 13 <= WEEKDAY_WEIGHTS[ts.weekday()]:
+            break
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    return ts.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def _insert_batches(conn, table, rows_iter, label: str, total: int):
+    started = time.perf_counter()
+    batch = []
+    done = 0
+    for row in rows_iter:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.execute(insert(table), batch)
+            done += len(batch)
+            batch.clear()
+            if done % (BATCH * 20) == 0:
+                rate = done / max(1e-9, time.perf_counter() - started)
+                print(f"   {label}: {done:,}/{total:,} ({rate:,.0f} rows/s)")
+    if batch:
+        conn.execute(insert(table), batch)
+        done += len(batch)
+    print(f"✅ {label}: {done:,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def generate(database_url: str, orgs: int, users: int, items: int, events: int, days: int, seed: int, end: datetime):
+    engine = build_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        # Bulk load only: durability doesn't matter until the load has finished
+        @event.listens_for(engine, "connect")
+        def _fast_load(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA synchronous=OFF")
+            dbapi_connection.execute("PRAGMA journal_mode=MEMORY")
+
+    migrate(bind=engine)
+    rng = random.Random(seed)
+    now = end
+    start = now - timedelta(days=days)
+    password_hash = bcrypt.hashpw(b"benchpass", bcrypt.gensalt(rounds=4)).decode()
+    category_names = list(CATEGORIES)
+    category_weights = [CATEGORIES[c][0] for c in category_names]
+
+    with engine.begin() as conn:
+        org_base = (conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM organizations").scalar() or 0) + 1
+        user_base = (conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM users").scalar() or 0) + 1
+        item_base = (conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM items").scalar() or 0) + 1
+
+    def org_rows():
+        for i in range(orgs):
+            lat, lng, _ = rng.choices(METROS, weights=[m[2] for m in METROS])[0]
+            org_type = rng.choices(ORG_TYPES, weights=ORG_TYPE_WEIGHTS)[0]
+            yield {
+                "id": org_base + i,
+                "name": f"{org_type} #{org_base + i}",
+                "type": org_type,
+                "address": f"{rng.randrange(1, 9999)} Bench St",
+                "lat": rng.gauss(lat, 0.08),
+                "lng": rng.gauss(lng, 0.12),
+                "capacity_json": {
+                    "ambient": round(rng.lognormvariate(3, 0.6), 1),
+                    "refrigerated": round(rng.lognormvariate(2.3, 0.7), 1),
+                    "frozen": round(rng.lognormvariate(1.5, 0.8), 1),
+                },
+                "donation_count": 0, "claim_count": 0, "quantity_rescued": 0.0,
+            }
+
+    def user_rows():
+        for i in range(users):
+            uid = user_base + i
+            yield {
+                "id": uid,
+                "name": f"Bench User {uid}",
+                "email": f"user{uid}@bench.example.com",
+                "role": "donor" if rng.random() < 0.3 else "user",
+                "verified": rng.random() < 0.6,
+                "password_hash": password_hash,
+                "created_at": _weighted_timestamp(rng, start, days),
+                "donation_count": 0, "claim_count": 0, "quantity_rescued": 0.0,
+            }
+
+    # Activity is skewed: a small share of accounts donate and claim most items
+    def pick_user():
+        return user_base + int(users * rng.random() ** 3)
+
+    # Compact per-item facts for event generation (index = item id - item_base)
+    meta_created = array("d")
+    meta_claimed = array("d")  # 0 when unclaimed
+    meta_claimer = array("q")  # 0 when anonymous or unclaimed
+
+    def item_rows():
+        for i in range(items):
+            item_id = item_base + i
+            category = rng.choices(category_names, weights=category_weights)[0]
+            _, storages, allergens, (shelf_lo, shelf_hi) = CATEGORIES[category]
+            created_at = _weighted_timestamp(rng, start, days)
+            ready_at = created_at + timedelta(minutes=rng.choice([0, 0, 15, 30, 60, 120]))
+            expires_at = ready_at + timedelta(hours=rng.uniform(shelf_lo, shelf_hi))
+            donor = pick_user() if users and rng.random() < 0.8 else None
+            claimed_at = claimer = None
+            status = "listed"
+            # About two thirds get claimed; short shelf lives and late-night listings less often
+            shelf_h = (expires_at - ready_at).total_seconds() / 3600
+            claim_p = 0.67 * (0.55 + 0.45 * min(1.0, shelf_h / 48)) * (0.7 if created_at.hour < 7 or created_at.hour >= 22 else 1.1)
+            if rng.random() < claim_p:
+                # Most claims land within a few hours of the food becoming ready
+                delay_h = min((expires_at - ready_at).total_seconds() / 3600, rng.expovariate(1 / 3.0))
+                if ready_at + timedelta(hours=delay_h) <= now:
+                    claimed_at = ready_at + timedelta(hours=delay_h)
+                    status = "claimed"
+                    claimer = pick_user() if users and rng.random() < 0.85 else None
+            item_allergens = rng.sample(allergens, k=rng.randint(0, min(2, len(allergens))))
+            storage_type = rng.choice(storages)
+            meta_created.append(created_at.timestamp())
+            meta_claimed.append(claimed_at.timestamp() if claimed_at else 0.0)
+            meta_claimer.append(claimer or 0)
+            row = {
+                "id": item_id,
+                "org_id": org_base + rng.randrange(orgs),
+                "title": f"{category} batch {item_id}",
+                "description": f"Surplus {category.lower()} from bench generator",
+                "category": category,
+                "allergens_json": item_allergens,
+                "storage_type": storage_type,
+                "attribute_mask": attribute_mask(item_allergens, storage_type),
+                "quantity": round(max(0.5, rng.lognormvariate(1.5, 0.7)), 1),
+                "ready_at": ready_at,
+                "expires_at": expires_at,
+                "pickup_window": rng.choice(PICKUP_WINDOWS),
+                "status": status,
+                "created_at": created_at,
+                "claimed_at": claimed_at,
+                "claimed_by_name": "Bench Recipient" if claimed_at else None,
+                "claimed_by_user_id": claimer,
+                "donated_by_user_id": donor,
+            }
+            row.update(pickup_bounds(row["pickup_window"], ready_at, expires_at, created_at))
+            yield row
+
+    def event_rows():
+        produced = 0
+        while produced < events and meta_created:
+            idx = rng.randrange(len(meta_created))
+            item_id = item_base + idx
+            created_at = datetime.fromtimestamp(meta_created[idx])
+            claimed_at = datetime.fromtimestamp(meta_claimed[idx]) if meta_claimed[idx] else None
+            claimer = meta_claimer[idx] or None
+            viewer = claimer if claimer and rng.random() < 0.5 else (pick_user() if users else None)
+            ts = min(now, created_at + timedelta(minutes=rng.expovariate(1 / 90.0)))
+            yield {"created_at": ts, "user_id": viewer, "item_id": item_id, "event_type": "item_viewed", "metadata_json": {}}
+            produced += 1
+            if claimed_at and viewer == claimer and produced < events:
+                yield {"created_at": claimed_at - timedelta(seconds=rng.randrange(5, 300)), "user_id": viewer,
+                       "item_id": item_id, "event_type": "claim_started", "metadata_json": {}}
+                produced += 1
+                if produced < events:
+                    yield {"created_at": claimed_at, "user_id": viewer, "item_id": item_id,
+                           "event_type": "item_claimed", "metadata_json": {}}
+                    produced += 1
+
+    with engine.begin() as conn:
+        _insert_batches(conn, Organization.__table__, org_rows(), "organizations", orgs)
+        _insert_batches(conn, User.__table__, user_rows(), "users", users)
+        if orgs:
+            _insert_batches(conn, Item.__table__, item_rows(), "items", items)
+        _insert_batches(conn, Event.__table__, event_rows(), "events", events)
+        print("🔁 Reconciling stored counters...")
+        reconcile_counters(conn)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--orgs", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="History length")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None,
+                        help="ISO timestamp the history ends at (default: today 00:00 UTC)")
+    args = parser.parse_args()
+    end = args.end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    generate(args.database_url, args.orgs, args.users, args.items, args.events, args.days, args.seed, end)
+
+
+if __name__ == "__main__":
+    main()
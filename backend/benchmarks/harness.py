@@ -0,0 +1,338 @@
+"""
+Benchmark harness for every /api/v1 route
+
+Each route runs as its own phase (--requests requests spread over
+--concurrency client threads), followed by a contended-claim phase where
+every client races to claim the same fresh items. Results (throughput,
+p50/p95/p99 latency, status codes) are written as JSON so runs can be
+diffed.
+
+Some phases consume what an earlier phase made: items.claim claims the
+items from items.create (one claim per item, uncontended) and
+searches.delete deletes the searches from searches.create. Run alone with
+--routes they have nothing to act on and report 404s. Admin routes
+(matching.run, auth.cache_stats) use a second, admin account; images from
+items.upload_image are removed afterwards when the harness started the
+server itself.
+
+Against a scratch server on a generated dataset:
+
+    python -m benchmarks.generate_data --database-url sqlite:///./bench.db
+    python -m benchmarks.harness --database-url sqlite:///./bench.db --output bench.json
+
+Or against a running deployment (its rate limiter must allow the login phase):
+
+    python -m benchmarks.harness --base-url http://127.0.0.1:8000 --output bench.json
+"""
+
+import argparse
+import itertools
+import json
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import httpx
+
+from benchmarks._server import BACKEND_DIR, percentiles, running_server
+
+API = "/api/v1"
+
+
+@dataclass
+class Context:
+    """Ids and credentials discovered during setup, shared by every phase"""
+    token: str
+    admin_token: str
+    email: str
+    org_ids: list
+    item_ids: list
+    counter: "itertools.count"
+    # Filled by earlier phases for later ones (see the module docstring)
+    fresh_item_ids: list = field(default_factory=list)
+    search_ids: list = field(default_factory=list)
+    uploads: list = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def admin_auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.admin_token}"}
+
+    def pick(self, values: list):
+        return values[next(self.counter) % len(values)]
+
+    def take(self, values: list) -> int:
+        """Pop one id made by an earlier phase (0, which never exists, once they run out)"""
+        with self.lock:
+            return values.pop() if values else 0
+
+    def keep(self, values: list, value) -> None:
+        with self.lock:
+            values.append(value)
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    path: Callable[[Context], str]
+    body: Optional[Callable[[Context], dict]] = None
+    params: Optional[Callable[[Context], dict]] = None
+    files: Optional[Callable[[Context], dict]] = None
+    auth: bool = False
+    admin: bool = False
+    # Called with each 200 response, to hand ids to later phases
+    record: Optional[Callable[[Context, httpx.Response], None]] = None
+
+
+def _new_item(ctx: Context) -> dict:
+    n = next(ctx.counter)
+    now = datetime.utcnow()
+    return {
+        "org_id": ctx.pick(ctx.org_ids),
+        "title": f"Harness item {n}",
+        "category": "Bakery",
+        "allergens": ["gluten"],
+        "storage_type": "ambient",
+        "quantity": 3,
+        "ready_at": now.isoformat(),
+        "expires_at": (now + timedelta(hours=12)).isoformat(),
+        "pickup_window": "9 AM - 5 PM",
+    }
+
+
+# Smallest valid PNG (1x1, transparent)
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+ROUTES = [
+    Route("auth.register", "POST", lambda c: f"{API}/auth/register", body=lambda c: {
+        "name": "Harness", "email": f"harness-{time.time_ns()}-{next(c.counter)}@example.com",
+        "role": "user", "password": "benchpass"}),
+    Route("auth.login", "POST", lambda c: f"{API}/auth/login", body=lambda c: {"email": c.email, "password": "benchpass"}),
+    Route("auth.me", "GET", lambda c: f"{API}/auth/me", auth=True),
+    Route("auth.update_me", "PUT", lambda c: f"{API}/auth/me", body=lambda c: {"name": "Harness"}, auth=True),
+    Route("auth.dashboard", "GET", lambda c: f"{API}/auth/dashboard", auth=True),
+    Route("auth.activity", "GET", lambda c: f"{API}/auth/activity", auth=True),
+    Route("auth.cache_stats", "GET", lambda c: f"{API}/auth/cache/stats", admin=True),
+    Route("orgs.list", "GET", lambda c: f"{API}/orgs/"),
+    Route("orgs.get", "GET", lambda c: f"{API}/orgs/{c.pick(c.org_ids)}"),
+    Route("orgs.create", "POST", lambda c: f"{API}/orgs/", body=lambda c: {
+        "name": f"Harness org {next(c.counter)}", "type": "Restaurant", "lat": 43.65, "lng": -79.38}),
+    Route("items.list", "GET", lambda c: f"{API}/items/", params=lambda c: {"status": "listed"}),
+    Route("items.search", "GET", lambda c: f"{API}/items/", params=lambda c: {"q": "bakery"}),
+    Route("items.allergy_safe", "GET", lambda c: f"{API}/items/", params=lambda c: {
+        "status": "listed", "exclude_allergens": "gluten,milk,peanuts", "storage_type": "refrigerated"}),
+    Route("items.by_risk", "GET", lambda c: f"{API}/items/", params=lambda c: {"sort": "risk", "limit": 20}),
+    Route("items.clusters", "GET", lambda c: f"{API}/items/clusters", params=lambda c: {
+        "bbox": "-80.0,43.3,-78.9,44.1", "zoom": c.pick([9, 11, 13])}),
+    Route("items.suggest", "GET", lambda c: f"{API}/items/suggest", params=lambda c: {
+        "prefix": c.pick(["b", "br", "bre", "pro", "dai", "pre", "me"])}),
+    Route("items.attributes", "GET", lambda c: f"{API}/items/attributes"),
+    Route("items.get", "GET", lambda c: f"{API}/items/{c.pick(c.item_ids)}"),
+    Route("items.create", "POST", lambda c: f"{API}/items/", body=_new_item, auth=True,
+          record=lambda c, r: c.keep(c.fresh_item_ids, r.json()["id"])),
+    Route("items.claim", "POST", lambda c: f"{API}/items/{c.take(c.fresh_item_ids)}/claim",
+          body=lambda c: {"claimer_name": "Harness"}, auth=True),
+    Route("items.upload_image", "POST", lambda c: f"{API}/items/upload-image/",
+          files=lambda c: {"file": ("harness.png", _PNG, "image/png")},
+          record=lambda c, r: c.keep(c.uploads, r.json()["image_url"])),
+    Route("searches.create", "POST", lambda c: f"{API}/searches/", body=lambda c: {
+        "name": f"Harness search {next(c.counter)}", "category": "Bakery", "keywords": ["bread"],
+        "lat": 43.65, "lng": -79.38, "radius_km": 10, "exclude_allergens": ["peanuts"]}, auth=True,
+          record=lambda c, r: c.keep(c.search_ids, r.json()["id"])),
+    Route("searches.list", "GET", lambda c: f"{API}/searches/", auth=True),
+    Route("searches.delete", "DELETE", lambda c: f"{API}/searches/{c.take(c.search_ids)}", auth=True),
+    Route("matching.run", "GET", lambda c: f"{API}/matching/run", admin=True),
+    Route("volunteer.route", "POST", lambda c: f"{API}/volunteer/route", body=lambda c: {
+        "start_lat": 43.65, "start_lng": -79.38, "item_ids": [c.pick(c.item_ids) for _ in range(20)]}, auth=True),
+    Route("analytics.events", "POST", lambda c: f"{API}/analytics/events", body=lambda c: {
+        "event_type": "item_viewed", "item_id": c.pick(c.item_ids)}, auth=True),
+    Route("analytics.summary", "GET", lambda c: f"{API}/analytics/summary"),
+    Route("analytics.series", "GET", lambda c: f"{API}/analytics/series"),
+    Route("analytics.categories", "GET", lambda c: f"{API}/analytics/categories"),
+    Route("analytics.forecast", "GET", lambda c: f"{API}/analytics/forecast"),
+    Route("analytics.risk", "GET", lambda c: f"{API}/analytics/risk"),
+    Route("analytics.cohorts", "GET", lambda c: f"{API}/analytics/cohorts"),
+    Route("analytics.funnel", "GET", lambda c: f"{API}/analytics/funnel?window=24h&days=30"),
+    Route("analytics.explain", "GET", lambda c: f"{API}/analytics/explain"),
+    Route("analytics.explain_detailed", "GET", lambda c: f"{API}/analytics/explain/detailed"),
+    Route("analytics.locations", "GET", lambda c: f"{API}/analytics/locations"),
+    Route("analytics.contributors", "GET", lambda c: f"{API}/analytics/contributors"),
+    Route("analytics.predictions", "GET", lambda c: f"{API}/analytics/predictions"),
+]
+
+
+def _login(client: httpx.Client, role: str) -> tuple[str, str]:
+    email = f"harness-{role}-{time.time_ns()}@example.com"
+    client.post(f"{API}/auth/register", json={
+        "name": "Harness", "email": email, "role": role, "password": "benchpass"}).raise_for_status()
+    token = client.post(f"{API}/auth/login", json={"email": email, "password": "benchpass"}).json()["access_token"]
+    return email, token
+
+
+def _setup(client: httpx.Client) -> Context:
+    email, token = _login(client, "donor")
+    _, admin_token = _login(client, "admin")
+    ctx = Context(token=token, admin_token=admin_token, email=email, org_ids=[], item_ids=[],
+                  counter=itertools.count())
+
+    ctx.org_ids = [org["id"] for org in client.get(f"{API}/orgs/").json()]
+    if not ctx.org_ids:
+        ctx.org_ids = [client.post(f"{API}/orgs/", json={"name": "Harness org", "type": "Restaurant"}).json()["id"]]
+    ctx.item_ids = [item["id"] for item in client.get(f"{API}/items/", params={"limit": 200}).json()]
+    if not ctx.item_ids:
+        ctx.item_ids = [client.post(f"{API}/items/", json=_new_item(ctx), headers=ctx.auth()).json()["id"]]
+    return ctx
+
+
+def _run_phase(base_url: str, concurrency: int, total: int, do_request: Callable[[httpx.Client, int], int]) -> dict:
+    """Run ``total`` calls of ``do_request`` over ``concurrency`` threads and summarize them"""
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    lock = threading.Lock()
+    tickets = iter(range(total))
+
+    def worker():
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            while True:
+                with lock:
+                    n = next(tickets, None)
+                if n is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    code = str(do_request(client, n))
+                except httpx.HTTPError as e:
+                    code = type(e).__name__
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return {
+        "requests": total,
+        "throughput_per_s": round(total / wall, 2) if wall else None,
+        "statuses": statuses,
+        "latency": percentiles(latencies),
+    }
+
+
+def run(base_url: str, requests: int, concurrency: int, contended_items: int, only: Optional[set] = None,
+        remove_uploads: bool = False) -> dict:
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        ctx = _setup(client)
+
+    results = {}
+    for route in ROUTES:
+        if only and route.name not in only:
+            continue
+
+        def do_request(client: httpx.Client, n: int, route=route) -> int:
+            headers = ctx.admin_auth() if route.admin else ctx.auth() if route.auth else None
+            resp = client.request(
+                route.method,
+                route.path(ctx),
+                json=route.body(ctx) if route.body else None,
+                params=route.params(ctx) if route.params else None,
+                files=route.files(ctx) if route.files else None,
+                headers=headers,
+            )
+            if route.record and resp.status_code == 200:
+                route.record(ctx, resp)
+            return resp.status_code
+
+        results[route.name] = _run_phase(base_url, concurrency, requests, do_request)
+        print(f"   {route.name}: {results[route.name]['throughput_per_s']} req/s, "
+              f"p99 {results[route.name]['latency']['p99_ms']} ms")
+
+    if not only or "items.claim_contended" in only:
+        # Every client claims the same items in the same order: one 200 per item, the rest 400
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            targets = [client.post(f"{API}/items/", json=_new_item(ctx), headers=ctx.auth()).json()["id"]
+                       for _ in range(contended_items)]
+
+        def claim(client: httpx.Client, n: int) -> int:
+            item_id = targets[(n // concurrency) % len(targets)]
+            return client.post(f"{API}/items/{item_id}/claim", json={"claimer_name": "Harness"}).status_code
+
+        phase = _run_phase(base_url, concurrency, contended_items * concurrency, claim)
+        # More 200s than items means two clients both won the same item
+        phase["double_claims"] = max(0, phase["statuses"].get("200", 0) - len(targets))
+        results["items.claim_contended"] = phase
+        print(f"   items.claim_contended: {results['items.claim_contended']['statuses']}")
+
+    if remove_uploads:
+        for url in ctx.uploads:
+            (BACKEND_DIR / url.lstrip("/")).unlink(missing_ok=True)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", help="Benchmark an already running server")
+    target.add_argument("--database-url", help="Start a scratch server on this database (default: empty scratch DB)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--contended-items", type=int, default=20)
+    parser.add_argument("--routes", help="Comma-separated route names to run (default: all)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    only = set(args.routes.split(",")) if args.routes else None
+    # A scratch server lifts the per-user saved-search cap so searches.create can run --requests times
+    server = (
+        nullcontext(args.base_url) if args.base_url
+        else running_server(env={"AUTH_RATE_LIMIT_ENABLED": "false", "SAVED_SEARCH_MAX_PER_USER": "1000000"},
+                            database_url=args.database_url)
+    )
+    with server as base_url:
+        results = run(base_url, args.requests, args.concurrency, args.contended_items, only,
+                      remove_uploads=not args.base_url)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "base_url": args.base_url,
+            "database_url": args.database_url,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "routes": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+        print(f"✅ Report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Matching engine benchmark
+
+Times build + solve of the batch matching engine on synthetic inventories
+(items scattered around a metro, recipient orgs with random storage
+capacity and allergen exclusions), at several items x orgs sizes:
+
+    python -m benchmarks.matching --sizes 1000x100,5000x300,10000x500
+
+With --database-url it also times a full run_matching() (load + solve)
+against that database, e.g. one built by benchmarks.generate_data.
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.services.matching import build_problem, solve
+
+ALLERGENS = ["gluten", "milk", "eggs", "soy", "peanuts", "tree nuts", "sesame"]
+STORAGE = ["ambient", "refrigerated", "frozen"]
+
+
+def synthetic_rows(items: int, orgs: int, seed: int, now: datetime):
+    rng = random.Random(seed)
+    donors = [(rng.gauss(43.65, 0.1), rng.gauss(-79.38, 0.15)) for _ in range(max(1, orgs // 2))]
+    org_rows = []
+    for j in range(orgs):
+        capacity = {s: round(rng.lognormvariate(3, 0.7), 1) for s in STORAGE if rng.random() < 0.8}
+        capacity["exclude_allergens"] = rng.sample(ALLERGENS, k=rng.choice([0, 0, 0, 1, 2]))
+        org_rows.append((100_000 + j, rng.gauss(43.65, 0.12), rng.gauss(-79.38, 0.18), capacity))
+    item_rows = []
+    for i in range(items):
+        donor = rng.randrange(len(donors))
+        lat, lng = donors[donor]
+        item_rows.append((
+            i + 1, donor, rng.choice(STORAGE), rng.sample(ALLERGENS, k=rng.choice([0, 0, 1, 2])),
+            round(rng.lognormvariate(1.5, 0.7), 1), now + timedelta(hours=rng.uniform(0.5, 72)), lat, lng,
+        ))
+    return item_rows, org_rows
+
+
+def bench_synthetic(items: int, orgs: int, args) -> dict:
+    now = datetime.utcnow()
+    item_rows, org_rows = synthetic_rows(items, orgs, args.seed, now)
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        problem = build_problem(item_rows, org_rows, now)
+        built = time.perf_counter()
+        result = solve(problem, args.max_distance_km, args.speed_kmh)
+        timings.append((built - started, time.perf_counter() - built))
+    build_s, solve_s = min(timings, key=sum)
+    assigned = int((result["org_index"] >= 0).sum())
+    return {
+        "items": items,
+        "orgs": orgs,
+        "assigned": assigned,
+        "unassigned": items - assigned,
+        "build_ms": round(build_s * 1000, 1),
+        "solve_ms": round(solve_s * 1000, 1),
+        "total_distance_km": round(float(result["distance_km"].sum()), 1),
+    }
+
+
+def bench_database(database_url: str, args) -> dict:
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.session import build_engine
+    from app.services.matching import run_matching
+
+    engine = build_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        started = time.perf_counter()
+        result = run_matching(db, max_distance_km=args.max_distance_km, speed_kmh=args.speed_kmh)
+        return {**result["stats"], "total_ms": round((time.perf_counter() - started) * 1000, 1)}
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000x100,5000x300,10000x500", help="Comma-separated ITEMSxORGS")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-distance-km", type=float, default=50.0)
+    parser.add_argument("--speed-kmh", type=float, default=30.0)
+    parser.add_argument("--database-url", help="Also time run_matching() against this database")
+    args = parser.parse_args()
+
+    report = {"synthetic": []}
+    for size in args.sizes.split(","):
+        items, orgs = (int(x) for x in size.lower().split("x"))
+        row = bench_synthetic(items, orgs, args)
+        report["synthetic"].append(row)
+        print(f"   {items} items x {orgs} orgs: build {row['build_ms']} ms, solve {row['solve_ms']} ms, "
+              f"{row['assigned']} assigned")
+    if args.database_url:
+        report["database"] = bench_database(args.database_url, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Mixed-load benchmark: login throughput next to item-list latency
+
+Runs a login storm and a steady stream of GET /items/ against a scratch
+server, and reports login throughput and list latency percentiles. Compare
+pool sizes and cost factors via the environment, e.g.:
+
+    python -m benchmarks.password_pool --pool-workers 2 --queue-limit 16 --rounds 12
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import httpx
+
+from benchmarks._server import percentiles, running_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of mixed load")
+    parser.add_argument("--login-clients", type=int, default=32)
+    parser.add_argument("--list-clients", type=int, default=4)
+    parser.add_argument("--pool-workers", type=int, default=2)
+    parser.add_argument("--queue-limit", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    env = {
+        "PASSWORD_POOL_WORKERS": str(args.pool_workers),
+        "PASSWORD_POOL_QUEUE_LIMIT": str(args.queue_limit),
+        "PASSWORD_HASH_ROUNDS": str(args.rounds),
+        # A deliberate login storm would otherwise be rejected by the rate limiter
+        "AUTH_RATE_LIMIT_ENABLED": "false",
+    }
+    with running_server(env=env) as base_url:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            client.post("/api/v1/auth/register", json={
+                "name": "Bench", "email": "bench@example.com", "role": "donor", "password": "benchpass",
+            }).raise_for_status()
+            org = client.post("/api/v1/orgs/", json={"name": "Bench Org", "type": "restaurant"}).json()
+            for i in range(50):
+                client.post("/api/v1/items/", json={"org_id": org["id"], "title": f"Item {i}"}).raise_for_status()
+
+        deadline = time.perf_counter() + args.duration
+        lock = threading.Lock()
+        login_ok = login_rejected = 0
+        login_latency: list[float] = []
+        list_latency: list[float] = []
+
+        def login_worker():
+            nonlocal login_ok, login_rejected
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    resp = client.post("/api/v1/auth/login", json={"email": "bench@example.com", "password": "benchpass"})
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if resp.status_code == 200:
+                            login_ok += 1
+                            login_latency.append(elapsed)
+                        else:
+                            login_rejected += 1
+
+        def list_worker():
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    client.get("/api/v1/items/").raise_for_status()
+                    with lock:
+                        list_latency.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=login_worker) for _ in range(args.login_clients)]
+        threads += [threading.Thread(target=list_worker) for _ in range(args.list_clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    print(json.dumps({
+        "config": vars(args),
+        "login": {
+            "ok": login_ok,
+            "rejected_503": login_rejected,
+            "throughput_per_s": round(login_ok / args.duration, 2),
+            "latency": percentiles(login_latency),
+        },
+        "items_list": {
+            "throughput_per_s": round(len(list_latency) / args.duration, 2),
+            "latency": percentiles(list_latency),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
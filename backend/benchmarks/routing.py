@@ -0,0 +1,82 @@
+"""
+Volunteer route optimizer benchmark
+
+Builds synthetic pickup sets around a metro (each stop ready somewhere in
+the next few hours and expiring a few hours after that) and times
+solve_route() at several sizes. The construction distance, the distance
+after 2-opt, the input order's distance and how many stops couldn't be
+fitted are reported for each size:
+
+    python -m benchmarks.routing --sizes 50,100,200
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app.services.matching import haversine_matrix
+from app.services.routing import solve_route
+
+
+def synthetic_stops(count: int, rng: random.Random, horizon_hours: float):
+    lat = [43.65] + [rng.gauss(43.65, 0.04) for _ in range(count)]
+    lng = [-79.38] + [rng.gauss(-79.38, 0.06) for _ in range(count)]
+    opens, closes = [0.0], [np.inf]
+    for _ in range(count):
+        ready = rng.uniform(0, horizon_hours * 60 * 0.6)
+        opens.append(ready if rng.random() < 0.7 else 0.0)
+        closes.append(ready + rng.uniform(120, horizon_hours * 60) if rng.random() < 0.8 else np.inf)
+    return lat, lng, opens, closes
+
+
+def bench(count: int, args) -> dict:
+    rng = random.Random(args.seed + count)
+    lat, lng, opens, closes = synthetic_stops(count, rng, args.horizon_hours)
+    timings, result = [], None
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = solve_route(lat, lng, opens, closes, args.speed_kmh, args.service_minutes,
+                             time_budget=args.time_budget_ms / 1000)
+        timings.append(time.perf_counter() - started)
+    assert result["starts"] is not None, "route misses a time window"
+    dist = haversine_matrix(lat, lng, lat, lng)
+    input_km = float(dist[np.arange(count), np.arange(1, count + 1)].sum())
+    return {
+        "stops": count,
+        "routed": len(result["route"]) - 1,
+        "unrouted": len(result["unrouted"]),
+        "input_order_km": round(input_km, 1),
+        "construction_km": round(result["construction_km"], 1),
+        "distance_km": round(result["distance_km"], 1),
+        "two_opt_moves": result["moves"],
+        "duration_hours": round(result["starts"][-1] / 60, 1),
+        "solve_ms": round(min(timings) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,100,200")
+    parser.add_argument("--speed-kmh", type=float, default=30.0)
+    parser.add_argument("--service-minutes", type=float, default=1.0)
+    parser.add_argument("--horizon-hours", type=float, default=16.0)
+    parser.add_argument("--time-budget-ms", type=float, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    reports = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        report = bench(size, args)
+        reports.append(report)
+        print(f"   {size} stops: {report['distance_km']} km (construction {report['construction_km']} km, "
+              f"input order {report['input_order_km']} km), {report['unrouted']} unrouted, "
+              f"{report['solve_ms']} ms")
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Saved-search matching benchmark
+
+Indexes N synthetic subscriptions (a mix of category, keyword, radius and
+allergen-exclusion searches spread over a region) and times matching a
+stream of new items against them: the index lookup alone, lookup plus
+exact checks, and a linear scan for comparison:
+
+    python -m benchmarks.saved_searches --subscriptions 100000 --items 2000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.services.attributes import ALLERGENS, attribute_mask
+from app.services.saved_searches import Subscription, SubscriptionIndex, tokenize
+
+CATEGORIES = ["Bakery", "Produce", "Dairy", "Prepared Meals", "Canned Goods", "Meat", "Beverages", "Snacks"]
+WORDS = [
+    "bread", "bagels", "apples", "bananas", "milk", "yogurt", "cheese", "soup", "rice", "pasta", "salad",
+    "sandwiches", "chicken", "beans", "juice", "muffins", "carrots", "potatoes", "tomatoes", "curry",
+    "organic", "fresh", "frozen", "vegan", "halal", "kosher", "whole", "wheat", "gluten", "free",
+]
+
+
+def synthetic_subscriptions(count: int, rng: random.Random) -> list[Subscription]:
+    subs = []
+    for i in range(count):
+        geo = rng.random() < 0.95
+        subs.append(Subscription(
+            id=i + 1,
+            user_id=i + 1,
+            name=f"search {i + 1}",
+            category=CATEGORIES[rng.randrange(len(CATEGORIES))].lower() if rng.random() < 0.5 else None,
+            keywords=frozenset(rng.sample(WORDS, k=rng.choice([0, 1, 1, 1, 2]))),
+            lat=rng.gauss(43.65, 2.0) if geo else None,
+            lng=rng.gauss(-79.38, 4.0) if geo else None,
+            radius_km=rng.choice([2, 5, 10, 25]) if geo else None,
+            allergen_mask=attribute_mask(rng.sample(ALLERGENS, k=rng.choice([0, 0, 1])), None),
+        ))
+    return subs
+
+
+def synthetic_items(count: int, rng: random.Random) -> list[tuple]:
+    items = []
+    for _ in range(count):
+        title = " ".join(rng.sample(WORDS, k=rng.randint(1, 3)))
+        items.append((
+            title, None, rng.choice(CATEGORIES), rng.gauss(43.65, 2.0), rng.gauss(-79.38, 4.0),
+            attribute_mask(rng.sample(ALLERGENS, k=rng.choice([0, 1, 2])), None),
+        ))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=2_000)
+    parser.add_argument("--scan-items", type=int, default=50, help="Items to time the linear-scan baseline on")
+    parser.add_argument("--cell-degrees", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    subs = synthetic_subscriptions(args.subscriptions, rng)
+    items = synthetic_items(args.items, rng)
+
+    index = SubscriptionIndex(args.cell_degrees)
+    started = time.perf_counter()
+    for sub in subs:
+        index.add(sub)
+    build_s = time.perf_counter() - started
+
+    lookups, totals, matches, candidates = [], [], 0, 0
+    for title, description, category, lat, lng, mask in items:
+        tokens = tokenize(title) | tokenize(category)
+        started = time.perf_counter()
+        found = index.candidates(category, tokens, lat, lng)
+        lookups.append(time.perf_counter() - started)
+        candidates += len(found)
+        started = time.perf_counter()
+        matches += len(index.match(title, description, category, lat, lng, mask))
+        totals.append(time.perf_counter() - started)
+    lookups.sort()
+    totals.sort()
+
+    scan = []
+    for title, description, category, lat, lng, mask in items[:args.scan_items]:
+        started = time.perf_counter()
+        tokens = tokenize(title) | tokenize(category)
+        cat = category.lower()
+        [s for s in subs if (s.category is None or s.category == cat) and s.matches(tokens, lat, lng, mask)]
+        scan.append(time.perf_counter() - started)
+
+    def ms(seconds: float) -> float:
+        return round(seconds * 1000, 3)
+
+    report = {
+        "subscriptions": args.subscriptions,
+        "items": args.items,
+        "postings": len(index._postings),
+        "build_ms": ms(build_s),
+        "lookup_p50_ms": ms(lookups[len(lookups) // 2]),
+        "lookup_p99_ms": ms(lookups[int(len(lookups) * 0.99)]),
+        "match_p50_ms": ms(totals[len(totals) // 2]),
+        "match_p99_ms": ms(totals[int(len(totals) * 0.99)]),
+        "avg_candidates": round(candidates / max(1, len(items)), 1),
+        "avg_matches": round(matches / max(1, len(items)), 2),
+        "scan_avg_ms": ms(sum(scan) / max(1, len(scan))),
+    }
+    print(f"   {args.subscriptions} subscriptions: lookup p50 {report['lookup_p50_ms']} ms, "
+          f"match p50 {report['match_p50_ms']} ms, p99 {report['match_p99_ms']} ms "
+          f"(scan {report['scan_avg_ms']} ms)")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Mixed read/write benchmark for the SQLite profiles
+
+Starts a scratch server per profile and runs concurrent item-list readers
+alongside writers that create and claim items, then reports throughput,
+latency percentiles and failed requests (e.g. "database is locked") so the
+"production" profile can be compared with SQLite's defaults:
+
+    python -m benchmarks.sqlite_profile --duration 15 --readers 8 --writers 4
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+
+import httpx
+
+from benchmarks._server import percentiles, running_server
+
+
+def run_profile(profile: str, args) -> dict:
+    env = {"SQLITE_PROFILE": profile, "AUTH_RATE_LIMIT_ENABLED": "false"}
+    with running_server(env=env) as base_url:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            org = client.post("/api/v1/orgs/", json={"name": "Bench Org", "type": "restaurant"}).json()
+            for i in range(args.seed_items):
+                client.post("/api/v1/items/", json={"org_id": org["id"], "title": f"Seed {i}", "quantity": 1}).raise_for_status()
+
+        deadline = time.perf_counter() + args.duration
+        lock = threading.Lock()
+        counter = itertools.count()
+        results = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+
+        def record(kind, started, ok):
+            with lock:
+                if ok:
+                    results[kind].append(time.perf_counter() - started)
+                else:
+                    errors[kind] += 1
+
+        def reader():
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    resp = client.get("/api/v1/items/", params={"status": "listed"})
+                    record("read", started, resp.status_code == 200)
+
+        def writer():
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                while time.perf_counter() < deadline:
+                    n = next(counter)
+                    started = time.perf_counter()
+                    resp = client.post("/api/v1/items/", json={"org_id": org["id"], "title": f"Bench {n}", "quantity": 1})
+                    record("write", started, resp.status_code == 200)
+                    if resp.status_code == 200:
+                        started = time.perf_counter()
+                        resp = client.post(f"/api/v1/items/{resp.json()['id']}/claim", json={"claimer_name": "Bench"})
+                        record("write", started, resp.status_code == 200)
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return {
+        kind: {
+            "throughput_per_s": round(len(results[kind]) / args.duration, 2),
+            "errors": errors[kind],
+            "latency": percentiles(results[kind]),
+        }
+        for kind in ("read", "write")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seed-items", type=int, default=200)
+    parser.add_argument("--profiles", default="default,production")
+    args = parser.parse_args()
+
+    report = {"config": vars(args)}
+    for profile in args.profiles.split(","):
+        report[profile] = run_profile(profile, args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Type-ahead suggestion benchmark
+
+Loads N synthetic live listings (titles drawn from a food vocabulary, a
+share of them unique "<category> batch <n>" titles like the generated
+dataset) and a few thousand organizations into the prefix index, then
+times lookups for every prefix a user types on the way to a set of
+queries, interleaved with creates and claims, against a linear scan:
+
+    python -m benchmarks.suggest --items 100000 --orgs 5000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.services.suggest import SuggestIndex, _rank, _word_starts, normalize_prefix
+
+CATEGORIES = ["Bakery", "Produce", "Dairy", "Prepared Meals", "Canned Goods", "Meat", "Beverages", "Snacks"]
+WORDS = [
+    "bread", "bagels", "apples", "bananas", "milk", "yogurt", "cheese", "soup", "rice", "pasta", "salad",
+    "sandwiches", "chicken", "beans", "juice", "muffins", "carrots", "potatoes", "tomatoes", "curry",
+    "organic", "fresh", "frozen", "vegan", "halal", "kosher", "whole", "wheat", "gluten", "free",
+]
+QUERIES = ["bread", "bakery", "banana", "chicken curry", "fresh salad", "sunrise", "community", "batch 12"]
+
+
+def synthetic_items(count: int, rng: random.Random) -> list[tuple]:
+    items = []
+    for item_id in range(1, count + 1):
+        category = rng.choice(CATEGORIES)
+        if rng.random() < 0.3:
+            title = f"{category} batch {item_id}"
+        else:
+            title = " ".join(rng.sample(WORDS, k=rng.randint(1, 3)))
+        items.append((item_id, title, category, rng.randint(1, 5000), None))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--orgs", type=int, default=5_000)
+    parser.add_argument("--rounds", type=int, default=200, help="Rounds of (one create, one claim, typed queries)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    orgs = [(i, f"{rng.choice(['Sunrise', 'Community', 'Downtown', 'Harbour'])} {rng.choice(WORDS).title()} "
+                f"{rng.choice(['Kitchen', 'Market', 'Pantry'])} {i}") for i in range(1, args.orgs + 1)]
+    items = synthetic_items(args.items, rng)
+
+    index = SuggestIndex()
+    started = time.perf_counter()
+    index.load(orgs, items)
+    load_s = time.perf_counter() - started
+
+    prefixes = [q[:n] for q in QUERIES for n in range(1, len(q) + 1)]
+    lookups, writes = [], []
+    next_id = args.items + 1
+    for _ in range(args.rounds):
+        title, category = " ".join(rng.sample(WORDS, k=2)), rng.choice(CATEGORIES)
+        started = time.perf_counter()
+        index.item_listed(next_id, title, category, rng.randint(1, args.orgs), None)
+        index.item_unlisted(rng.randint(1, next_id))
+        writes.append((time.perf_counter() - started) / 2)
+        next_id += 1
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.suggest(prefix, 8)
+            lookups.append(time.perf_counter() - started)
+    lookups.sort()
+    writes.sort()
+
+    # Baseline: rank every term by hand (what a naive in-memory filter would do)
+    scan = []
+    for prefix in prefixes[:20]:
+        key = normalize_prefix(prefix)
+        started = time.perf_counter()
+        matches = [t for t in index._terms.values() if any(s.startswith(key) for s in _word_starts(t.key))]
+        sorted(matches, key=lambda t: _rank(t, key))[:8]
+        scan.append(time.perf_counter() - started)
+
+    def us(seconds: float) -> float:
+        return round(seconds * 1e6, 1)
+
+    report = {
+        "items": args.items,
+        "orgs": args.orgs,
+        "terms": len(index),
+        "keys": len(index._keys),
+        "broad_heads": len(index._heads),
+        "load_s": round(load_s, 2),
+        "lookup_p50_us": us(lookups[len(lookups) // 2]),
+        "lookup_p99_us": us(lookups[int(len(lookups) * 0.99)]),
+        "write_p50_us": us(writes[len(writes) // 2]),
+        "write_p99_us": us(writes[int(len(writes) * 0.99)]),
+        "scan_avg_us": us(sum(scan) / max(1, len(scan))),
+    }
+    print(f"   {args.items} live items: lookup p50 {report['lookup_p50_us']} us, p99 {report['lookup_p99_us']} us, "
+          f"write p50 {report['write_p50_us']} us (scan {report['scan_avg_us']} us)")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
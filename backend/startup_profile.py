@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Cold-start profiler for the FoodBridge API
+Measures import time of app.main and time-to-first-request of a fresh
+uvicorn process, and fails when either exceeds its budget.
+
+Both budgets cover what the app adds on top of the framework floor: the
+time a fresh interpreter needs just to import FastAPI, SQLAlchemy and
+uvicorn, measured on the same machine. The floor alone is 0.5-1.2 s
+depending on the host, so absolute budgets only held on fast laptops.
+
+Usage:
+    python startup_profile.py [--import-budget 0.5] [--ready-budget 0.5] [--top 15]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+FRAMEWORK = "fastapi, fastapi.routing, fastapi.middleware.cors, sqlalchemy.orm, pydantic_settings"
+
+
+def timed_import(modules: str, runs: int = 3) -> tuple[float, float]:
+    """Import ``modules`` in fresh interpreters; returns the best (import, spawn-to-exit) seconds"""
+    code = f"import time; t = time.perf_counter(); import {modules}; print(time.perf_counter() - t)"
+    best_import = best_spawn = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True)
+        best_spawn = min(best_spawn, time.perf_counter() - started)
+        best_import = min(best_import, float(result.stdout.strip()))
+    return best_import, best_spawn
+
+
+def profile_imports(top: int):
+    """Import app.main in a fresh interpreter with -X importtime.
+
+    Returns [(cumulative_seconds, module), ...] sorted by cumulative time,
+    slowest first. -X importtime inflates the totals, so budgets use
+    timed_import instead.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line.split("|", 2)
+        cumulative = int(cumulative_us.strip())
+        name = module.strip()
+        rows.append((cumulative / 1e6, name))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(timeout: float = 30.0) -> float:
+    """Start uvicorn and poll /health until it answers; return elapsed seconds."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "AUTO_MIGRATE": "false"},
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"Server did not answer {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget", type=float, default=0.5,
+                        help="Max seconds importing app.main may add over the framework floor")
+    parser.add_argument("--ready-budget", type=float, default=0.5,
+                        help="Max seconds from spawn to first 200, over the framework floor with uvicorn")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    floor_import, _ = timed_import(FRAMEWORK)
+    _, floor_spawn = timed_import(f"{FRAMEWORK}, uvicorn")
+    import_total, _ = timed_import("app.main")
+    import_own = import_total - floor_import
+    print(f"⏱️ framework floor: import {floor_import * 1000:.0f} ms, interpreter with uvicorn {floor_spawn * 1000:.0f} ms")
+    print(f"⏱️ import app.main: {import_total * 1000:.0f} ms, {import_own * 1000:.0f} ms over the floor "
+          f"(budget {args.import_budget * 1000:.0f} ms)")
+    for seconds, module in profile_imports(args.top):
+        print(f"   {seconds * 1000:8.1f} ms  {module}")
+
+    ready = min(time_to_first_request() for _ in range(3))
+    ready_own = ready - floor_spawn
+    print(f"⏱️ time to first request: {ready * 1000:.0f} ms, {ready_own * 1000:.0f} ms over the floor "
+          f"(budget {args.ready_budget * 1000:.0f} ms)")
+
+    failed = import_own > args.import_budget or ready_own > args.ready_budget
+    print("❌ Startup budget exceeded" if failed else "✅ Startup within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
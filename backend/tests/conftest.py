@@ -0,0 +1,54 @@
+"""
+Shared test setup: a scratch primary and one "replica" SQLite file
+
+Settings and engines are built when app modules are imported, so the
+environment is set here, before any test module imports the app. The two
+files are not replicated: a row written through the primary is missing on
+the replica, which is what the routing tests rely on.
+
+    cd backend && python -m pytest -q
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_scratch = Path(tempfile.mkdtemp(prefix="foodbridge-tests-"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_scratch / 'primary.db'}",
+    "DATABASE_REPLICA_URLS": json.dumps([f"sqlite:///{_scratch / 'replica.db'}"]),
+    "BACKUP_DIR": str(_scratch / "backups"),
+    "TRACING_DIR": str(_scratch / "traces"),
+    "AUTH_RATE_LIMIT_ENABLED": "false",
+    "PASSWORD_HASH_ROUNDS": "4",
+})
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(scope="session")
+def scratch_dir() -> Path:
+    return _scratch
+
+
+@pytest.fixture(scope="session")
+def databases():
+    """(primary, replica) engines with the schema applied to both"""
+    from app.db.migrate import migrate
+    from app.db.session import engine, replica_engines
+
+    migrate(engine)
+    migrate(replica_engines[0])
+    return engine, replica_engines[0]
+
+
+@pytest.fixture
+def client(databases):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
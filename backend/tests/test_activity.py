@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.models.models import ArchivedItem, Item, Organization
+from app.services.activity import activity_page
+
+USER_ID = 7001
+T0 = datetime(2026, 3, 2, 9, 0)
+
+
+def test_pages_walk_live_and_archived_activity_in_ts_item_kind_order(databases):
+    db = SessionLocal()
+    org = Organization(name="Activity Org", type="Restaurant")
+    db.add(org)
+    db.flush()
+    live = []
+    for i in range(6):
+        ts = T0 + timedelta(minutes=i // 2)  # pairs of items share a timestamp
+        item = Item(org_id=org.id, title=f"live {i}", status="claimed", created_at=ts,
+                    donated_by_user_id=USER_ID, claimed_by_user_id=USER_ID if i % 2 else None,
+                    claimed_at=ts if i % 2 else None)  # donated and claimed at the same instant
+        live.append(item)
+    db.add_all(live)
+    db.flush()
+    archived_ids = [live[-1].id + 100 + i for i in range(4)]
+    db.add_all([
+        ArchivedItem(id=item_id, org_id=org.id, title=f"archived {i}", status="claimed",
+                     created_at=T0 + timedelta(minutes=1), claimed_at=T0 + timedelta(minutes=i),
+                     donated_by_user_id=USER_ID, claimed_by_user_id=USER_ID, archived_at=T0 + timedelta(days=90))
+        for i, item_id in enumerate(archived_ids)
+    ])
+    db.commit()
+    try:
+        expected = sorted(
+            [(item.created_at, item.id, "donation") for item in live]
+            + [(item.claimed_at, item.id, "claim") for item in live if item.claimed_at]
+            + [(T0 + timedelta(minutes=1), item_id, "donation") for item_id in archived_ids]
+            + [(T0 + timedelta(minutes=i), item_id, "claim") for i, item_id in enumerate(archived_ids)],
+            reverse=True,
+        )
+
+        seen, cursor = [], None
+        while True:
+            page = activity_page(db, USER_ID, limit=3, cursor=cursor)
+            assert len(page["items"]) <= 3
+            seen += [(e["timestamp"], e["item_id"], e["type"]) for e in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == expected
+    finally:
+        db.query(ArchivedItem).filter(ArchivedItem.id.in_(archived_ids)).delete()
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
@@ -0,0 +1,50 @@
+import asyncio
+
+from app.core.admission import AdmissionController, classify
+from app.core.config import Settings, get_settings
+
+
+def test_classify_keeps_funnel_event_writes_out_of_analytics():
+    settings = get_settings()
+    assert classify("POST", "/api/v1/analytics/events", settings) == "interactive"
+    assert classify("GET", "/api/v1/analytics/funnel", settings) == "analytics"
+    assert classify("GET", "/api/v1/items", settings) == "interactive"
+    assert classify("POST", "/api/v1/items/1/claim", settings) == "critical"
+    assert classify("GET", "/metrics", settings) is None
+
+
+def test_overload_sheds_analytics_first_and_frees_slots_by_priority():
+    controller = AdmissionController(Settings(
+        admission_max_in_flight=2,
+        admission_limits={"critical": 2, "interactive": 1, "analytics": 1},
+        admission_queue={"critical": 4, "interactive": 4, "analytics": 4},
+        admission_wait_ms={"critical": 1000, "interactive": 1000, "analytics": 1000},
+        admission_route_limits={},
+    ))
+
+    async def scenario():
+        assert await controller.acquire("interactive", "/a") is None
+        assert await controller.acquire("analytics", "/b") is None
+        # Full: each of these queues behind the two running requests
+        analytics = asyncio.create_task(controller.acquire("analytics", "/b"))
+        interactive = asyncio.create_task(controller.acquire("interactive", "/a"))
+        critical = asyncio.create_task(controller.acquire("critical", "/c"))
+        await asyncio.sleep(0)
+        # With higher classes waiting, new analytics is shed on arrival
+        assert await controller.acquire("analytics", "/b") == "pressure"
+
+        def running():
+            return {name: cls.in_flight for name, cls in controller.classes.items()}
+
+        # Each freed slot goes to the highest class with a waiter
+        controller.release("analytics", "/b")
+        assert running() == {"critical": 1, "interactive": 1, "analytics": 0}
+        controller.release("interactive", "/a")
+        assert running() == {"critical": 1, "interactive": 1, "analytics": 0}
+        assert await critical is None and await interactive is None
+        assert not analytics.done()
+        controller.release("critical", "/c")
+        assert await analytics is None
+        assert running() == {"critical": 0, "interactive": 1, "analytics": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from app.db.migrate import migrate
+from app.db.session import SessionLocal
+from app.models.models import ArchivedItem, Item, Organization
+from app.services.archive import archive_items
+
+
+def test_archiving_the_newest_item_does_not_free_its_id(databases):
+    primary, _ = databases
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        org = Organization(name="Archive Org", type="Restaurant")
+        db.add(org)
+        db.flush()
+        newest = Item(org_id=org.id, title="old claim", status="claimed",
+                      created_at=now - timedelta(days=90), claimed_at=now - timedelta(days=60))
+        db.add(newest)
+        db.commit()
+        archived_id = newest.id
+
+        assert archive_items(primary, older_than_days=30, now=now)["moved"] >= 1
+        fresh = Item(org_id=org.id, title="new listing", status="listed", created_at=now)
+        db.add(fresh)
+        db.commit()
+        assert fresh.id > archived_id
+        assert db.get(ArchivedItem, archived_id).title == "old claim"
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.query(ArchivedItem).filter(ArchivedItem.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
+
+
+def test_migrate_rebuilds_an_items_table_without_autoincrement(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with bind.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, org_id INTEGER NOT NULL, "
+                          "title VARCHAR(200) NOT NULL, status VARCHAR(32))"))
+        conn.execute(text("INSERT INTO items (id, org_id, title, status) VALUES (1, 1, 'a', 'listed'), (2, 1, 'b', 'listed')"))
+        # Already archived by an older release: id 7 was the newest item at the time
+        conn.execute(text("CREATE TABLE items_archive (id INTEGER PRIMARY KEY, org_id INTEGER, title VARCHAR(200))"))
+        conn.execute(text("INSERT INTO items_archive (id, org_id, title) VALUES (7, 1, 'gone')"))
+
+    migrate(bind)
+    migrate(bind)  # a second run leaves the rebuilt table alone
+
+    with bind.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'items'")).scalar()
+        assert "AUTOINCREMENT" in ddl
+        assert conn.execute(text("SELECT id, title FROM items ORDER BY id")).all() == [(1, "a"), (2, "b")]
+        indexes = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE tbl_name = 'items' AND type = 'index'"))}
+        assert "ix_items_status_facets" in indexes
+        conn.execute(text("INSERT INTO items (org_id, title, status, attribute_mask) VALUES (1, 'c', 'listed', 0)"))
+        assert conn.execute(text("SELECT MAX(id) FROM items")).scalar() == 8
+    bind.dispose()
@@ -0,0 +1,56 @@
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization
+from app.services.attributes import apply_attribute_filters, normalize_allergen, normalize_storage
+
+ITEMS = {
+    "plain bread": (["Wheat"], "room temperature"),
+    "peanut cookies": (["peanut", "eggs"], "ambient"),
+    "milk": (["Dairy"], "Fridge"),
+    "ice cream": (["milk", "eggs"], "freezer"),
+    "mystery stew": (["celery"], None),
+    "salad": ([], "chilled"),
+}
+
+
+def test_exclude_allergens_and_storage_type_match_the_normalized_attributes(client, databases):
+    db = SessionLocal()
+    org = Organization(name="Attribute Org", type="Restaurant")
+    db.add(org)
+    db.flush()
+    db.add_all([Item(org_id=org.id, title=title, status="listed", allergens_json=allergens, storage_type=storage)
+                for title, (allergens, storage) in ITEMS.items()])
+    db.commit()
+    try:
+        def found(exclude=None, storage=None):
+            query = apply_attribute_filters(db.query(Item).filter(Item.org_id == org.id), exclude, storage)
+            return {item.title for item in query}
+
+        def expected(exclude=(), storage=()):
+            excluded = {normalize_allergen(a) for a in exclude}
+            wanted = {normalize_storage(s) for s in storage}
+            return {
+                title for title, (allergens, kind) in ITEMS.items()
+                if not excluded & {normalize_allergen(a) for a in allergens}
+                and (not wanted or normalize_storage(kind) in wanted)
+            }
+
+        assert found(["peanuts,lactose"]) == expected(["peanuts", "lactose"]) == {"plain bread", "mystery stew", "salad"}
+        assert found(None, ["refrigerated", "frozen"]) == expected((), ["refrigerated", "frozen"])
+        assert found(["eggs"], ["frozen"]) == set()
+        # Unrecognized allergens share the "other" bit
+        assert found(["mustard seed"]) == expected(["mustard seed"]) == set(ITEMS) - {"mystery stew"}
+
+        # The mask follows updates
+        stew = db.query(Item).filter(Item.org_id == org.id, Item.title == "mystery stew").one()
+        stew.allergens_json, stew.storage_type = ["sesame"], "frozen"
+        db.commit()
+        assert "mystery stew" in found(["mustard seed"], ["frozen"])
+        assert "mystery stew" not in found(["sesame"])
+
+        response = client.get("/api/v1/items/", params={"storage_type": "lukewarm"})
+        assert response.status_code == 400
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
@@ -0,0 +1,95 @@
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+from app.db import backup
+from app.db.backup import BackupError, WalShipper, create_snapshot, restore
+
+
+def _open(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    return conn
+
+
+def _insert(conn, name: str) -> None:
+    # Padding makes each row span pages, so replays rewrite real page contents
+    conn.execute("INSERT INTO notes (name, body) VALUES (?, ?)", (name, "x" * 3000))
+
+
+def _names(path) -> list[str]:
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM notes ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _tick() -> datetime:
+    # Keep manifest timestamps strictly ordered on coarse clocks
+    time.sleep(0.01)
+    now = datetime.utcnow()
+    time.sleep(0.01)
+    return now
+
+
+@pytest.fixture
+def live_db(tmp_path):
+    db_path = tmp_path / "live.db"
+    conn = _open(db_path)
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, name TEXT, body TEXT)")
+    _insert(conn, "before-snapshot")
+    shipper = WalShipper(db_path, tmp_path / "backups", checkpoint_frames=10_000)
+    shipper.ship_once()
+    yield db_path, conn, shipper, tmp_path / "backups"
+    shipper.close()
+    conn.close()
+
+
+def test_restore_to_a_point_between_two_shipped_segments(live_db, tmp_path):
+    db_path, conn, shipper, backup_dir = live_db
+    before_snapshot = _tick()
+    create_snapshot(db_path, backup_dir, step_sleep=0)
+
+    _insert(conn, "first")
+    assert shipper.ship_once()["frames"] > 0
+    midpoint = _tick()
+    _insert(conn, "second")
+    assert shipper.ship_once()["frames"] > 0
+
+    restore(backup_dir, tmp_path / "midpoint.db", target_time=midpoint)
+    assert _names(tmp_path / "midpoint.db") == ["before-snapshot", "first"]
+
+    latest = restore(backup_dir, tmp_path / "latest.db")
+    assert latest["segments_applied"] == 2
+    assert _names(tmp_path / "latest.db") == ["before-snapshot", "first", "second"]
+
+    with pytest.raises(BackupError):
+        restore(backup_dir, tmp_path / "too-early.db", target_time=before_snapshot)
+
+
+def test_segment_stamped_inside_the_write_lock(live_db, tmp_path, monkeypatch):
+    """A commit and a snapshot landing after the lock is released must not be covered by the segment"""
+    db_path, conn, shipper, backup_dir = live_db
+    _insert(conn, "shipped")
+    write_segment = WalShipper._write_segment
+
+    def late_write(self, *args, **kwargs):
+        _insert(conn, "after-lock")
+        _tick()
+        create_snapshot(db_path, backup_dir, step_sleep=0)
+        _tick()
+        return write_segment(self, *args, **kwargs)
+
+    monkeypatch.setattr(WalShipper, "_write_segment", late_write)
+    manifest = shipper.ship_once()
+    snapshot = backup.list_snapshots(backup_dir)[-1]
+    assert manifest["shipped_at"] < snapshot["finished_at"]
+
+    # The segment predates the snapshot's contents, so the snapshot is restored on its own
+    restored = restore(backup_dir, tmp_path / "restored.db")
+    assert restored["segments_applied"] == 0
+    assert _names(tmp_path / "restored.db") == ["before-snapshot", "shipped", "after-lock"]
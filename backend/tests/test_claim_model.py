@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization
+from app.services import claim_model
+from app.services.claim_model import LIVE_COLUMNS, live_frame, train
+
+
+def test_live_org_history_counts_only_resolved_items(databases, monkeypatch):
+    monkeypatch.setattr(claim_model, "org_history_cache", claim_model.OrgHistoryCache())
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        org = Organization(name="History Org", type="Restaurant")
+        db.add(org)
+        db.flush()
+        db.add_all([
+            Item(org_id=org.id, title="claimed", status="claimed", claimed_at=now - timedelta(days=1),
+                 expires_at=now + timedelta(days=1)),
+            Item(org_id=org.id, title="expired", status="listed", expires_at=now - timedelta(days=1)),
+            Item(org_id=org.id, title="live", status="listed", expires_at=now + timedelta(days=1)),
+            Item(org_id=org.id, title="live too", status="listed", expires_at=None),
+        ])
+        db.commit()
+        rows = db.query(Item).filter(Item.org_id == org.id, Item.title == "live").with_entities(*LIVE_COLUMNS).all()
+        frame = live_frame(db, rows, now)
+        assert (frame.org_claims[0], frame.org_donations[0]) == (1.0, 2.0)
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
+
+
+def test_training_observes_items_between_listing_and_resolution(monkeypatch):
+    frames = []
+    feature_matrix = claim_model.feature_matrix
+    monkeypatch.setattr(claim_model, "feature_matrix", lambda frame, *args: frames.append(frame) or feature_matrix(frame, *args))
+    n = 200
+    rng = np.random.default_rng(0)
+    now = datetime(2026, 1, 1)
+    created = np.datetime64(now - timedelta(days=60), "s") + rng.integers(0, 50 * 86400, n).astype("timedelta64[s]")
+    expires = created + np.timedelta64(48 * 3600, "s")
+    claimed_at = np.where(rng.random(n) < 0.6, created + np.timedelta64(3600, "s"), np.datetime64("NaT", "s"))
+    columns = {
+        "org_id": rng.integers(1, 5, n),
+        "category": np.array(["Produce"] * n, dtype=object),
+        "storage_type": np.array([None] * n, dtype=object),
+        "quantity": np.ones(n),
+        "created_at": created,
+        "ready_at": created,
+        "expires_at": expires,
+        "claimed_at": claimed_at,
+    }
+    train(columns, now)
+    observed = frames[0].observed_at
+    resolved_at = np.where(np.isnat(claimed_at), expires, claimed_at)
+    order = np.argsort(created, kind="stable")
+    assert (observed >= created[order]).all() and (observed <= resolved_at[order]).all()
+    assert (observed > created[order]).mean() > 0.9
@@ -0,0 +1,57 @@
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization
+from app.services.clusters import cluster_cache, clusters
+
+
+def _listing(db, points: list[tuple[float, float]]) -> list[int]:
+    """One org with one listed item at each (lat, lng); returns the org ids"""
+    orgs = [Organization(name=f"Cluster Org {i}", type="Restaurant", lat=lat, lng=lng) for i, (lat, lng) in enumerate(points)]
+    db.add_all(orgs)
+    db.flush()
+    db.add_all([Item(org_id=org.id, title="cluster item", category="Produce", status="listed") for org in orgs])
+    db.commit()
+    cluster_cache.invalidate()
+    return [org.id for org in orgs]
+
+
+def _cleanup(db, org_ids: list[int]) -> None:
+    db.query(Item).filter(Item.org_id.in_(org_ids)).delete()
+    db.query(Organization).filter(Organization.id.in_(org_ids)).delete()
+    db.commit()
+    db.close()
+    cluster_cache.invalidate()
+
+
+def test_a_bbox_across_the_antimeridian_finds_both_sides(databases):
+    db = SessionLocal()
+    org_ids = _listing(db, [(0.0, 179.5), (0.0, -179.5), (45.0, 0.0), (-30.0, 100.0)])
+    try:
+        wrapping = (179.0, -1.0, -179.0, 1.0)
+        # Zoom 0 probes the viewport's cells (wrapping the column index); zoom 12 scans the grid
+        for zoom in (0, 12):
+            result = clusters(db, wrapping, zoom, max_clusters=300)
+            found = {c["org_id"] for c in result["clusters"]} & set(org_ids)
+            assert found == set(org_ids[:2]), zoom
+        ordinary = clusters(db, (-1.0, -1.0, 1.0, 1.0), 12, max_clusters=300)
+        assert not {c["org_id"] for c in ordinary["clusters"]} & set(org_ids)
+    finally:
+        _cleanup(db, org_ids)
+
+
+def test_too_many_cells_zooms_out_until_they_fit(databases):
+    db = SessionLocal()
+    org_ids = _listing(db, [(10.0 + i, 10.0 + i) for i in range(6)])
+    try:
+        bbox = (5.0, 5.0, 20.0, 20.0)
+        detailed = clusters(db, bbox, 12, max_clusters=300)
+        assert detailed["zoom"] == 12
+        assert len(detailed["clusters"]) == 6
+
+        coarse = clusters(db, bbox, 12, max_clusters=2)
+        assert coarse["zoom"] < 12
+        assert len(coarse["clusters"]) <= 2
+        assert coarse["total"] == sum(c["count"] for c in coarse["clusters"]) == 6
+        # One level finer would still have been too many
+        assert len(clusters(db, bbox, coarse["zoom"] + 1, max_clusters=300)["clusters"]) > 2
+    finally:
+        _cleanup(db, org_ids)
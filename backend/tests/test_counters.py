@@ -0,0 +1,45 @@
+from app.auth.auth import create_access_token
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization, User
+from app.services.counters import reconcile_counters
+
+
+def _auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def test_counters_follow_creates_and_claims_and_reconcile_repairs_drift(client):
+    db = SessionLocal()
+    org = Organization(name="Counter Org", type="Restaurant")
+    donor = User(name="Donor", email="counter-donor@example.com", role="donor", password_hash="x")
+    claimer = User(name="Claimer", email="counter-claimer@example.com", role="recipient", password_hash="x")
+    db.add_all([org, donor, claimer])
+    db.commit()
+    try:
+        for title in ("counter bread", "counter soup"):
+            response = client.post("/api/v1/items/", json={"org_id": org.id, "title": title, "quantity": 3},
+                                   headers=_auth(donor))
+            assert response.status_code == 200
+        item_id = response.json()["id"]
+        assert client.post(f"/api/v1/items/{item_id}/claim", json={"claimer_name": "Claimer"},
+                           headers=_auth(claimer)).status_code == 200
+
+        db.expire_all()
+        assert (org.donation_count, org.claim_count, org.quantity_rescued) == (2, 1, 3.0)
+        assert (donor.donation_count, claimer.claim_count, claimer.quantity_rescued) == (2, 1, 3.0)
+        assert client.get("/api/v1/auth/me", headers=_auth(claimer)).json()["total_claims"] == 1
+        assert reconcile_counters(db) == {"users": 0, "organizations": 0}
+
+        org.claim_count, donor.donation_count, claimer.last_activity_at = 99, 0, None
+        db.commit()
+        assert reconcile_counters(db) == {"users": 2, "organizations": 1}
+        db.commit()
+        db.expire_all()
+        assert (org.claim_count, donor.donation_count) == (1, 2)
+        assert claimer.last_activity_at is not None
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        for row in (org, donor, claimer):
+            db.delete(row)
+        db.commit()
+        db.close()
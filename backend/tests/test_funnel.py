@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.models.models import Event
+from app.services.funnel import funnel
+
+STEPS = ["funnel_view", "funnel_start", "funnel_claim"]
+T0 = datetime(2026, 3, 2, 9, 0)
+
+
+def m(minutes: float) -> datetime:
+    return T0 + timedelta(minutes=minutes)
+
+
+def _events():
+    view, start, claim = STEPS
+    return [
+        # Converts in 10 minutes
+        (8001, 1, view, m(0)), (8001, 1, start, m(5)), (8001, 1, claim, m(10)),
+        # Viewed one item, started another: not a conversion
+        (8001, 2, view, m(20)), (8001, 3, start, m(21)),
+        # Started past the window; the view after it has passed opens a new attempt
+        (8002, 1, view, m(0)), (8002, 1, start, m(25 * 60)),
+        (8002, 1, view, m(26 * 60)), (8002, 1, start, m(27 * 60)),
+        # A repeated view inside the window is ignored
+        (8003, 1, view, m(0)), (8003, 1, view, m(1)), (8003, 1, start, m(2)), (8003, 1, claim, m(3)),
+        # Steps without the first one, or out of order, don't count
+        (8004, 1, start, m(0)), (8004, 1, claim, m(1)), (8004, 2, view, m(2)), (8004, 2, claim, m(3)),
+    ]
+
+
+def test_funnel_counts_ordered_per_item_conversions_within_the_window(databases):
+    db = SessionLocal()
+    db.add_all([Event(user_id=u, item_id=i, event_type=t, created_at=at) for u, i, t, at in _events()])
+    db.commit()
+    try:
+        result = funnel(db, STEPS, timedelta(hours=24), batch_size=3)
+        assert result["events_scanned"] == len(_events())
+        counts = [(step["count"], step["users"]) for step in result["steps"]]
+        assert counts == [(6, 4), (3, 3), (2, 2)]
+        claim = result["steps"][2]
+        assert claim["conversion_from_previous"] == round(2 / 3, 4)
+        assert result["overall_conversion"] == round(2 / 6, 4)
+        assert claim["time_from_start"]["min_seconds"] == 180.0
+        assert claim["time_from_start"]["max_seconds"] == 600.0
+    finally:
+        db.query(Event).filter(Event.event_type.in_(STEPS)).delete()
+        db.commit()
+        db.close()
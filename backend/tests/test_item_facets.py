@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization
+
+
+def test_risk_sorted_facets_count_only_the_live_items_listed(client, databases):
+    primary, replica = databases
+    now = datetime.utcnow()
+    db = SessionLocal()
+    org = Organization(name="Facet Org", type="Restaurant")
+    db.add(org)
+    db.flush()
+    db.add_all([
+        Item(org_id=org.id, title="facet live", category="Facet Bakery", status="listed", expires_at=now + timedelta(days=1)),
+        Item(org_id=org.id, title="facet expired", category="Facet Bakery", status="listed", expires_at=now - timedelta(days=1)),
+        Item(org_id=org.id, title="facet claimed", category="Facet Bakery", status="claimed", expires_at=now + timedelta(days=1)),
+    ])
+    db.commit()
+    # Reads go to the replica, which isn't replicated in tests: copy the rows over
+    rows = [{c.name: getattr(item, c.name) for c in Item.__table__.columns} for item in db.query(Item).filter(Item.org_id == org.id)]
+    with replica.begin() as conn:
+        conn.execute(Organization.__table__.insert(), [{"id": org.id, "name": org.name, "type": org.type}])
+        conn.execute(Item.__table__.insert(), rows)
+    try:
+        params = {"q": "facet", "facets": "category"}
+        by_expiry = client.get("/api/v1/items/", params=params).json()
+        by_risk = client.get("/api/v1/items/", params={**params, "sort": "risk"}).json()
+        assert len(by_expiry["items"]) == 3
+        assert [item["title"] for item in by_risk["items"]] == ["facet live"]
+
+        def bakery(body):
+            return {f["value"]: f["count"] for f in body["facets"]["category"]}.get("Facet Bakery")
+
+        assert bakery(by_expiry) == 3
+        assert bakery(by_risk) == 1
+    finally:
+        for bind in (primary, replica):
+            with bind.begin() as conn:
+                conn.execute(Item.__table__.delete().where(Item.org_id == org.id))
+                conn.execute(Organization.__table__.delete().where(Organization.id == org.id))
+        db.close()
+
+
+def test_facets_for_an_available_now_window_are_served_from_the_cache(client, databases):
+    from app.services.facets import facet_cache
+
+    facet_cache.clear()
+    params = {"facets": "category", "available_between": "now,2099-01-01T00:00:00"}
+    hits = facet_cache.stats()["hits"]
+    assert client.get("/api/v1/items/", params=params).status_code == 200
+    assert client.get("/api/v1/items/", params=params).status_code == 200
+    assert facet_cache.stats()["hits"] == hits + 1
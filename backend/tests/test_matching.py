@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from app.auth.auth import create_access_token
+from app.db.session import READ_YOUR_WRITES_HEADER, SessionLocal
+from app.models.models import User
+from app.services.matching import build_problem, solve
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def _item(item_id: int, storage: str = "refrigerated", quantity: float = 4.0):
+    # (id, org_id, storage_type, allergens, quantity, expires_at, lat, lng): all donated at one spot
+    return (item_id, 100, storage, [], quantity, None, 43.65, -79.38)
+
+
+def test_assignments_respect_each_orgs_capacity_per_storage_type():
+    orgs = [
+        (1, 43.66, -79.38, {"refrigerated": 8}),                 # ~1 km away
+        (2, 43.70, -79.38, {"refrigerated": 4, "ambient": 10}),  # ~6 km away
+    ]
+    items = [_item(i) for i in range(1, 5)] + [_item(5, storage="frozen")]
+    problem = build_problem(items, orgs, NOW)
+    result = solve(problem, max_distance_km=50, speed_kmh=30)
+
+    placed = {int(problem.item_ids[i]): int(problem.org_ids[j]) for i, j in enumerate(result["org_index"]) if j >= 0}
+    assert sorted(placed.values()) == [1, 1, 2]
+    reasons = {int(problem.item_ids[i]): r for i, r in enumerate(result["reason"]) if result["org_index"][i] < 0}
+    assert list(reasons.values()).count("capacity") == 1
+    # Neither org declared frozen capacity, so nowhere could take it
+    assert reasons[5] == "no_feasible_org"
+
+
+def test_run_is_a_read_that_does_not_pin_to_the_primary(client):
+    db = SessionLocal()
+    admin = User(name="Matcher", email="matcher@example.com", role="admin", password_hash="x")
+    db.add(admin)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(admin.id)})}"}
+    try:
+        response = client.get("/api/v1/matching/run", params={"max_distance_km": 10}, headers=headers)
+        assert response.status_code == 200
+        assert READ_YOUR_WRITES_HEADER not in response.headers
+        assert response.json()["stats"]["assigned"] == 0
+        assert client.post("/api/v1/matching/run", json={}, headers=headers).status_code == 405
+    finally:
+        db.delete(admin)
+        db.commit()
+        db.close()
@@ -0,0 +1,50 @@
+import re
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-z_]+="(\\.|[^"\\])*"(,[a-z_]+="(\\.|[^"\\])*")*\})? \S+$')
+
+
+def test_registry_renders_the_text_exposition_format():
+    registry = Registry()
+    counter = registry.register(Counter("jobs_total", "Jobs run", ("kind",)))
+    histogram = registry.register(Histogram("job_seconds", "Job time", ("kind",), buckets=(0.1, 1.0)))
+    registry.register(Gauge("queue_depth", "Jobs waiting", ("queue",), callback=lambda: [(('a"b',), 3.0)]))
+    counter.inc("daily")
+    counter.inc("daily", amount=2)
+    histogram.observe("daily", value=0.05)
+    histogram.observe("daily", value=0.5)
+    histogram.observe("daily", value=5)
+
+    lines = registry.render().splitlines()
+    assert "# HELP jobs_total Jobs run" in lines
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{kind="daily"} 3' in lines
+    assert "# TYPE job_seconds histogram" in lines
+    buckets = [line for line in lines if line.startswith("job_seconds_bucket")]
+    assert buckets == [
+        'job_seconds_bucket{kind="daily",le="0.1"} 1',
+        'job_seconds_bucket{kind="daily",le="1.0"} 2',
+        'job_seconds_bucket{kind="daily",le="+Inf"} 3',
+    ]
+    assert 'job_seconds_count{kind="daily"} 3' in lines
+    assert 'queue_depth{queue="a\\"b"} 3' in lines
+
+
+def test_metrics_endpoint_reports_requests_pool_and_caches(client):
+    assert client.get("/api/v1/items").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    lines = response.text.splitlines()
+    for line in lines:
+        if not line.startswith(("# HELP ", "# TYPE ")):
+            assert SAMPLE.match(line), line
+            float(line.rsplit(" ", 1)[1])
+    text = response.text
+    assert re.search(r'^foodbridge_http_requests_total\{route="/api/v1/items/?",method="GET",status="200"\} \d+',
+                     text, re.M)
+    assert re.search(r'^foodbridge_db_pool_checkouts_total\{engine="primary"\} [1-9]', text, re.M)
+    assert re.search(r'^foodbridge_db_pool_hold_seconds_count\{engine="primary"\} [1-9]', text, re.M)
+    assert 'foodbridge_cache_hit_rate{cache="user"}' in text
@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.models.models import Item, Organization
+from app.services.pickup_windows import NEVER, apply_available_between, next_opening, pickup_bounds
+from app.services.routing import plan_route
+
+MONDAY = datetime(2026, 3, 2, 8, 0)  # 08:00 UTC on a Monday, before DST starts in North America
+
+
+def test_daily_window_repeats_until_expiry():
+    bounds = pickup_bounds("9 AM - 5 PM", MONDAY, MONDAY + timedelta(days=3))
+    assert bounds["pickup_start"] == datetime(2026, 3, 2, 9)
+    assert bounds["pickup_end"] == datetime(2026, 3, 4, 17)  # Wednesday's close; it expires Thursday 08:00
+    assert (bounds["pickup_daily_open"], bounds["pickup_daily_minutes"], bounds["pickup_days"]) == (540, 480, 0b1111111)
+    window = tuple(bounds[c] for c in ("pickup_start", "pickup_end", "pickup_daily_open", "pickup_daily_minutes", "pickup_days"))
+    assert next_opening(*window, after=datetime(2026, 3, 3, 18)) == (datetime(2026, 3, 4, 9), datetime(2026, 3, 4, 17))
+
+
+def test_weekday_range_and_org_timezone():
+    bounds = pickup_bounds("Mon-Fri 9-5", MONDAY + timedelta(days=4), MONDAY + timedelta(days=10), tz="America/Toronto")
+    # Friday 09:00 EST is 14:00 UTC; no weekend openings, the last one is next Thursday
+    assert bounds["pickup_start"] == datetime(2026, 3, 6, 14)
+    assert bounds["pickup_daily_open"] == 14 * 60
+    assert bounds["pickup_days"] == 0b0011111
+    assert bounds["pickup_end"] == datetime(2026, 3, 11, 22)  # DST began on the 8th: an hour off, as documented
+
+
+def test_one_off_windows_leave_the_daily_columns_empty():
+    for text in ("Available until 6 PM", "2 hours", "after 5 PM"):
+        bounds = pickup_bounds(text, MONDAY, MONDAY + timedelta(days=3))
+        assert bounds["pickup_days"] is None and bounds["pickup_daily_open"] is None
+    # Expires before the window comes round again
+    assert pickup_bounds("9 AM - 5 PM", MONDAY, MONDAY + timedelta(hours=20))["pickup_days"] is None
+
+
+def test_window_that_never_opens_before_expiry_is_never_available(databases):
+    ready, expires = datetime(2026, 10, 19, 8), datetime(2026, 10, 22, 8)  # Monday to Thursday
+    bounds = pickup_bounds("weekends 10am-2pm", ready, expires)
+    assert bounds == {"pickup_start": None, "pickup_end": None, "pickup_daily_open": None,
+                      "pickup_daily_minutes": None, "pickup_days": NEVER}
+
+    db = SessionLocal()
+    org = Organization(name="Weekend Org", type="Restaurant", lat=40.0, lng=-74.0)
+    db.add(org)
+    db.flush()
+    item = Item(org_id=org.id, title="weekend only", status="listed", pickup_window="weekends 10am-2pm",
+                ready_at=ready, expires_at=expires)
+    db.add(item)
+    db.commit()
+    try:
+        query = db.query(Item).filter(Item.org_id == org.id)
+        assert apply_available_between(query, (ready, expires)).all() == []
+        assert apply_available_between(query, (ready, ready + timedelta(days=30))).all() == []
+        route = plan_route(db, 40.0, -74.0, [item.id], start_time=ready)
+        assert route["unassigned"] == [{"item_id": item.id, "reason": "time_window"}]
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
+
+
+def _openings(bounds: dict, horizon: datetime):
+    start, end = bounds["pickup_start"], bounds["pickup_end"]
+    if bounds["pickup_days"] == NEVER:
+        return
+    after = start
+    while True:
+        opens, closes = next_opening(start, end, bounds["pickup_daily_open"], bounds["pickup_daily_minutes"],
+                                     bounds["pickup_days"], after)
+        if closes is None or closes < after or opens > horizon:
+            if closes is None:
+                yield opens, horizon
+            return
+        yield opens, closes
+        if bounds["pickup_days"] is None:
+            return
+        after = closes + timedelta(seconds=1)
+
+
+def test_available_between_matches_the_enumerated_openings(databases):
+    rng = random.Random(4)
+    texts = ["9 AM - 5 PM", "Mon-Fri 9-5", "weekends 10 AM - 2 PM", "10 PM - 2 AM", "5-7pm", "Available until 6 PM", ""]
+    db = SessionLocal()
+    org = Organization(name="Window Org", type="Restaurant", timezone="America/Vancouver")
+    db.add(org)
+    db.flush()
+    items = []
+    for i in range(40):
+        ready = MONDAY + timedelta(hours=rng.uniform(0, 72))
+        expires = ready + timedelta(hours=rng.uniform(2, 200)) if rng.random() < 0.9 else None
+        items.append(Item(org_id=org.id, title=f"window {i}", status="listed", pickup_window=rng.choice(texts),
+                          ready_at=ready, expires_at=expires))
+    db.add_all(items)
+    db.commit()
+    horizon = MONDAY + timedelta(days=30)
+    try:
+        for _ in range(60):
+            t0 = MONDAY + timedelta(hours=rng.uniform(-12, 200))
+            t1 = t0 + timedelta(hours=rng.choice([0, 0.5, 3, 20, 30, 100, 200]))
+            found = {
+                item.id for item in
+                apply_available_between(db.query(Item).filter(Item.org_id == org.id), (t0, t1)).all()
+            }
+            expected = set()
+            for item in items:
+                bounds = {c: getattr(item, c) for c in
+                          ("pickup_start", "pickup_end", "pickup_daily_open", "pickup_daily_minutes", "pickup_days")}
+                if any(opens <= t1 and closes >= t0 for opens, closes in _openings(bounds, horizon)):
+                    expected.add(item.id)
+            assert found == expected, (t0, t1)
+    finally:
+        db.query(Item).filter(Item.org_id == org.id).delete()
+        db.delete(org)
+        db.commit()
+        db.close()
@@ -0,0 +1,61 @@
+import pytest
+
+from app.auth import rate_limit
+from app.auth.passwords import password_pool
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.models.models import User
+
+PASSWORD = "correct horse"
+
+
+@pytest.fixture
+def limited(client, monkeypatch):
+    """Rate limiting switched on, with empty buckets and the client IP read from X-Test-IP"""
+    monkeypatch.setattr(rate_limit.auth_rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limit.auth_rate_limiter, "backend", rate_limit.MemoryBucketBackend(1000))
+    monkeypatch.setattr(rate_limit, "client_ip", lambda request: request.headers.get("x-test-ip", "unknown"))
+    return client
+
+
+@pytest.fixture
+def owner(databases):
+    db = SessionLocal()
+    user = User(name="Owner", email="owner@example.com", role="donor", password_hash=password_pool.hash(PASSWORD))
+    db.add(user)
+    db.commit()
+    try:
+        yield user
+    finally:
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+def _login(client, password: str, ip: str, email: str = "owner@example.com"):
+    return client.post("/api/v1/auth/login", json={"email": email, "password": password}, headers={"X-Test-IP": ip})
+
+
+def test_empty_ip_bucket_answers_429_with_retry_after(limited, owner):
+    capacity = int(get_settings().auth_rate_limit_ip_capacity)
+    for i in range(capacity):
+        assert _login(limited, PASSWORD, "10.0.0.1", email=f"nobody{i}@example.com").status_code == 401
+    response = _login(limited, PASSWORD, "10.0.0.1")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert _login(limited, PASSWORD, "10.0.0.2").status_code == 200
+
+
+def test_failed_guesses_from_another_ip_dont_lock_the_owner_out(limited, owner):
+    settings = get_settings()
+    for _ in range(int(settings.auth_rate_limit_email_capacity)):
+        assert _login(limited, PASSWORD, "10.0.0.3").status_code == 200
+    for _ in range(int(settings.auth_rate_limit_email_capacity) - 1):
+        assert _login(limited, "wrong guess", "10.0.0.4").status_code == 401
+    assert _login(limited, PASSWORD, "10.0.0.3").status_code == 200
+
+    # The failure that empties the email bucket shuts out further guesses for it
+    assert _login(limited, "wrong guess", "10.0.0.4").status_code == 401
+    response = _login(limited, "another guess", "10.0.0.5")
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,66 @@
+import time
+
+from sqlalchemy import func, select, text, update
+
+from app.core.config import get_settings
+from app.db.session import READ_YOUR_WRITES_HEADER, ReadSessionLocal
+from app.models.models import Organization
+
+
+def _count(engine, name: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM organizations WHERE name = :name"), {"name": name}).scalar()
+
+
+def test_routing_session_reads_from_replica_and_writes_to_primary(databases):
+    primary, replica = databases
+    with ReadSessionLocal(info={"replica": replica}) as db:
+        assert db.get_bind(clause=select(Organization)) is replica
+        assert db.get_bind(clause=update(Organization).values(name="x")) is primary
+
+        db.add(Organization(name="Routed", type="restaurant"))
+        db.commit()
+        # The flush went to the primary; the read still goes to the (unreplicated) replica
+        assert db.scalar(select(func.count()).where(Organization.name == "Routed")) == 0
+
+        db.execute(update(Organization).where(Organization.name == "Routed").values(name="Routed 2"))
+        db.commit()
+
+    assert _count(primary, "Routed 2") == 1
+    assert _count(replica, "Routed") == 0 and _count(replica, "Routed 2") == 0
+
+
+def test_write_pins_reads_to_primary_for_the_window(client):
+    created = client.post("/api/v1/orgs/", json={"name": "Sticky", "type": "restaurant"})
+    assert created.status_code == 200
+    org_id = created.json()["id"]
+    primary_until = float(created.headers[READ_YOUR_WRITES_HEADER])
+    assert 0 < primary_until - time.time() <= get_settings().read_your_writes_seconds
+    client.cookies.clear()
+
+    # Without the token the read goes to the replica, which never saw the row
+    assert client.get(f"/api/v1/orgs/{org_id}").status_code == 404
+    # Echoing the header (what the SPA does) keeps the client on the primary
+    sticky = {READ_YOUR_WRITES_HEADER: created.headers[READ_YOUR_WRITES_HEADER]}
+    assert client.get(f"/api/v1/orgs/{org_id}", headers=sticky).status_code == 200
+    # The cookie works the same way for credentialed clients
+    client.cookies.set("fb_primary_until", created.headers[READ_YOUR_WRITES_HEADER])
+    assert client.get(f"/api/v1/orgs/{org_id}").status_code == 200
+
+
+def test_stickiness_expires_and_cannot_be_stretched(client):
+    org_id = client.post("/api/v1/orgs/", json={"name": "Expired", "type": "restaurant"}).json()["id"]
+    client.cookies.clear()
+
+    expired = {READ_YOUR_WRITES_HEADER: str(time.time() - 1)}
+    assert client.get(f"/api/v1/orgs/{org_id}", headers=expired).status_code == 404
+    # A forged value far past the window is ignored rather than pinning the client forever
+    forged = {READ_YOUR_WRITES_HEADER: str(time.time() + 3600)}
+    assert client.get(f"/api/v1/orgs/{org_id}", headers=forged).status_code == 404
+    assert client.get(f"/api/v1/orgs/{org_id}", headers={READ_YOUR_WRITES_HEADER: "soon"}).status_code == 404
+
+
+def test_reads_do_not_extend_the_window(client):
+    response = client.get("/api/v1/orgs/")
+    assert response.status_code == 200
+    assert READ_YOUR_WRITES_HEADER not in response.headers
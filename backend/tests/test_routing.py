@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services.routing import solve_route
+
+# Cheapest insertion alone routes four of these five stops; an order that meets every window exists
+LAT = [40.0, 40.02, 40.064, 40.044, 39.956, 39.968]
+LNG = [-74.0, -73.925, -74.099, -73.936, -73.941, -74.006]
+OPENS = [0.0, 27.0, 25.0, 23.0, 40.0, 45.0]
+CLOSES = [np.inf, 90.0, 115.0, 101.0, 107.0, 134.0]
+
+
+def test_repair_fits_stops_that_greedy_insertion_leaves_out():
+    result = solve_route(LAT, LNG, OPENS, CLOSES, speed_kmh=30.0, service_minutes=5.0)
+    assert result["unrouted"] == []
+    assert sorted(result["route"]) == list(range(6))
+    assert result["starts"] is not None
+
+
+def test_stop_that_cannot_be_reached_in_time_stays_unrouted():
+    closes = CLOSES[:-1] + [1.0]  # 1 minute after departure, several km away
+    result = solve_route(LAT, LNG, OPENS, closes, speed_kmh=30.0, service_minutes=5.0)
+    assert result["unrouted"] == [5]
@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, timedelta
+
+from app.db.session import SessionLocal
+from app.models.models import SavedSearch
+from app.services.saved_searches import SubscriptionIndex
+
+
+def _save(db, name: str, updated_at: datetime) -> SavedSearch:
+    row = SavedSearch(user_id=1, name=name, keywords_json=[name], active=True, updated_at=updated_at)
+    db.add(row)
+    db.commit()
+    return row
+
+
+def test_sync_picks_up_a_row_committed_late_with_an_earlier_updated_at(databases):
+    db = SessionLocal()
+    try:
+        index = SubscriptionIndex()
+        index.sync(db)
+        start = datetime.utcnow()
+        newer = _save(db, "newer", start)
+        index.sync(db, overlap=60)
+        assert newer.id in {sub.id for sub in index.match("newer", None, None, None, None)}
+
+        # Stamped before `newer` by another worker, but committed after this worker synced
+        late = _save(db, "late", start - timedelta(seconds=5))
+        index.sync(db, overlap=60)
+        assert late.id in {sub.id for sub in index.match("late", None, None, None, None)}
+
+        newer.active = False
+        newer.updated_at = start + timedelta(seconds=1)
+        db.commit()
+        index.sync(db, overlap=60)
+        assert index.match("newer", None, None, None, None) == []
+    finally:
+        db.query(SavedSearch).delete()
+        db.commit()
+        db.close()
+
+
+class _PausedSession:
+    """Session whose queries wait until ``resume`` is set, to hold a sync open"""
+
+    def __init__(self, db):
+        self.db = db
+        self.querying = threading.Event()
+        self.resume = threading.Event()
+        self.queries = 0
+
+    def query(self, *entities):
+        self.queries += 1
+        self.querying.set()
+        assert self.resume.wait(5)
+        return self.db.query(*entities)
+
+
+def test_interleaved_syncs_run_one_at_a_time(databases):
+    db = SessionLocal()
+    try:
+        first = _save(db, "first", datetime.utcnow())
+        index = SubscriptionIndex()
+        paused = _PausedSession(db)
+        loader = threading.Thread(target=index.sync, args=(paused,), kwargs={"every": 60})
+        loader.start()
+        assert paused.querying.wait(5)
+
+        # Nothing loaded yet: a second caller waits for the running load instead of starting its own
+        waiter = threading.Thread(target=index.sync, args=(paused,), kwargs={"every": 60})
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive()
+        paused.resume.set()
+        loader.join(5)
+        waiter.join(5)
+        assert paused.queries == 1
+        assert first.id in {sub.id for sub in index.match("first", None, None, None, None)}
+
+        # Once loaded, a caller that finds a sync running keeps using the current index
+        second = _save(db, "second", datetime.utcnow())
+        paused = _PausedSession(db)
+        syncer = threading.Thread(target=index.sync, args=(paused,), kwargs={"overlap": 60})
+        syncer.start()
+        assert paused.querying.wait(5)
+        index.sync(paused, overlap=60)
+        assert paused.queries == 1
+        paused.resume.set()
+        syncer.join(5)
+        assert second.id in {sub.id for sub in index.match("second", None, None, None, None)}
+    finally:
+        db.query(SavedSearch).delete()
+        db.commit()
+        db.close()
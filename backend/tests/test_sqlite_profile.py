@@ -0,0 +1,42 @@
+from sqlalchemy import text
+
+from app.core.config import Settings
+from app.db.session import build_engine
+
+
+def _pragmas(engine) -> dict:
+    with engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "temp_store", "wal_autocheckpoint")
+        }
+
+
+def test_production_profile_applies_pragmas_on_every_connection(tmp_path):
+    config = Settings(sqlite_profile="production", sqlite_busy_timeout_ms=1234, sqlite_cache_size_kib=2048,
+                      sqlite_wal_shipping=True)
+    engine = build_engine(f"sqlite:///{tmp_path / 'production.db'}", config)
+    try:
+        expected = {
+            "journal_mode": "wal",
+            "synchronous": 1,  # NORMAL
+            "busy_timeout": 1234,
+            "cache_size": -2048,
+            "temp_store": 2,  # MEMORY
+            "wal_autocheckpoint": 0,
+        }
+        assert _pragmas(engine) == expected
+        engine.dispose()  # a fresh connection gets them too
+        assert _pragmas(engine) == expected
+    finally:
+        engine.dispose()
+
+
+def test_default_profile_leaves_sqlite_defaults(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'default.db'}", Settings(sqlite_profile="default"))
+    try:
+        pragmas = _pragmas(engine)
+        assert pragmas["journal_mode"] == "delete"
+        assert pragmas["synchronous"] == 2  # FULL
+    finally:
+        engine.dispose()
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+COLD_IMPORT = """
+import sys
+import app.main
+from app.services.ai import get_ai_service
+from fastapi.testclient import TestClient
+
+heavy = sorted(m for m in ("openai", "numpy", "pandas", "sklearn") if m in sys.modules)
+assert not heavy, heavy
+assert get_ai_service.cache_info().currsize == 0
+with TestClient(app.main.app) as client:
+    assert client.get("/health").json() == {"status": "ok"}
+"""
+
+
+def test_cold_start_defers_heavy_imports_and_schema_work(tmp_path):
+    database = tmp_path / "cold.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "DATABASE_REPLICA_URLS": "[]",
+        "AUTO_MIGRATE": "false",
+        "OPENAI_ENABLED": "false",
+    }
+    result = subprocess.run([sys.executable, "-c", COLD_IMPORT], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    # Starting up never touched the schema: that's python -m app.db.migrate's job
+    if database.exists():
+        import sqlite3
+
+        with sqlite3.connect(database) as conn:
+            assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall() == []
@@ -0,0 +1,38 @@
+import threading
+import time
+
+from app.db.session import SessionLocal
+from app.services import suggest
+
+
+def test_concurrent_stale_requests_reload_once_and_serve_the_old_index(databases, monkeypatch):
+    suggest.refresh(SessionLocal(), every=0)  # make sure an index is loaded
+    loads = []
+    load = suggest.suggest_index.load
+
+    def slow_load(*args):
+        loads.append(threading.get_ident())
+        time.sleep(0.3)
+        load(*args)
+
+    monkeypatch.setattr(suggest.suggest_index, "load", slow_load)
+    monkeypatch.setattr(suggest.suggest_index, "loaded_at", time.monotonic() - 3600)
+    served = []
+
+    def request():
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            suggest.refresh(db, every=60)
+            served.append(time.perf_counter() - started)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    # Everyone but the reloading request returned without waiting for it
+    assert sorted(served)[-2] < 0.2
@@ -0,0 +1,53 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core import tracing
+from app.core.tracing import TracingMiddleware, span
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    records = []
+    monkeypatch.setattr(tracing.exporter, "export", records.append)
+    return records
+
+
+def _traced_app(sample_rate: float) -> TracingMiddleware:
+    from app.db.session import engine
+
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        with span("custom.step", size=3):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1")).scalar()
+        return {"ok": True}
+
+    middleware = TracingMiddleware(app)
+    middleware.sample_rate = sample_rate
+    return middleware
+
+
+def test_sample_rate_zero_issues_trace_ids_but_exports_nothing(databases, exported):
+    with TestClient(_traced_app(0.0)) as client:
+        response = client.get("/work")
+        assert response.status_code == 200
+        assert len(response.headers["X-Trace-Id"]) == 16
+        assert client.get("/work", headers={"X-Trace-Id": "abcdef0123456789"}).headers["X-Trace-Id"] == "abcdef0123456789"
+    assert exported == []
+
+
+def test_sampled_requests_export_their_spans(databases, exported):
+    with TestClient(_traced_app(1.0)) as client:
+        trace_id = client.get("/work").headers["X-Trace-Id"]
+    assert len(exported) == 1
+    record = exported[0]
+    assert record["trace_id"] == trace_id
+    assert (record["route"], record["status"]) == ("/work", 200)
+    names = [s["name"] for s in record["spans"]]
+    assert "custom.step" in names and "db.select" in names
+    custom = next(s for s in record["spans"] if s["name"] == "custom.step")
+    assert custom["attrs"] == {"size": 3}
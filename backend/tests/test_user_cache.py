@@ -0,0 +1,54 @@
+import time
+
+from app.auth.auth import create_access_token
+from app.auth.user_cache import UserCache, user_cache
+from app.db.session import SessionLocal
+from app.models.models import User
+
+
+def _user(db, email: str) -> User:
+    user = User(name="Cached", email=email, role="recipient", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_entries_expire_after_the_ttl(databases):
+    db = SessionLocal()
+    try:
+        user = _user(db, "ttl@example.com")
+        cache = UserCache(max_entries=10, ttl_seconds=0.05)
+        cache.put("token", user)
+        assert cache.get("token", SessionLocal()).email == "ttl@example.com"
+        time.sleep(0.1)
+        assert cache.get("token", SessionLocal()) is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    finally:
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+def test_a_user_write_evicts_the_cached_principal_once_committed(client):
+    db = SessionLocal()
+    user = _user(db, "evict@example.com")
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    try:
+        assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "recipient"
+        assert user_cache.stats()["size"] >= 1
+
+        user.role = "admin"
+        db.flush()
+        db.rollback()
+        assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "recipient"
+
+        user.role = "donor"
+        db.flush()
+        # Flushed but not committed: a request in between still sees (and caches) the committed row
+        assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "recipient"
+        db.commit()
+        assert client.get("/api/v1/auth/me", headers=headers).json()["role"] == "donor"
+    finally:
+        db.delete(user)
+        db.commit()
+        db.close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Latency breakdown of the slowest traced requests
+
+Reads the JSONL traces written by app.core.tracing (set TRACING_SAMPLE_RATE
+to record them), including rotated files. It takes the slowest requests,
+the top 1% by default, and shows where their time went: SQL by statement
+type, commit, SMTP, OpenAI, serialization, admission queueing, and what no
+span covers (Python in the handler, middleware).
+
+    python trace_report.py                         # slowest 1% of everything traced
+    python trace_report.py --route "/api/v1/items/{item_id}/claim"
+    python trace_report.py --percentile 95 --examples 5
+"""
+
+import argparse
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+
+from app.core.config import get_settings
+
+
+def load_traces(directory: Path) -> list[dict]:
+    traces = []
+    for path in sorted(directory.glob("traces.jsonl*")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    traces.append(json.loads(line))
+                except ValueError:
+                    continue  # a line cut short by a crash mid-write
+    return traces
+
+
+def covered_ms(spans: list[dict], limit: float) -> float:
+    """Time inside [0, limit] covered by at least one span (spans can nest)"""
+    covered, reach = 0.0, 0.0
+    for start, end in sorted((s["start_ms"], s["start_ms"] + s["duration_ms"]) for s in spans):
+        start, end = max(start, reach), min(end, limit)
+        if end > start:
+            covered += end - start
+            reach = end
+    return covered
+
+
+def breakdown(traces: list[dict]) -> dict:
+    """Mean ms and calls per request for each span name, over ``traces``"""
+    totals: dict[str, float] = defaultdict(float)
+    calls: dict[str, int] = defaultdict(int)
+    untraced = 0.0
+    for trace in traces:
+        duration = trace["duration_ms"]
+        for span in trace["spans"]:
+            if span["start_ms"] < duration:  # background tasks run after the response
+                totals[span["name"]] += span["duration_ms"]
+                calls[span["name"]] += 1
+        untraced += max(0.0, duration - covered_ms(trace["spans"], duration))
+    n = len(traces)
+    mean = sum(t["duration_ms"] for t in traces) / n
+    rows = {name: {"mean_ms": totals[name] / n, "calls": calls[name] / n} for name in totals}
+    rows["(untraced)"] = {"mean_ms": untraced / n, "calls": 0.0}
+    return {"requests": n, "mean_ms": mean, "spans": dict(sorted(rows.items(), key=lambda kv: -kv[1]["mean_ms"]))}
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.tracing_dir, help="Trace directory (default: TRACING_DIR)")
+    parser.add_argument("--route", help="Only this route template, e.g. /api/v1/items/")
+    parser.add_argument("--percentile", type=float, default=99.0, help="Report requests slower than this percentile")
+    parser.add_argument("--examples", type=int, default=3, help="Trace ids of the slowest requests to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    traces = load_traces(Path(args.dir))
+    if args.route:
+        traces = [t for t in traces if t.get("route") == args.route]
+    if not traces:
+        print(f"⚠️ No traces in {args.dir}. Set TRACING_SAMPLE_RATE (e.g. 0.05) and send some traffic.")
+        return
+
+    traces.sort(key=lambda t: t["duration_ms"])
+    cut = min(len(traces) - 1, int(math.floor(len(traces) * args.percentile / 100)))
+    slow = traces[cut:]
+    routes: dict[str, int] = defaultdict(int)
+    for trace in slow:
+        routes[f"{trace['method']} {trace['route']}"] += 1
+    report = {
+        "traces": len(traces),
+        "threshold_ms": slow[0]["duration_ms"],
+        "overall": breakdown(traces),
+        "slowest": breakdown(slow),
+        "slowest_routes": dict(sorted(routes.items(), key=lambda kv: -kv[1])),
+        "examples": [
+            {"trace_id": t["trace_id"], "route": t["route"], "duration_ms": t["duration_ms"], "start": t["start"]}
+            for t in reversed(slow[-args.examples:])
+        ],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"🔎 {len(traces):,} traces; slowest {100 - args.percentile:g}% = {len(slow):,} requests "
+          f"at or above {report['threshold_ms']:.1f} ms")
+    print(f"\n{'span':<24}{'slowest ms':>12}{'share':>8}{'calls':>8}{'overall ms':>12}")
+    overall = report["overall"]["spans"]
+    for name, row in report["slowest"]["spans"].items():
+        share = row["mean_ms"] / report["slowest"]["mean_ms"] if report["slowest"]["mean_ms"] else 0.0
+        print(f"{name:<24}{row['mean_ms']:>12.1f}{share:>8.0%}{row['calls']:>8.1f}"
+              f"{overall.get(name, {}).get('mean_ms', 0.0):>12.1f}")
+    print(f"{'request (mean)':<24}{report['slowest']['mean_ms']:>12.1f}{'':>16}{report['overall']['mean_ms']:>12.1f}")
+    print("\n📍 Slowest routes:")
+    for route, count in list(report["slowest_routes"].items())[:10]:
+        print(f"   {count:>5}  {route}")
+    print("\n🧵 Slowest traces:")
+    for example in report["examples"]:
+        print(f"   {example['trace_id']}  {example['duration_ms']:.1f} ms  {example['route']}  ({example['start']})")
+
+
+if __name__ == "__main__":
+    main()
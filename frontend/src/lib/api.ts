@@ -7,6 +7,24 @@ export const api = axios.create({
   },
 })
 
+// Read-your-writes: after a write the API returns X-Primary-Until (epoch
+// seconds). Sending it back keeps our reads on the primary database until
+// the replicas have caught up with the change.
+let primaryUntil = 0
+
+api.interceptors.response.use((response) => {
+  const value = Number(response.headers['x-primary-until'])
+  if (value > primaryUntil) primaryUntil = value
+  return response
+})
+
+api.interceptors.request.use((config) => {
+  if (primaryUntil > Date.now() / 1000) {
+    config.headers['X-Primary-Until'] = String(primaryUntil)
+  }
+  return config
+})
+
 export type OrganizationOut = {
   id: number
   name: string
@@ -25,6 +43,8 @@ export type ItemOut = {
   ready_at?: string | null
   expires_at?: string | null
   pickup_window?: string | null
+  pickup_start?: string | null
+  pickup_end?: string | null
   status: string
   photo_url?: string | null
   organization?: {